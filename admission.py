@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Admission control for interaction handlers.
+
+Every interaction has 3 s to be answered. Under a burst the event loop
+falls behind and interactions wait in line. Autocomplete requests are
+cheap to drop: the user has usually typed another letter already. A
+command's reply is what the user is waiting for. So autocomplete is shed
+first: when it is stale, when commands are waiting on the loop, or when
+a user or guild is over its rate. Commands are only refused once they
+can no longer be answered, or when one user floods them.
+
+Ages are measured from when the bot received the interaction (see
+metrics.stamp_received and interaction_age), not from its snowflake
+timestamp: that is Discord's clock, and a host clock a second off would
+shed everything or nothing.
+Load is measured the same way, as how long interactions sit waiting
+for the loop, rather than by counting commands that may only be
+awaiting their HTTP reply.
+"""
+import time
+
+from metrics import INTERACTION_DEADLINE, interaction_age
+
+
+class TokenBuckets:
+    """One token bucket per key (a user or guild id), made on first use.
+
+    Each bucket refills at `rate` tokens per second up to `burst`. Once
+    more than `max_keys` buckets exist, the ones that have refilled
+    completely are forgotten.
+    """
+
+    def __init__(self, rate, burst, max_keys=10_000, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets = {}  # key -> (tokens, last update)
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def take(self, key) -> bool:
+        """Spend one token from `key`'s bucket; False if it is empty."""
+        now = self.clock()
+        tokens, last = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        allowed = tokens >= 1
+        self._buckets[key] = (tokens - 1 if allowed else tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._prune(now)
+        return allowed
+
+    def _prune(self, now):
+        refill = self.burst / self.rate
+        self._buckets = {k: v for k, v in self._buckets.items() if now - v[1] < refill}
+
+
+class Admission:
+    """Decides whether to serve an interaction or shed it.
+
+    check() returns None to serve, otherwise the reason it was shed:
+
+    * "expired": a command that has waited past the deadline
+    * "stale": an autocomplete older than `autocomplete_max_age`
+    * "busy": an autocomplete that waited more than `busy_lag` seconds
+      for the loop, or while the loop lags that much
+    * "user_rate" / "guild_rate": over that user's or guild's bucket
+
+    Guild buckets only apply to autocomplete, so a busy guild can't
+    starve its own members' commands.
+    """
+
+    def __init__(self, loop_lag=lambda: 0.0, deadline=INTERACTION_DEADLINE,
+                 autocomplete_max_age=1.5, busy_lag=0.25,
+                 command_user=(1.0, 5), autocomplete_user=(8.0, 16), autocomplete_guild=(80.0, 160)):
+        self.loop_lag = loop_lag
+        self.deadline = deadline
+        self.autocomplete_max_age = autocomplete_max_age
+        self.busy_lag = busy_lag
+        self.buckets = {
+            ("command", "user"): TokenBuckets(*command_user),
+            ("autocomplete", "user"): TokenBuckets(*autocomplete_user),
+            ("autocomplete", "guild"): TokenBuckets(*autocomplete_guild),
+        }
+
+    def check(self, kind, interaction):
+        age = interaction_age(interaction)
+        if kind == "command":
+            if age > self.deadline:
+                return "expired"
+        else:
+            if age > self.autocomplete_max_age:
+                return "stale"
+            if age > self.busy_lag or self.loop_lag() > self.busy_lag:
+                return "busy"
+
+        user = getattr(getattr(interaction, "user", None), "id", None)
+        if user is not None and not self.buckets[(kind, "user")].take(user):
+            return "user_rate"
+        guild = getattr(interaction, "guild_id", None)
+        bucket = self.buckets.get((kind, "guild"))
+        if guild is not None and bucket is not None and not bucket.take(guild):
+            return "guild_rate"
+        return None
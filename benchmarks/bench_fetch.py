@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Fetcher against a local stand-in wiki that throttles and fails.
+
+    python3 benchmarks/bench_fetch.py [--pages N] [--capacity C] [--error-rate R]
+
+The stand-in answers after a fixed latency, returns 429 (with
+Retry-After) whenever more than C requests are in flight and a random
+503 for a fraction R of requests. A healthy run fetches every page,
+settles its concurrency near C and reports no failures.
+"""
+import asyncio
+import os
+import random
+import sys
+
+from aiohttp import web
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fetcher import Fetcher, FetchError  # noqa: E402
+from parse_pool import cli_option  # noqa: E402
+
+LATENCY = 0.02
+BODY = "<html>" + "x" * 20_000 + "</html>"
+
+
+def stand_in(capacity, error_rate):
+    state = {"in_flight": 0, "served": 0, "throttled": 0, "errors": 0}
+
+    async def page(request):
+        if state["in_flight"] >= capacity:
+            state["throttled"] += 1
+            return web.Response(status=429, headers={"Retry-After": "0.2"})
+        state["in_flight"] += 1
+        try:
+            await asyncio.sleep(LATENCY)
+            if random.random() < error_rate:
+                state["errors"] += 1
+                return web.Response(status=503)
+            state["served"] += 1
+            return web.Response(text=BODY, content_type="text/html")
+        finally:
+            state["in_flight"] -= 1
+
+    app = web.Application()
+    app.router.add_get("/wiki/{title}", page)
+    return app, state
+
+
+async def main(argv):
+    pages = int(cli_option(argv, "--pages", 500))
+    capacity = int(cli_option(argv, "--capacity", 12))
+    error_rate = float(cli_option(argv, "--error-rate", 0.02))
+
+    app, state = stand_in(capacity, error_rate)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    failed = 0
+    async with Fetcher(rate=200, burst=50) as fetcher:
+        async def one(i):
+            nonlocal failed
+            try:
+                resp = await fetcher.get(f"http://127.0.0.1:{port}/wiki/Page_{i}")
+            except FetchError:
+                failed += 1
+                return
+            if resp.status != 200:
+                failed += 1
+        await asyncio.gather(*(one(i) for i in range(pages)))
+    await runner.cleanup()
+
+    print(f"stand-in: capacity {capacity}, latency {LATENCY * 1000:.0f} ms, error rate {error_rate:.0%}")
+    print(f"server: {state['served']} served, {state['throttled']} throttled, {state['errors']} errors")
+    print(f"client: {fetcher.summary()}")
+    print(f"pages failed: {failed}/{pages}")
+    return failed
+
+
+if __name__ == "__main__":
+    sys.exit(1 if asyncio.run(main(sys.argv[1:])) else 0)
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""Drive bot.py's command and autocomplete handlers without Discord.
+
+    python3 benchmarks/bench_handlers.py                  # run and report
+    python3 benchmarks/bench_handlers.py --check          # fail on regressions
+    python3 benchmarks/bench_handlers.py --save-baseline  # record new baseline
+
+Replays query mixes built from the data files: people typing names one
+letter at a time, exact names, typos, misses, short ambiguous partials
+and /fishsearch filters. Each scenario reports throughput, p50/p99
+latency and peak KiB allocated per call. The "mixed" scenario runs all
+of them at --concurrency simulated users on one event loop.
+
+Latencies are compared to benchmarks/handlers_baseline.json after
+scaling by a fixed pure-Python calibration loop, so a baseline recorded
+on one machine stays meaningful on another. --check exits 1 when a
+scenario's p99 exceeds the baseline by more than TOLERANCE.
+"""
+import asyncio
+import json
+import os
+import random
+import statistics
+import string
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ.setdefault("METRICS_PORT", "0")
+os.environ.setdefault("ADMISSION_CONTROL", "0")
+os.environ.setdefault("QUERY_LOG_DB", "")
+
+import bot  # noqa: E402
+from parse_pool import cli_option  # noqa: E402
+
+bot.load_datasets()
+
+BASELINE_FILE = os.path.join(ROOT, "benchmarks", "handlers_baseline.json")
+TOLERANCE = 1.5  # p99 may grow to 1.5x the (calibrated) baseline
+SEED = 1234
+
+
+# ---------------------------------------------------------
+# FAKE DISCORD OBJECTS
+# ---------------------------------------------------------
+class FakeUser:
+    def __init__(self, user_id):
+        self.id = user_id
+
+
+class FakeResponse:
+    def __init__(self):
+        self.sent = None
+
+    async def send_message(self, content=None, **kwargs):
+        self.sent = (content, kwargs)
+        await asyncio.sleep(0)  # hand the loop to other users, like real I/O would
+
+    async def edit_message(self, **kwargs):
+        self.sent = (None, kwargs)
+        await asyncio.sleep(0)
+
+
+class FakeInteraction:
+    def __init__(self, user_id=1):
+        self.user = FakeUser(user_id)
+        self.guild_id = 1
+        self.response = FakeResponse()
+        self.created_at = datetime.now(timezone.utc)
+        self.extras = {}
+        bot.stamp_received(self)  # as ReceiptTree does
+
+
+# ---------------------------------------------------------
+# QUERY MIXES
+# ---------------------------------------------------------
+LOOKUP_COMMANDS = {
+    "bestiary": (bot.bestiary, bot.bestiary_autocomplete),
+    "rods": (bot.rod, bot.rod_autocomplete),
+    "enchants": (bot.enchant, bot.enchant_autocomplete),
+    "categories": (bot.enchantcategory, bot.enchantcategory_autocomplete),
+    "locations": (bot.location, bot.location_autocomplete),
+    "events": (bot.event, bot.event_autocomplete),
+}
+FISHSEARCH_COMPLETE = {col: bot.fishsearch_autocomplete(col) for col in bot.FILTERS}
+
+
+def names(dataset):
+    ds = bot.store[dataset]
+    return [ds.index.display_name(i) for i in range(len(ds.index))]
+
+
+def typo(rng, name):
+    i = rng.randrange(len(name))
+    kind = rng.choice("dst")
+    if kind == "d" and len(name) > 4:
+        return name[:i] + name[i + 1:]
+    if kind == "s":
+        return name[:i] + rng.choice(string.ascii_lowercase) + name[i + 1:]
+    if i < len(name) - 1:
+        return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+    return name + "e"
+
+
+def build_scenarios(rng, size):
+    """{scenario: [(handler, args)]} of roughly `size` calls each."""
+    pools = {d: names(d) for d in LOOKUP_COMMANDS}
+    weights = [len(pools[d]) for d in LOOKUP_COMMANDS]
+    datasets = list(LOOKUP_COMMANDS)
+
+    def pick():
+        d = rng.choices(datasets, weights)[0]
+        return d, rng.choice(pools[d])
+
+    typing, hits, typos, misses, partials, search = [], [], [], [], [], []
+    while len(typing) < size:
+        d, name = pick()
+        complete = LOOKUP_COMMANDS[d][1]
+        typing += [(complete, (name[:n],)) for n in range(0, len(name) + 1)]
+    for _ in range(size):
+        d, name = pick()
+        command = LOOKUP_COMMANDS[d][0].callback
+        hits.append((command, (name,)))
+        typos.append((command, (typo(rng, name),)))
+        misses.append((command, ("".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 12))),)))
+        start = rng.randrange(max(1, len(name) - 3))
+        partial = name[start:start + rng.randint(2, 4)]
+        partials.append((command, (partial,)))
+
+    table = bot.fish_table(bot.store["bestiary"])
+    fishsearch = bot.fishsearch.callback
+    for _ in range(size // 2):
+        filters = {}
+        for col in rng.sample(list(bot.FILTERS), rng.randint(1, 3)):
+            filters[col] = rng.choice(table.values[col])
+        filters["sort"] = rng.choice(list(bot.SORTS))
+        search.append((fishsearch, (), filters))
+        col = rng.choice(list(bot.FILTERS))
+        value = rng.choice(table.values[col])
+        search.append((FISHSEARCH_COMPLETE[col], (value[:rng.randint(0, len(value))],)))
+
+    scenarios = {
+        "autocomplete_typing": typing[:size],
+        "lookup_hit": hits,
+        "lookup_typo": typos,
+        "lookup_miss": misses,
+        "lookup_partial": partials,
+        "fishsearch": search,
+    }
+    mixed = [call for calls in scenarios.values() for call in calls]
+    rng.shuffle(mixed)
+    scenarios["mixed"] = mixed
+    return scenarios
+
+
+# ---------------------------------------------------------
+# MEASUREMENT
+# ---------------------------------------------------------
+async def call(handler, args, kwargs=None):
+    interaction = FakeInteraction()
+    start = time.perf_counter()
+    await handler(interaction, *args, **(kwargs or {}))
+    return time.perf_counter() - start
+
+
+async def run_scenario(calls, concurrency):
+    """Latencies of every call, `concurrency` simulated users at a time."""
+    queue = list(reversed(calls))
+    latencies = []
+
+    async def user():
+        while queue:
+            handler, args, *kwargs = queue.pop()
+            latencies.append(await call(handler, args, *kwargs))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    return latencies, time.perf_counter() - start
+
+
+async def allocations(calls, sample=200):
+    """Mean peak KiB allocated per call, over a sample of calls."""
+    peaks = []
+    tracemalloc.start()
+    try:
+        for handler, args, *kwargs in calls[:sample]:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            await call(handler, args, *kwargs)
+            peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    finally:
+        tracemalloc.stop()
+    return statistics.mean(peaks) / 1024 if peaks else 0.0
+
+
+def calibrate(rounds=5):
+    """Seconds for a fixed pure-Python workload (best of `rounds`)."""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        d = {}
+        for i in range(200_000):
+            d[str(i % 5000)] = d.get(str(i % 5000), 0) + i
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+async def main(argv):
+    size = int(cli_option(argv, "--calls", 2000))
+    concurrency = int(cli_option(argv, "--concurrency", 64))
+    scenarios = build_scenarios(random.Random(SEED), size)
+    scale = calibrate()
+
+    # one untimed pass so lazily built tables and embeds exist
+    for calls in scenarios.values():
+        await run_scenario(calls[:200], 1)
+
+    results = {}
+    print(f"calibration {scale * 1000:.1f} ms · concurrency {concurrency} for 'mixed'")
+    print(f"{'scenario':<22}{'calls':>7}{'calls/s':>10}{'p50 µs':>9}{'p99 µs':>9}{'KiB/call':>10}")
+    for name, calls in scenarios.items():
+        latencies, elapsed = await run_scenario(calls, concurrency if name == "mixed" else 1)
+        latencies.sort()
+        kib = await allocations(calls)
+        results[name] = {
+            "calls": len(calls),
+            "throughput": len(calls) / elapsed,
+            "p50": percentile(latencies, 0.50),
+            "p99": percentile(latencies, 0.99),
+            "kib_per_call": kib,
+        }
+        r = results[name]
+        print(f"{name:<22}{r['calls']:>7}{r['throughput']:>10.0f}{r['p50'] * 1e6:>9.0f}"
+              f"{r['p99'] * 1e6:>9.0f}{kib:>10.1f}")
+
+    if "--save-baseline" in argv:
+        with open(BASELINE_FILE, "w", encoding="utf-8") as f:
+            json.dump({"calibration": scale, "concurrency": concurrency, "results": results}, f, indent=2)
+        print(f"baseline written to {os.path.relpath(BASELINE_FILE, ROOT)}")
+
+    if "--check" in argv:
+        try:
+            with open(BASELINE_FILE, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        except OSError:
+            raise SystemExit("no baseline; run with --save-baseline first")
+        factor = scale / baseline["calibration"]
+        failed = []
+        for name, r in results.items():
+            base = baseline["results"].get(name)
+            if base is None:
+                continue
+            allowed = base["p99"] * factor * TOLERANCE
+            if r["p99"] > allowed:
+                failed.append(f"{name}: p99 {r['p99'] * 1e6:.0f} µs > allowed {allowed * 1e6:.0f} µs")
+        if failed:
+            print("REGRESSIONS:\n  " + "\n  ".join(failed))
+            return 1
+        print(f"no regressions (tolerance {TOLERANCE}x, machine factor {factor:.2f})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(sys.argv[1:])))
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""Page parsing throughput: BeautifulSoup vs lxml, one process vs a pool.
+
+    python3 benchmarks/bench_parse.py [--corpus DIR] [--workers N] [--check]
+
+--corpus points at pages saved by the scrapers' --save-html option
+(DIR/bestiary/*.html and DIR/rods/*.html). Without it, wiki-shaped pages
+are generated from data/bestiary.json and data/rods.json so the numbers
+are reproducible offline. --check also verifies that both parsers
+produce identical output for every page.
+"""
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from html import escape
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import lxml_parse  # noqa: E402
+from parse_pool import cli_option  # noqa: E402
+from scrape_bestiary_api import parse_page, page_url  # noqa: E402
+from scrape_rods import parse_rod_html  # noqa: E402
+
+# nav/footer chrome so generated pages are roughly wiki-sized
+CHROME = "".join(
+    f'<li class="nav-item"><a href="/wiki/Page_{i}">Page {i}</a></li>' for i in range(300)
+)
+SCRIPT = "<script>var mw = {config: {}};</script><style>.infobox{}</style>"
+
+
+def _row(heading, content):
+    return (f'<div class="infobox-datarow"><p class="data-heading">{escape(heading)}</p>'
+            f'<p class="data-content">{escape(str(content))}</p></div>')
+
+
+def _page(body):
+    return (f"<!DOCTYPE html><html><head><title>x</title>{SCRIPT}</head><body>"
+            f"<ul class=\"nav\">{CHROME}</ul><main>{body}</main>"
+            f"<footer><ul>{CHROME}</ul></footer></body></html>")
+
+
+def fish_page(entry):
+    rows, tab = [], []
+    for k, v in entry.items():
+        if k in ("name", "url") or isinstance(v, (list, dict)):
+            continue
+        if k.startswith(("min.", "avg.", "max.", "true", "base kg", "base c$")):
+            tab.append(_row(k.title(), v))
+        elif k == "value_per_kg_base":
+            rows.append(_row("C$/kg", v))
+        else:
+            rows.append(_row(k.title(), v))
+    tabber = (f'<div class="tabber"><article class="tabber__panel">{"".join(tab[:len(tab) // 2])}</article>'
+              f'<article class="tabber__panel">{"".join(tab[len(tab) // 2:])}</article></div>')
+    return _page(f'<div class="infobox">{"".join(rows)}{tabber}</div>'
+                 "<p>Some article text about this fish.</p>")
+
+
+def rod_page(entry):
+    rows = [_row(k.title(), v) for k, v in entry.items()
+            if k not in ("name", "url") and not isinstance(v, (list, dict))]
+    enchants = "".join(f"<li><b>{escape(e)}</b> – good</li>" for e in entry.get("recommended_enchants", []))
+    return _page(f'<div class="infobox">{"".join(rows)}</div>'
+                 f'<div class="enchanting-themed"><ul>{enchants}</ul></div>')
+
+
+def generated_corpus():
+    import json
+    with open("data/bestiary.json", encoding="utf-8") as f:
+        bestiary = json.load(f)
+    with open("data/rods.json", encoding="utf-8") as f:
+        rods = json.load(f)
+    fish = [(e.get("name", k), fish_page(e)) for k, e in bestiary.items() if isinstance(e, dict)]
+    rod = [(e.get("name", k), rod_page(e)) for k, e in rods.items() if isinstance(e, dict)]
+    return fish, rod
+
+
+def saved_corpus(root):
+    def read(sub):
+        d = os.path.join(root, sub)
+        if not os.path.isdir(d):
+            return []
+        out = []
+        for fn in sorted(os.listdir(d)):
+            if fn.endswith(".html"):
+                with open(os.path.join(d, fn), encoding="utf-8") as f:
+                    out.append((fn[:-5].replace("_", " "), f.read()))
+        return out
+    return read("bestiary"), read("rods")
+
+
+def parse_fish(item, backend):
+    title, html = item
+    return parse_page(html, title, page_url(title), backend)
+
+
+def parse_rod(item, backend):
+    name, html = item
+    return parse_rod_html(html, name, backend)
+
+
+def measure(func, items, workers):
+    start = time.perf_counter()
+    if workers == 1:
+        for item in items:
+            func(item)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(func, items, chunksize=8))
+    return time.perf_counter() - start
+
+
+def _ordered(result):
+    if isinstance(result, tuple):  # parse_infobox: (fish, missing)
+        return list(result[0].items()), result[1]
+    return list(result.items())
+
+
+def check(fish, rods):
+    bad = 0
+    for parse, items in ((parse_fish, fish), (parse_rod, rods)):
+        for item in items:
+            a, b = parse(item, "bs4"), parse(item, "lxml")
+            # compare key order too: it ends up in the JSON files
+            if _ordered(a) != _ordered(b):
+                bad += 1
+                print(f"  mismatch: {item[0]}")
+    print(f"check: {len(fish) + len(rods) - bad}/{len(fish) + len(rods)} pages identical")
+    return bad == 0
+
+
+def main(argv):
+    corpus = cli_option(argv, "--corpus")
+    workers = int(cli_option(argv, "--workers", os.cpu_count() or 1))
+    fish, rods = saved_corpus(corpus) if corpus else generated_corpus()
+    pages = fish + rods
+    size = sum(len(html) for _, html in pages)
+    print(f"{len(fish)} fish + {len(rods)} rod pages, {size / len(pages) / 1024:.0f} KiB avg"
+          f" ({'saved' if corpus else 'generated'})")
+
+    if "--check" in argv and lxml_parse.HAVE_LXML and not check(fish, rods):
+        sys.exit(1)
+
+    backends = ["bs4"] + (["lxml"] if lxml_parse.HAVE_LXML else [])
+    print(f"{'parser':<8}{'workers':>8}{'seconds':>10}{'pages/s':>10}{'per core':>10}")
+    for backend in backends:
+        for n in sorted({1, workers}):
+            elapsed = (measure(partial(parse_fish, backend=backend), fish, n)
+                       + measure(partial(parse_rod, backend=backend), rods, n))
+            rate = len(pages) / elapsed
+            print(f"{backend:<8}{n:>8}{elapsed:>10.2f}{rate:>10.0f}{rate / n:>10.0f}")
+    if not lxml_parse.HAVE_LXML:
+        print("lxml not installed; skipped")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""Reloading a dataset from a scrape diff vs rebuilding it.
+
+    python3 benchmarks/bench_patch.py [--rounds N] [--seed S]
+
+For bestiary and rods, and 1 / 10 / 40 changed entries per scrape, a
+copy of the data file is rewritten N times in a row the way a scraper
+does (journal.write_json with diff=True): a quarter of the changes add
+entries, a quarter remove them and the rest edit names and fields. Each
+time the DataStore patches its Dataset and the search segment is patched
+with it. Reported are the median reload time (patched vs a full build
+of the same file) and the search segment update time (patched vs
+rebuilt). The reload time leaves out the bot's other derived tables
+(fish and rod tables, catch simulator, enchant links), which are
+rebuilt in full either way.
+
+After the last round the patched Dataset and search segment are compared
+with ones built from scratch (from the JSON, not its snapshot). Then a
+diff whose changed entry disagrees with the file is applied with
+verification on: the reload must count a mismatch, serve the file's
+entry and leave no snapshot holding the diff's. Any failure is printed
+and the script exits 1.
+"""
+import asyncio
+import contextlib
+import copy
+import io
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ.setdefault("METRICS_PORT", "0")
+os.environ.setdefault("QUERY_LOG_DB", "")
+
+import bot  # noqa: E402
+from datastore import DataStore, build_dataset, compare_datasets  # noqa: E402
+from journal import write_json  # noqa: E402
+from parse_pool import cli_option  # noqa: E402
+from journal import diff_path  # noqa: E402
+from search import Segment, SearchIndex  # noqa: E402
+from snapshot import read_snapshot  # noqa: E402
+
+DATASETS = ("bestiary", "rods")
+CHANGES = (1, 10, 40)
+
+
+def mutate(data, changes, rng, serial):
+    """A copy of `data` with `changes` entries added, removed or edited."""
+    data = dict(data)
+    keys = list(data)
+    add = remove = changes // 4
+    for key in rng.sample(keys, remove):
+        del data[key]
+    for key in rng.sample(list(data), changes - add - remove):
+        entry = copy.deepcopy(data[key])
+        if rng.random() < 0.5:
+            entry["name"] = f"{entry.get('name', key)} {serial}"
+        else:
+            entry["bench_note"] = f"edit {serial}"
+        data[key] = entry
+    for i, source in enumerate(rng.sample(list(data), add)):
+        entry = copy.deepcopy(data[source])
+        entry["name"] = f"Bench Fish {serial}-{i}"
+        data[f"bench_fish_{serial}_{i}"] = entry
+    return data
+
+
+def by_key(segment, ds):
+    """segment.canonical() keyed by `ds`'s entry keys instead of row ids."""
+    return {ds.index.keys[doc_id]: doc for doc_id, doc in segment.canonical().items()}
+
+
+def scenario(name, changes, rounds, rng, tmp):
+    src = bot.DATA_FILES[name]
+    path = os.path.join(tmp, os.path.basename(src))
+    shutil.copy(src, path)
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    ingest = bot.store.ingest.get(name)
+    store = DataStore({name: path}, bot.app_commands.Choice, {name: ingest} if ingest else None,
+                      verify_every=0)
+    store.load_all()
+    index = SearchIndex()
+    index.update(name, bot.search_docs(store[name]), store[name].signature)
+
+    patch_s, build_s, seg_patch_s, seg_build_s = [], [], [], []
+    for serial in range(rounds):
+        data = mutate(data, changes, rng, f"{changes}.{serial}")
+        # distinct mtimes, as two real scrapes would have
+        time.sleep(0.01)
+        write_json(path, data, diff=True)
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            asyncio.run(store.reload(name))
+        patch_s.append(time.perf_counter() - start)
+        ds = store[name]
+        if ds.patch is None:
+            raise SystemExit(f"{name}: reload was not patched")
+
+        start = time.perf_counter()
+        rebuilt = build_dataset(name, path, store.make_choice, ingest, use_snapshot=False)
+        build_s.append(time.perf_counter() - start)
+
+        patch = ds.patch
+        start = time.perf_counter()
+        docs = zip(patch.fresh, bot.search_docs(ds, patch.fresh))
+        index.patch(name, patch.stale, docs, len(ds.index), ds.signature)
+        seg_patch_s.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        fresh_segment = Segment(bot.search_docs(rebuilt), rebuilt.signature)
+        seg_build_s.append(time.perf_counter() - start)
+
+    problems = compare_datasets(ds, rebuilt)
+    # doc ids are row ids, which a patch numbers differently from a build
+    if by_key(index.segments[name], ds) != by_key(fresh_segment, rebuilt):
+        problems.append("search segment differs")
+    return (
+        statistics.median(patch_s), statistics.median(build_s),
+        statistics.median(seg_patch_s), statistics.median(seg_build_s), problems,
+    )
+
+
+def corrupted_diff(rng, tmp):
+    """Problems with catching a diff that doesn't match its file."""
+    name = "bestiary"
+    src = bot.DATA_FILES[name]
+    path = os.path.join(tmp, "corrupted_" + os.path.basename(src))
+    shutil.copy(src, path)
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    ingest = bot.store.ingest.get(name)
+    store = DataStore({name: path}, bot.app_commands.Choice, {name: ingest}, verify_every=1)
+    store.load_all()
+
+    time.sleep(0.01)
+    data = mutate(data, 4, rng, "corrupt")
+    write_json(path, data, diff=True)
+    with open(diff_path(path), "r", encoding="utf-8") as f:
+        diff = json.load(f)
+    key = next(iter(diff["changed"]))
+    diff["changed"][key]["bench_note"] = "WRONG-FROM-DIFF"
+    with open(diff_path(path), "w", encoding="utf-8") as f:
+        json.dump(diff, f)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(store.reload(name))
+    problems = []
+    if store.reloads["mismatched"] != 1:
+        problems.append(f"corrupted diff: reloads {store.reloads}, expected one mismatch")
+    if dict(store[name].data[key]) != data[key]:
+        problems.append(f"corrupted diff: {key} is served from the diff, not the file")
+    snap = read_snapshot(path)
+    if snap is not None and dict(snap[key]) != data[key]:
+        problems.append(f"corrupted diff: the snapshot holds the diff's {key}")
+    return problems
+
+
+def main(argv):
+    rounds = int(cli_option(argv, "--rounds", "5"))
+    rng = random.Random(int(cli_option(argv, "--seed", "1234")))
+    failed = False
+    print(f"{'dataset':<10} {'changes':>7} {'patch ms':>9} {'build ms':>9}"
+          f" {'search patch':>13} {'search build':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in DATASETS:
+            for changes in CHANGES:
+                patch, build, seg_patch, seg_build, problems = scenario(name, changes, rounds, rng, tmp)
+                print(f"{name:<10} {changes:>7} {patch * 1000:>9.1f} {build * 1000:>9.1f}"
+                      f" {seg_patch * 1000:>11.1f}ms {seg_build * 1000:>11.1f}ms")
+                for problem in problems:
+                    failed = True
+                    print(f"  MISMATCH {problem}")
+        for problem in corrupted_diff(rng, tmp):
+            failed = True
+            print(f"FAIL {problem}")
+    if failed:
+        sys.exit(1)
+    print(f"\npatched datasets match full rebuilds after {rounds} rounds;"
+          " a corrupted diff was caught by verification")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Cold-start load time and memory: json.load vs compiled snapshots.
+
+    python3 benchmarks/bench_snapshot.py [--runs N]
+
+Every measurement runs in a fresh interpreter so nothing is warm. RSS is
+the growth in resident memory caused by loading all data files (Linux
+only; elsewhere it is reported as 0).
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DATA_FILES = [
+    "data/bestiary.json",
+    "data/rods.json",
+    "data/enchants.json",
+    "data/enchant_categories.json",
+]
+
+
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return 0
+
+
+def child(mode):
+    from snapshot import read_snapshot
+
+    before = rss_bytes()
+    start = time.perf_counter()
+    loaded = []
+    for path in DATA_FILES:
+        if mode == "json":
+            with open(path, "r", encoding="utf-8") as f:
+                loaded.append(json.load(f))
+        else:
+            data = read_snapshot(path)
+            if data is None:
+                raise SystemExit(f"snapshot for {path} missing or stale; run snapshot.py")
+            loaded.append(data)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"seconds": elapsed, "rss": rss_bytes() - before}))
+
+
+def run(mode, runs):
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", mode],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        )
+        samples.append(json.loads(out.stdout))
+    return (
+        statistics.median(s["seconds"] for s in samples),
+        statistics.median(s["rss"] for s in samples),
+    )
+
+
+def main(argv):
+    if "--child" in argv:
+        child(argv[argv.index("--child") + 1])
+        return
+    runs = int(argv[argv.index("--runs") + 1]) if "--runs" in argv else 7
+
+    os.chdir(ROOT)
+    subprocess.run([sys.executable, "snapshot.py"], check=True, capture_output=True)
+
+    results = {mode: run(mode, runs) for mode in ("json", "snapshot")}
+    print(f"{'loader':<10} {'load ms':>10} {'rss MiB':>10}")
+    for mode, (secs, rss) in results.items():
+        print(f"{mode:<10} {secs * 1000:>10.1f} {rss / 2**20:>10.1f}")
+    (j_s, j_r), (s_s, s_r) = results["json"], results["snapshot"]
+    print(f"\nsnapshot: {j_s / s_s:.1f}x faster, {(1 - s_r / j_r) * 100 if j_r else 0:.0f}% less memory")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
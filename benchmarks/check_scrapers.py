@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""The scrapers against the stand-in wiki: are incremental runs incremental?
+
+    python3 benchmarks/check_scrapers.py [--port 8781]
+
+Starts benchmarks/wiki_standin.py and runs each scraper (bestiary, rods)
+in a scratch directory, checking the "Pages:" summary it prints:
+
+1. a full scrape parses every page
+2. --incremental right after parses 0 pages: the revision ids are
+   unchanged, and the titles the revisions API doesn't know are answered
+   by a 304 or have the same body
+3. after /standin/touch (new revisions, same bodies) --incremental
+   still parses 0 pages, through 304s and body hashes
+4. after /standin/edit of one page --incremental parses exactly 1
+
+After the last step the output files must hold the same entries as a
+full scrape of the same wiki in a fresh directory.
+
+Then the bestiary scrape is killed (SIGKILL) once part of its pages are
+in the journal, run again with --resume, and its outputs compared with
+a clean scrape the same way; a second stand-in with a per-page latency
+makes sure there is a "partway" to kill it at. Any failure is printed
+and the script exits 1.
+"""
+import json
+import os
+import re
+import signal
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from parse_pool import cli_option  # noqa: E402
+
+SCRAPERS = {
+    # name: (script, output files, a page to edit)
+    "bestiary": ("scrape_bestiary_api.py",
+                 ("data/bestiary.json", "data/locations.json", "data/events.json"), "Standin Fish 5"),
+    "rods": ("scrape_rods.py", ("data/rods.json",), "Standin Rod 3"),
+}
+JOURNAL = os.path.join(".scrape_cache", "bestiary.journal.jsonl")
+RESUMING = re.compile(r"Resuming: (\d+) pages already")
+PAGES = re.compile(r"(\d+) unchanged revisions, (\d+) not modified, (\d+) same content, (\d+) parsed")
+
+
+class StandIn:
+    """wiki_standin.py in a subprocess."""
+
+    def __init__(self, port, *args):
+        self.url = f"http://127.0.0.1:{port}"
+        self.proc = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, "benchmarks", "wiki_standin.py"), "--port", str(port), *args],
+            stdout=subprocess.DEVNULL,
+        )
+        for _ in range(100):
+            try:
+                self.call("GET", "/standin/stats")
+                return
+            except OSError:
+                time.sleep(0.1)
+        self.close()
+        raise SystemExit("wiki stand-in did not start")
+
+    def call(self, method, path):
+        req = urllib.request.Request(self.url + path, method=method)
+        with urllib.request.urlopen(req, timeout=5) as resp:
+            return json.load(resp)
+
+    def close(self):
+        self.proc.terminate()
+        self.proc.wait()
+
+
+def scraper_command(standin, script, *args):
+    env = dict(os.environ, FISCH_WIKI_URL=standin.url, FISCH_WIKI_API=standin.url + "/api.php")
+    return [sys.executable, os.path.join(ROOT, script), "--workers", "2", *args], env
+
+
+def run_scraper(standin, script, workdir, *args):
+    """Run `script` in `workdir`; returns its stdout, raising on failure."""
+    command, env = scraper_command(standin, script, *args)
+    proc = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{script} {' '.join(args)} exited {proc.returncode}:\n{proc.stderr[-2000:]}")
+    return proc.stdout
+
+
+def page_counts(output):
+    """(skipped, not modified, same body, parsed) from a scraper's "Pages:" line."""
+    found = PAGES.search(output)
+    if found is None:
+        raise RuntimeError("no Pages: summary in the scraper's output")
+    return tuple(map(int, found.groups()))
+
+
+def load(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def differing_outputs(a, b, outputs):
+    """Outputs whose entries differ between directories `a` and `b`.
+
+    Entries are compared, not bytes: the bestiary is written in the
+    order pages finished, which varies from run to run."""
+    return [path for path in outputs if load(os.path.join(a, path)) != load(os.path.join(b, path))]
+
+
+def check_incremental(standin, name, tmp):
+    script, outputs, edit = SCRAPERS[name]
+    workdir = os.path.join(tmp, name)
+    os.makedirs(workdir)
+    problems = []
+
+    def expect(step, counts, parsed, unchanged=None):
+        print(f"  {name:<9} {step:<22} skipped {counts[0]:>3}  304 {counts[1]:>3}"
+              f"  same body {counts[2]:>3}  parsed {counts[3]:>3}")
+        if counts[3] != parsed:
+            problems.append(f"{name} {step}: parsed {counts[3]} pages, expected {parsed}")
+        if unchanged is not None and not unchanged(counts):
+            problems.append(f"{name} {step}: unexpected split {counts[:3]}")
+
+    full = page_counts(run_scraper(standin, script, workdir))
+    expect("full", full, sum(full))
+    pages = sum(full)
+    expect("incremental", page_counts(run_scraper(standin, script, workdir, "--incremental")), 0,
+           lambda c: c[0] and sum(c[:3]) == pages)
+    standin.call("POST", "/standin/touch")
+    expect("touched, incremental", page_counts(run_scraper(standin, script, workdir, "--incremental")), 0,
+           lambda c: c[0] == 0 and c[1] and c[2] and sum(c[:3]) == pages)
+    standin.call("POST", "/standin/edit?" + urllib.parse.urlencode({"title": edit}))
+    expect("edited, incremental", page_counts(run_scraper(standin, script, workdir, "--incremental")), 1)
+
+    clean = os.path.join(tmp, name + "-clean")
+    os.makedirs(clean)
+    run_scraper(standin, script, clean)
+    for path in differing_outputs(workdir, clean, outputs):
+        problems.append(f"{name}: {path} differs from a full scrape")
+    return problems
+
+
+def journal_lines(workdir):
+    try:
+        with open(os.path.join(workdir, JOURNAL), "rb") as f:
+            return sum(1 for _ in f)
+    except OSError:
+        return 0
+
+
+def check_resume(standin, tmp):
+    script, outputs, _ = SCRAPERS["bestiary"]
+    workdir = os.path.join(tmp, "resume")
+    os.makedirs(workdir)
+    pages = len(standin.call("GET", "/standin/titles")["bestiary"])
+    command, env = scraper_command(standin, script)
+    # its own session, so the kill takes the parse workers down with it
+    proc = subprocess.Popen(command, cwd=workdir, env=env, start_new_session=True,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    while journal_lines(workdir) < pages // 3 and proc.poll() is None:
+        time.sleep(0.02)
+    if proc.poll() is not None:
+        return [f"resume: the scrape finished before it could be killed (exit {proc.returncode})"]
+    os.killpg(proc.pid, signal.SIGKILL)
+    proc.wait()
+    killed_at = journal_lines(workdir)
+
+    output = run_scraper(standin, script, workdir, "--resume")
+    resumed = RESUMING.search(output)
+    done = int(resumed.group(1)) if resumed else 0
+    print(f"  bestiary  killed after {killed_at} of {pages} pages, resumed with {done} already done")
+    problems = []
+    if not 0 < done < pages:
+        problems.append(f"resume: {done} of {pages} pages were taken from the journal")
+
+    clean = os.path.join(tmp, "resume-clean")
+    os.makedirs(clean)
+    run_scraper(standin, script, clean)
+    for path in differing_outputs(workdir, clean, outputs):
+        problems.append(f"resume: {path} differs from a full scrape")
+    return problems
+
+
+def main(argv):
+    port = int(cli_option(argv, "--port", 8781))
+    problems = []
+    tmp = tempfile.mkdtemp(prefix="check_scrapers.")
+    try:
+        standin = StandIn(port)
+        try:
+            for name in SCRAPERS:
+                problems += check_incremental(standin, name, tmp)
+        finally:
+            standin.close()
+        slow = StandIn(port + 1, "--latency", "0.05")
+        try:
+            problems += check_resume(slow, tmp)
+        finally:
+            slow.close()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    for problem in problems:
+        print(f"FAIL {problem}")
+    if problems:
+        sys.exit(1)
+    print("\nincremental runs only parsed the pages that changed;"
+          " a killed and resumed scrape matches a clean one")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Local stand-in for Discord's REST API and gateway, for running the bot offline.
+
+    python3 benchmarks/gateway_standin.py [--port 8780] [--shards 4]
+
+Then start the bot (or shards.py) with
+
+    DISCORD_TOKEN=x
+    DISCORD_API_URL=http://127.0.0.1:8780/api/v10
+    DISCORD_GATEWAY_URL=ws://127.0.0.1:8780/gateway
+
+It implements only what login, sharded IDENTIFY, heartbeats and command
+sync need. GET /standin/stats shows which shards are connected, and
+POST /standin/drop?shard=N closes that shard's socket to exercise
+reconnects.
+"""
+import json
+import os
+import sys
+import time
+
+from aiohttp import web, WSMsgType
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from parse_pool import cli_option  # noqa: E402
+
+APP_ID = "100000000000000001"
+OWNER_ID = "100000000000000002"
+HEARTBEAT_MS = 5000
+
+
+def _json(data):
+    # discord.py only decodes an exact "application/json" content type
+    return web.Response(body=json.dumps(data).encode(), headers={"Content-Type": "application/json"})
+
+
+class StandIn:
+    def __init__(self, port, shards):
+        self.port = port
+        self.shards = shards
+        self.sockets = {}       # shard id -> websocket
+        self.identifies = []    # (time, shard id, shard count)
+        self.syncs = 0
+        self.heartbeats = 0
+
+    # ----- REST -----
+    async def me(self, request):
+        return _json({"id": APP_ID, "username": "stand-in", "discriminator": "0",
+                                  "avatar": None, "bot": True, "global_name": None})
+
+    async def application(self, request):
+        return _json({
+            "id": APP_ID, "name": "stand-in", "description": "", "icon": None,
+            "bot_public": False, "bot_require_code_grant": False, "verify_key": "0",
+            "owner": {"id": OWNER_ID, "username": "owner", "discriminator": "0", "avatar": None},
+            "flags": 0,
+        })
+
+    async def gateway_bot(self, request):
+        return _json({
+            "url": f"ws://127.0.0.1:{self.port}/gateway",
+            "shards": self.shards,
+            "session_start_limit": {"total": 1000, "remaining": 1000,
+                                    "reset_after": 0, "max_concurrency": 1},
+        })
+
+    async def sync_commands(self, request):
+        self.syncs += 1
+        commands = await request.json()
+        for i, cmd in enumerate(commands):
+            cmd.setdefault("type", 1)
+            cmd.update(id=str(200000000000000000 + i), application_id=APP_ID, version="1")
+        return _json(commands)
+
+    async def stats(self, request):
+        return _json({
+            "connected": sorted(self.sockets),
+            "identifies": len(self.identifies),
+            "identified_shards": sorted({s for _, s, _ in self.identifies}),
+            "heartbeats": self.heartbeats,
+            "syncs": self.syncs,
+        })
+
+    async def drop(self, request):
+        ws = self.sockets.get(int(request.query["shard"]))
+        if ws is not None:
+            await ws.close(code=4000, message=b"dropped by stand-in")
+        return _json({"dropped": ws is not None})
+
+    # ----- gateway -----
+    async def gateway(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.send_str(json.dumps({"op": 10, "d": {"heartbeat_interval": HEARTBEAT_MS}}))
+        shard_id = None
+        seq = 0
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                continue
+            payload = json.loads(msg.data)
+            op = payload.get("op")
+            if op == 1:
+                self.heartbeats += 1
+                await ws.send_str(json.dumps({"op": 11}))
+            elif op in (2, 6):  # IDENTIFY / RESUME: start a fresh session either way
+                d = payload["d"]
+                shard_id, shard_count = d.get("shard", [0, 1])
+                self.identifies.append((time.time(), shard_id, shard_count))
+                self.sockets[shard_id] = ws
+                seq += 1
+                await ws.send_str(json.dumps({"op": 0, "t": "READY", "s": seq, "d": {
+                    "v": 10,
+                    "user": {"id": APP_ID, "username": "stand-in", "discriminator": "0",
+                             "avatar": None, "bot": True},
+                    "guilds": [],
+                    "session_id": f"session-{shard_id}-{seq}",
+                    "resume_gateway_url": f"ws://127.0.0.1:{self.port}/gateway",
+                    "shard": [shard_id, shard_count],
+                    "application": {"id": APP_ID, "flags": 0},
+                }}))
+        if shard_id is not None and self.sockets.get(shard_id) is ws:
+            del self.sockets[shard_id]
+        return ws
+
+    def app(self):
+        app = web.Application()
+        api = "/api/v10"
+        app.router.add_get(f"{api}/users/@me", self.me)
+        app.router.add_get(f"{api}/oauth2/applications/@me", self.application)
+        app.router.add_get(f"{api}/gateway/bot", self.gateway_bot)
+        app.router.add_get(f"{api}/gateway", self.gateway_bot)
+        app.router.add_put(f"{api}/applications/{{app}}/commands", self.sync_commands)
+        app.router.add_put(f"{api}/applications/{{app}}/guilds/{{guild}}/commands", self.sync_commands)
+        app.router.add_get("/gateway", self.gateway)
+        app.router.add_get("/standin/stats", self.stats)
+        app.router.add_post("/standin/drop", self.drop)
+        return app
+
+
+if __name__ == "__main__":
+    port = int(cli_option(sys.argv, "--port", 8780))
+    shards = int(cli_option(sys.argv, "--shards", 4))
+    print(f"gateway stand-in on :{port} recommending {shards} shards")
+    web.run_app(StandIn(port, shards).app(), host="127.0.0.1", port=port, print=None)
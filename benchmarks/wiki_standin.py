@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Fisch wiki, for running the scrapers offline.
+
+    python3 benchmarks/wiki_standin.py [--port 8781] [--fish 40] [--rods 15] [--latency 0]
+
+Then run a scraper with
+
+    FISCH_WIKI_URL=http://127.0.0.1:8781
+
+It serves the fish list (/wiki/Fish), the rod list (/wiki/Fishing_Rods),
+an infobox page for every fish, location, event and rod (plus a few
+pages the bestiary scraper should skip) and the MediaWiki revisions API
+(/api.php). Pages carry an ETag of their body and answer a matching
+If-None-Match with 304, except every third page, which sends no
+validators, so an unchanged page can only be recognised by its body
+hash. Every seventh title is unknown to the revisions API, so it is
+fetched conditionally on every run.
+
+POST /standin/touch gives every page a new revision with the same body,
+POST /standin/edit?title=T gives one page a new revision and a new body,
+GET /standin/titles lists each scraper's pages and GET /standin/stats
+counts requests by kind. `--latency` delays each page, so a run can be
+interrupted partway.
+"""
+import asyncio
+import hashlib
+import os
+import sys
+from collections import Counter
+
+from aiohttp import web
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from parse_pool import cli_option  # noqa: E402
+
+RARITIES = ("Common", "Uncommon", "Unusual", "Rare", "Legendary", "Mythical")
+SEAS = ("First Sea", "Second Sea")
+
+
+def _row(heading, content):
+    return (f'<div class="infobox-datarow"><p class="data-heading">{heading}</p>'
+            f'<p class="data-content">{content}</p></div>')
+
+
+def _page(title, rows, extra=""):
+    infobox = f'<div class="infobox">{"".join(_row(h, c) for h, c in rows)}</div>' if rows else ""
+    return f"<html><head><title>{title}</title></head><body><h1>{title}</h1>{infobox}{extra}</body></html>"
+
+
+class WikiPage:
+    __slots__ = ("title", "kind", "n", "revid", "edits", "etag", "in_api")
+
+    def __init__(self, title, kind, n, revid):
+        self.title = title
+        self.kind = kind
+        self.n = n
+        self.revid = revid
+        self.edits = 0
+        self.etag = n % 3 != 2
+        self.in_api = n % 7 != 6
+
+    def html(self):
+        n, edits = self.n, self.edits
+        if self.kind == "fish":
+            return _page(self.title, [
+                ("Rarity", RARITIES[n % len(RARITIES)]),
+                ("Location", f"Standin Location {n % 6 + 1}"),
+                ("XP", str(10 + n + edits)),
+                ("Base kg", f"{1 + n % 9}.5"),
+                ("C$/kg", str(3 + n % 5)),
+                ("Base C$", str(20 + 3 * n)),
+            ])
+        if self.kind == "location":
+            return _page(self.title, [("Sea", SEAS[n % 2]), ("GPS", f"{n * 100}, 135, {edits}")])
+        if self.kind == "event":
+            return _page(self.title, [("Type", "Seasonal"), ("Duration", f"{10 + edits} minutes")])
+        if self.kind == "rod":
+            enchants = "".join(f"<li>Standin Enchant {i}</li>" for i in range(1 + n % 3))
+            return _page(self.title, [
+                ("Lure Speed", f"{n * 5 % 60}%"),
+                ("Luck", f"{n * 10 + edits}%"),
+                ("Control", f"0.{n % 4}"),
+                ("Resilience", f"{n * 3 % 40}%"),
+                ("Max Kg", f"{1000 * n:,} kg"),
+                ("Cost", f"{n * 1500} C$"),
+            ], f'<div class="enchanting-themed"><ul>{enchants}</ul></div>')
+        return _page(self.title, [], f"<p>Bait and other items. Revision {edits}.</p>")
+
+
+class WikiStandIn:
+    def __init__(self, fish=40, rods=15, latency=0.0):
+        self.latency = latency
+        self.pages = {}
+        self.stats = Counter()
+        self._revid = 1000
+        kinds = {"fish": ("Standin Fish", fish), "location": ("Standin Location", 6),
+                 "event": ("Standin Event", 4), "other": ("Standin Bait", 3),
+                 "rod": ("Standin Rod", rods)}
+        for kind, (prefix, count) in kinds.items():
+            for n in range(1, count + 1):
+                self._add(WikiPage(f"{prefix} {n}", kind, n, self._next_revid()))
+
+    def _next_revid(self):
+        self._revid += 1
+        return self._revid
+
+    def _add(self, page):
+        self.pages[page.title] = page
+
+    def _titles(self, *kinds):
+        return [p.title for p in self.pages.values() if p.kind in kinds]
+
+    @staticmethod
+    def _link(title):
+        return f'<a href="/wiki/{title.replace(" ", "_")}">{title}</a>'
+
+    # ----- wiki pages -----
+    async def fish_list(self, request):
+        self.stats["list"] += 1
+        links = "".join(f"<li>{self._link(t)}</li>"
+                        for t in self._titles("fish", "location", "event", "other"))
+        return web.Response(text=_page("Fish", [], f"<ul>{links}</ul>"), content_type="text/html")
+
+    async def rod_list(self, request):
+        self.stats["list"] += 1
+        rows = "".join(f"<tr><td>{self._link(t)}</td><td>{self.pages[t].n * 1500}</td></tr>"
+                       for t in self._titles("rod"))
+        table = f"<table><tr><th>Name</th><th>Cost</th></tr>{rows}</table>"
+        return web.Response(text=_page("Fishing Rods", [], table), content_type="text/html")
+
+    async def page(self, request):
+        page = self.pages.get(request.match_info["title"].replace("_", " "))
+        if page is None:
+            self.stats["page_404"] += 1
+            return web.Response(status=404)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        body = page.html()
+        headers = {}
+        if page.etag:
+            headers["ETag"] = '"' + hashlib.sha1(body.encode()).hexdigest()[:16] + '"'
+            if request.headers.get("If-None-Match") == headers["ETag"]:
+                self.stats["page_304"] += 1
+                return web.Response(status=304, headers=headers)
+        self.stats["page_200"] += 1
+        return web.Response(text=body, content_type="text/html", headers=headers)
+
+    # ----- MediaWiki API -----
+    async def api(self, request):
+        self.stats["api"] += 1
+        q = request.query
+        if q.get("action") != "query" or q.get("prop") != "revisions":
+            return web.json_response({"error": {"code": "badvalue"}}, status=400)
+        normalized, pages = [], []
+        for asked in q.get("titles", "").split("|"):
+            title = asked.replace("_", " ")
+            title = title[:1].upper() + title[1:]
+            if title != asked:
+                normalized.append({"from": asked, "to": title})
+            page = self.pages.get(title)
+            if page is None or not page.in_api:
+                pages.append({"title": title, "missing": True})
+            else:
+                pages.append({"title": title, "revisions": [{"revid": page.revid}]})
+        query = {"pages": pages}
+        if normalized:
+            query["normalized"] = normalized
+        return web.json_response({"batchcomplete": True, "query": query})
+
+    # ----- control -----
+    async def touch(self, request):
+        for page in self.pages.values():
+            page.revid = self._next_revid()
+        return web.json_response({"touched": len(self.pages)})
+
+    async def edit(self, request):
+        page = self.pages.get(request.query.get("title", ""))
+        if page is None:
+            return web.json_response({"error": "no such page"}, status=404)
+        page.edits += 1
+        page.revid = self._next_revid()
+        return web.json_response({"title": page.title, "revid": page.revid})
+
+    async def titles(self, request):
+        return web.json_response({
+            "bestiary": self._titles("fish", "location", "event", "other"),
+            "rods": self._titles("rod"),
+        })
+
+    async def get_stats(self, request):
+        return web.json_response({"pages": len(self.pages), **self.stats})
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get("/wiki/Fish", self.fish_list)
+        app.router.add_get("/wiki/Fishing_Rods", self.rod_list)
+        app.router.add_get("/wiki/{title}", self.page)
+        app.router.add_get("/api.php", self.api)
+        app.router.add_post("/standin/touch", self.touch)
+        app.router.add_post("/standin/edit", self.edit)
+        app.router.add_get("/standin/titles", self.titles)
+        app.router.add_get("/standin/stats", self.get_stats)
+        return app
+
+
+if __name__ == "__main__":
+    port = int(cli_option(sys.argv, "--port", 8781))
+    standin = WikiStandIn(
+        fish=int(cli_option(sys.argv, "--fish", 40)),
+        rods=int(cli_option(sys.argv, "--rods", 15)),
+        latency=float(cli_option(sys.argv, "--latency", 0)),
+    )
+    print(f"wiki stand-in on :{port} with {len(standin.pages)} pages")
+    web.run_app(standin.app(), host="127.0.0.1", port=port, print=None)
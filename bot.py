@@ -1,189 +1,629 @@
 #!/usr/bin/env python3
+import asyncio
+import functools
+import hashlib
 import json
+import math
+import random
+import time
 import discord
 from discord.ext import commands
 from discord import app_commands
 import os
 import urllib.parse
 
+from admission import Admission
+from cache import Coalescer, LRUCache
+from crossref import EnchantLinks
+from datastore import DataStore
+from fishtable import FishTable, FILTERS, SORTS
+from journal import write_json
+from lookup import normalize
+from metrics import Metrics, fmt_seconds, stamp_received
+from querylog import QueryLog
+from records import ingest_bestiary, fish_by_place, fmt_number
+from rodtable import RodTable, STATS, fmt_stat, fmt_delta
+from search import Segment, SearchIndex, tokenize
+from simulate import CatchSimulator
+
+# The "imports" startup phase: CPU time spent so far, i.e. starting the
+# interpreter and importing the above (most of it discord.py itself).
+# STARTED is taken after the imports so they can stay at the top, and
+# time-to-ready adds this phase back in.
+IMPORT_SECONDS = time.process_time()
+STARTED = time.perf_counter()
+
 TOKEN = os.getenv("DISCORD_TOKEN")
-if TOKEN is None:
-    raise ValueError("DISCORD_TOKEN environment variable not found.")
 
 GUILD_ID = None
+# ADMISSION_CONTROL=0 serves every interaction (benchmarks drive one fake
+# user far past any sane rate)
+ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "1") != "0"
+
+# SQLite file counting which entries are looked up (QUERY_LOG_DB="" turns
+# it off); the most popular ones are pre-built at startup and on reload
+QUERY_LOG_DB = os.getenv("QUERY_LOG_DB", "query_log.sqlite3")
+WARM_POPULAR = 50  # per dataset
+
+# Prometheus-style /metrics endpoint; METRICS_PORT=0 turns it off
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+
+# Sharding: unset runs one unsharded Bot; SHARD_COUNT=auto (or a number)
+# runs an AutoShardedBot, optionally limited to SHARD_IDS="0,1". shards.py
+# uses this to spread shards over several worker processes.
+SHARD_COUNT = os.getenv("SHARD_COUNT")
+SHARD_IDS = os.getenv("SHARD_IDS")
+# only one process of a sharded deployment should sync the command tree
+SYNC_COMMANDS = os.getenv("SYNC_COMMANDS", "1") != "0"
+# hash of the last synced command tree; unchanged trees aren't re-synced
+# unless FORCE_SYNC=1
+SYNC_STATE_FILE = ".command_sync.json"
+FORCE_SYNC = os.getenv("FORCE_SYNC", "0") != "0"
+
+# overridable so the bot can be pointed at a local gateway stand-in
+if os.getenv("DISCORD_API_URL"):
+    discord.http.Route.BASE = os.getenv("DISCORD_API_URL")
+if os.getenv("DISCORD_GATEWAY_URL"):
+    import yarl
+    discord.gateway.DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(os.getenv("DISCORD_GATEWAY_URL"))
+
+
+class ReceiptTree(app_commands.CommandTree):
+    """Stamps each interaction as it arrives, before its handler task
+    waits for the loop, so admission control can tell how long it waited."""
+
+    def _from_interaction(self, interaction):
+        stamp_received(interaction)
+        super()._from_interaction(interaction)
+
 
 intents = discord.Intents.default()
-bot = commands.Bot(command_prefix="!", intents=intents)
+if SHARD_COUNT:
+    bot = commands.AutoShardedBot(
+        command_prefix="!",
+        intents=intents,
+        tree_cls=ReceiptTree,
+        shard_count=None if SHARD_COUNT == "auto" else int(SHARD_COUNT),
+        shard_ids=[int(i) for i in SHARD_IDS.split(",")] if SHARD_IDS else None,
+    )
+else:
+    bot = commands.Bot(command_prefix="!", intents=intents, tree_cls=ReceiptTree)
 
 
 # ---------------------------------------------------------
-# JSON LOADER
+# DATA
 # ---------------------------------------------------------
-def load_json(path):
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return {}
+# Datasets (and their lookup/autocomplete indexes) live in a DataStore,
+# which swaps in a freshly built copy whenever a file changes on disk.
+# Commands grab the dataset once and use only that object.
+#
+# Nothing is loaded at import: setup_hook loads the datasets in the
+# background once the bot has logged in, and until then the commands
+# answer "warming up" (guarded). Call load_datasets() to load up front.
+DATA_FILES = {
+    "bestiary": "data/bestiary.json",
+    "rods": "data/rods.json",
+    "enchants": "data/enchants.json",
+    "categories": "data/enchant_categories.json",
+    "locations": "data/locations.json",
+    "events": "data/events.json",
+}
+DATA_POLL_SECONDS = 5.0
+# a reload patched from a scrape diff is checked against a full rebuild
+# the first time and every N-th time after that (0: never)
+PATCH_VERIFY_EVERY = int(os.getenv("PATCH_VERIFY_EVERY", "10"))
+
+store = DataStore(DATA_FILES, app_commands.Choice, ingest={"bestiary": ingest_bestiary},
+                  verify_every=PATCH_VERIFY_EVERY)
+# set once the datasets are loaded *and* their tables built; store.loaded
+# alone would let /search run on an empty index
+data_ready = asyncio.Event()
+
+
+# ---------------------------------------------------------
+# METRICS
+# ---------------------------------------------------------
+# Every command and autocomplete handler is wrapped with metrics.timed();
+# lookups, embed builds and Discord sends are timed where they happen.
+metrics = Metrics()
+
+
+# Identical lookups within LOOKUP_TTL_SECONDS (event bursts: everyone
+# asking for the same fish) share one result, "not found" included.
+# Keys start with the dataset name so a reload can drop its results.
+LOOKUP_TTL_SECONDS = 30.0
+lookups = Coalescer(ttl=LOOKUP_TTL_SECONDS)
+
+
+# Every resolved name is counted here; see querylog.py
+querylog = QueryLog(QUERY_LOG_DB or None)
+
+
+async def coalesced_lookup(ds, query: str):
+    """ds.index.resolve_id of a normalized query, coalesced and timed."""
+    def compute():
+        with metrics.timer("lookup_seconds", dataset=ds.name):
+            return ds.index.resolve_id(query)
+
+    return await lookups.get((ds.name, query), compute)
+
+
+async def resolve(ds, name: str):
+    """coalesced_lookup(), counted as a hit or miss and logged.
+
+    Autocomplete choices carry the entry key as their value, so a name
+    equal to the key it resolves to was picked from the list.
+    """
+    query = normalize(name)
+    idx, suggestions = await coalesced_lookup(ds, query)
+    metrics.inc("lookup_total", dataset=ds.name, result="miss" if idx is None else "hit")
+    entry = None if idx is None else ds.index.keys[idx]
+    querylog.record(ds.name, query, entry, "autocomplete" if name == entry else "typed")
+    return idx, suggestions
+
+
+async def respond(interaction, *args, **kwargs):
+    """interaction.response.send_message, timed."""
+    with metrics.timer("send_seconds"):
+        await interaction.response.send_message(*args, **kwargs)
+
+
+WARMING_UP = "⏳ The bot just started and is still loading its data. Try again in a few seconds."
+SLOW_DOWN = "⏳ You're sending commands faster than I can answer. Try again in a few seconds."
+TOO_LATE = "⏳ I'm running behind and couldn't get to that in time. Please try again."
+
+# Sheds stale or excess interactions, autocomplete first (see admission.py)
+admission = Admission(loop_lag=lambda: metrics.last_loop_lag)
+
+
+def guarded(kind):
+    """Decorator for "command" and "autocomplete" handlers.
+
+    Interactions admission control sheds are counted and answered
+    cheaply: autocompletes with no choices, rate-limited commands with
+    SLOW_DOWN, expired commands with TOO_LATE if Discord still takes
+    the reply. Until the datasets are
+    loaded and their tables built (data_ready), commands answer
+    WARMING_UP and autocompletes offer nothing.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(interaction, *args, **kwargs):
+            reason = admission.check(kind, interaction) if ADMISSION_CONTROL else None
+            if reason is not None:
+                metrics.inc("admission_total", kind=kind, result="shed", reason=reason)
+                if kind == "autocomplete":
+                    return []
+                if reason == "user_rate":
+                    await respond(interaction, SLOW_DOWN, ephemeral=True)
+                elif reason == "expired":
+                    try:
+                        await respond(interaction, TOO_LATE, ephemeral=True)
+                    except discord.HTTPException:
+                        pass  # past Discord's deadline after all
+                return
+            metrics.inc("admission_total", kind=kind, result="served")
+
+            if not data_ready.is_set():
+                metrics.inc("warming_up_total", kind=kind)
+                if kind == "autocomplete":
+                    return []
+                await respond(interaction, WARMING_UP, ephemeral=True)
+                return
+
+            return await fn(interaction, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def not_found(message: str, suggestions) -> str:
+    """Append a "did you mean" list to a not-found message."""
+    if suggestions:
+        names = ", ".join(f"**{s}**" for s in suggestions)
+        message += f"\nDid you mean: {names}?"
+    return message
+
+
+def bullet_list(items, limit=1024) -> str:
+    """Bulleted lines, cut off with "…and N more" to fit an embed field."""
+    lines = []
+    used = 0
+    for i, item in enumerate(items):
+        line = f"• {item}"
+        # leave room for the "and N more" line
+        if used + len(line) + 1 > limit - 20:
+            lines.append(f"…and {len(items) - i} more")
+            break
+        lines.append(line)
+        used += len(line) + 1
+    return "\n".join(lines)
+
+
+def field_chunks(lines, limit=1024):
+    """Join lines into as few embed field values as fit, each <= limit."""
+    chunk = []
+    used = 0
+    for line in lines:
+        if chunk and used + len(line) + 1 > limit:
+            yield "\n".join(chunk)
+            chunk, used = [], 0
+        chunk.append(line[:limit])
+        used += len(line) + 1
+    if chunk:
+        yield "\n".join(chunk)
+
+
+def shorten(text: str, width=70) -> str:
+    return text if len(text) <= width else text[:width - 1].rstrip() + "…"
+
+
+# Clean field label for embed titles
+def clean_label(label: str) -> str:
+    label = label.replace("_", " ")
+    label = label.title()
+    return label
+
 
+RESULTS_PAGE_SIZE = 10
 
-# Load JSON files
-bestiary_data = load_json("data/bestiary.json")
-rods_data = load_json("data/rods.json")
-enchants_data = load_json("data/enchants.json")
-categories_data = load_json("data/enchant_categories.json")
+
+class PagedView(discord.ui.View):
+    """Prev/Next pages over one result list; subclasses format each row."""
+
+    title = "Results"
+    noun = "results"
+    color = discord.Color.teal()
+
+    def __init__(self, user_id, rows, summary):
+        super().__init__(timeout=300)
+        self.user_id = user_id
+        self.rows = rows
+        self.summary = summary
+        self.page = 0
+        self.pages = (len(rows) - 1) // RESULTS_PAGE_SIZE + 1
+        self._update_buttons()
+
+    def line(self, pos, row) -> str:
+        raise NotImplementedError
+
+    def _update_buttons(self):
+        self.prev_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= self.pages - 1
+
+    def embed(self):
+        start = self.page * RESULTS_PAGE_SIZE
+        lines = [
+            self.line(pos, row)
+            for pos, row in enumerate(self.rows[start:start + RESULTS_PAGE_SIZE], start + 1)
+        ]
+        embed = discord.Embed(
+            title=self.title,
+            description=self.summary + "\n\n" + "\n".join(lines),
+            color=self.color
+        )
+        embed.set_footer(text=f"Page {self.page + 1}/{self.pages} · {len(self.rows)} {self.noun}")
+        return embed
+
+    async def interaction_check(self, interaction) -> bool:
+        return interaction.user.id == self.user_id
+
+    @discord.ui.button(label="◀ Prev", style=discord.ButtonStyle.secondary)
+    async def prev_page(self, interaction, button):
+        self.page -= 1
+        self._update_buttons()
+        await interaction.response.edit_message(embed=self.embed(), view=self)
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction, button):
+        self.page += 1
+        self._update_buttons()
+        await interaction.response.edit_message(embed=self.embed(), view=self)
 
 
 # ---------------------------------------------------------
-# NORMALIZATION UTILITIES
+# EMBED CACHE
 # ---------------------------------------------------------
-def normalize(s: str) -> str:
-    """Normalize for fuzzy matching."""
-    if not isinstance(s, str):
-        return ""
-    s = urllib.parse.unquote(s)
-    s = s.replace("’", "'")
-    s = s.replace("`", "'")
-    return s.lower().strip()
+# Rendered embeds keyed by (dataset, entry key). Embeds are never mutated
+# after they are built, so the same object can be sent any number of times.
+EMBED_CACHE_SIZE = 512
+embed_cache = LRUCache(EMBED_CACHE_SIZE)
 
 
-def match_entry(name: str, dataset: dict, name_field="name"):
-    """Fuzzy match against both JSON keys and their 'name' field."""
-    target = normalize(name)
+def cached_embed(ds, idx: int, builder):
+    """Embed for entry `idx` of `ds`, built with builder(key, entry) on a miss.
 
-    # direct key match
-    for key, data in dataset.items():
-        if normalize(key) == target:
-            return data
+    Datasets with typed records pass the record instead of the raw entry.
+    """
+    embed = embed_cache.get((ds.name, ds.index.keys[idx]))
+    if embed is None:
+        embed = render_embed(ds, idx, builder)
+    return embed
 
-    # direct name-field match
-    for key, data in dataset.items():
-        disp = data.get(name_field, "")
-        if normalize(disp) == target:
-            return data
 
-    # single partial match fallback
-    candidates = []
-    for key, data in dataset.items():
-        if target in normalize(key) or target in normalize(data.get(name_field, "")):
-            candidates.append(data)
+def embed_item(ds, idx: int):
+    """What entry `idx`'s embed is built from: its record, else its entry."""
+    return ds.records[idx] if ds.records is not None else ds.index.entries[idx]
 
-    if len(candidates) == 1:
-        return candidates[0]
 
-    return None
+def render_embed(ds, idx: int, builder):
+    """Build entry `idx`'s embed and cache it (no cache lookup, so warming
+    doesn't count as misses)."""
+    with metrics.timer("embed_build_seconds", dataset=ds.name):
+        embed = builder(ds.index.keys[idx], embed_item(ds, idx))
+    embed_cache.put((ds.name, ds.index.keys[idx]), embed)
+    return embed
 
 
-# Clean field label for embed titles
-def clean_label(label: str) -> str:
-    label = label.replace("_", " ")
-    label = label.title()
-    return label
+metrics.gauge("embed_cache_hit_ratio", embed_cache.hit_ratio, "Share of embed lookups served from cache")
+metrics.gauge("embed_cache_entries", lambda: len(embed_cache))
+metrics.gauge("event_loop_lag_last_seconds", lambda: metrics.last_loop_lag)
+metrics.gauge("lookup_coalesced_ratio", lookups.saved_ratio, "Share of lookups answered from a cached or in-flight result")
+metrics.gauge("lookup_coalesced_saved_seconds", lambda: lookups.saved_seconds, "Lookup time not spent thanks to coalescing")
+metrics.gauge("lookup_coalesce_entries", lambda: len(lookups))
+for _how in ("patched", "rebuilt", "verified", "mismatched"):
+    metrics.gauge(f"data_reloads_{_how}", functools.partial(store.reloads.get, _how))
+metrics.gauge("query_log_recorded", lambda: querylog.recorded, "Lookups counted by the query log")
+metrics.gauge("query_log_dropped", lambda: querylog.dropped, "Lookups not logged because the write queue was full")
+metrics.gauge("query_log_pending", lambda: len(querylog), "Distinct queries waiting to be written")
 
 
 # ---------------------------------------------------------
 # BESTIARY
 # ---------------------------------------------------------
-@bot.tree.command(name="bestiary", description="Get info about a Fisch fish.")
-@app_commands.describe(name="Name of the fish")
-async def bestiary(interaction, name: str):
-
-    entry = match_entry(name, bestiary_data)
-    if not entry:
-        await interaction.response.send_message(
-            f"❌ Could not find a fish named **{name}**.",
-            ephemeral=True
-        )
-        return
-
-    wiki_name = entry.get("name", name).replace(" ", "_")
+def build_bestiary_embed(entry_key, fish):
+    wiki_name = fish.name.replace(" ", "_")
     embed = discord.Embed(
-        title=entry.get("name", name.title()),
+        title=fish.name,
         url=f"https://fischipedia.org/wiki/{wiki_name}",
         color=discord.Color.teal()
     )
 
     # static fields
-    for key, label in [
-        ("rarity", "Rarity"),
-        ("location", "Location"),
-        ("resilience", "Resilience"),
-        ("progress_speed", "Progress Speed"),
-        ("progress speed", "Progress Speed"),
-        ("bait", "Preferred Bait")
+    for label, value in [
+        ("Rarity", fish.rarity_text),
+        ("Location", fish.location),
+        ("Resilience", fish.resilience_text),
+        ("Progress Speed", fish.progress_speed_text),
+        ("Preferred Bait", fish.bait)
     ]:
-        if entry.get(key):
-            embed.add_field(name=label, value=entry[key], inline=False)
+        if value:
+            embed.add_field(name=label, value=value, inline=False)
 
     # conditions
     conds = []
-    for key in ("time", "weather", "season"):
-        if entry.get(key):
-            conds.append(f"**{key.title()}:** {entry[key]}")
+    for label, value in (("Time", fish.time), ("Weather", fish.weather), ("Season", fish.season)):
+        if value:
+            conds.append(f"**{label}:** {value}")
     if conds:
         embed.add_field(name="Conditions", value="\n".join(conds), inline=False)
 
     # weights
     w_lines = []
-    for key, label in [
-        ("min_weight", "Min"),
-        ("avg_weight", "Avg"),
-        ("max_weight", "Max"),
-        ("min. kg", "Min"),
-        ("avg. kg", "Avg"),
-        ("base kg", "Base"),
-        ("max. kg", "Max")
+    for label, value in [
+        ("Min", fish.min_kg),
+        ("Avg", fish.avg_kg),
+        ("Base", fish.base_kg),
+        ("Max", fish.max_kg)
     ]:
-        if entry.get(key):
-            w_lines.append(f"{label}: {entry[key]} kg")
+        if value is not None:
+            w_lines.append(f"{label}: {fmt_number(value)} kg")
     if w_lines:
         embed.add_field(name="Weight (kg)", value="\n".join(w_lines), inline=False)
 
     # value
     v_lines = []
-    for key, label in [
-        ("value_per_kg_base", "C$/kg (base)"),
-        ("base c$", "Base C$"),
-        ("avg. c$", "Avg C$"),
-        ("max. c$", "Max C$")
+    for label, value in [
+        ("C$/kg (base)", fish.value_per_kg),
+        ("Base C$", fish.base_value),
+        ("Avg C$", fish.avg_value),
+        ("Max C$", fish.max_value)
     ]:
-        if entry.get(key):
-            v_lines.append(f"{label}: {entry[key]}")
+        if value is not None:
+            v_lines.append(f"{label}: {fmt_number(value)}")
     if v_lines:
         embed.add_field(name="Value", value="\n".join(v_lines), inline=False)
 
-    await interaction.response.send_message(embed=embed)
+    return embed
+
+
+@bot.tree.command(name="bestiary", description="Get info about a Fisch fish.")
+@app_commands.describe(name="Name of the fish")
+@guarded("command")
+@metrics.timed("command")
+async def bestiary(interaction, name: str):
+
+    ds = store["bestiary"]
+    idx, suggestions = await resolve(ds, name)
+    if idx is None:
+        await respond(
+            interaction,
+            not_found(f"❌ Could not find a fish named **{name}**.", suggestions),
+            ephemeral=True
+        )
+        return
+
+    embed = cached_embed(ds, idx, build_bestiary_embed)
+    await respond(interaction, embed=embed)
 
 
 @bestiary.autocomplete("name")
+@guarded("autocomplete")
+@metrics.timed("autocomplete")
 async def bestiary_autocomplete(interaction, current):
-    target = normalize(current)
-    results = []
-    for key, data in bestiary_data.items():
-        disp = data.get("name", key)
-        if target in normalize(key) or target in normalize(disp):
-            results.append(app_commands.Choice(name=disp, value=key))
-    return results[:25]
+    return store["bestiary"].complete.complete(current)
 
 
 # ---------------------------------------------------------
-# ROD — FULL DYNAMIC DISPLAY
+# FISH SEARCH
 # ---------------------------------------------------------
-@bot.tree.command(name="rod", description="Get info about a Fisch fishing rod.")
-@app_commands.describe(name="Name of the rod")
-async def rod(interaction, name: str):
+def fish_table(bestiary_ds):
+    """Columnar search table for one bestiary Dataset (built with it)."""
+    return bestiary_ds.derive("fish_table", lambda ds: FishTable(ds.records, app_commands.Choice))
+
+
+class FishSearchView(PagedView):
+    """Pages of one /fishsearch result list."""
+
+    title = "Fish search"
+    noun = "fish"
+
+    def __init__(self, user_id, table, rows, sort, summary):
+        self.table = table
+        self.sort = sort
+        super().__init__(user_id, rows, summary)
+
+    def line(self, pos, row) -> str:
+        fish = self.table.records[row]
+        value = self.table.columns[self.sort][row]
+        shown = "?" if math.isnan(value) else fmt_number(value)
+        return f"**{pos}. {fish.name}** — {fish.rarity or '?'} · {SORTS[self.sort]}: {shown}"
+
+
+@bot.tree.command(name="fishsearch", description="Find fish by rarity, location, conditions or bait.")
+@app_commands.describe(
+    rarity="Rarity tier, e.g. Mythical",
+    location="Location, e.g. Second Sea",
+    sub_location="Sub-location, e.g. Waveborne",
+    time="Day or Night",
+    weather="Weather, e.g. Rain",
+    season="Season, e.g. Winter",
+    bait="Preferred bait",
+    sort="What to rank results by (highest first)"
+)
+@app_commands.choices(sort=[app_commands.Choice(name=label, value=col) for col, label in SORTS.items()])
+@guarded("command")
+@metrics.timed("command")
+async def fishsearch(interaction, rarity: str = None, location: str = None,
+                     sub_location: str = None, time: str = None, weather: str = None,
+                     season: str = None, bait: str = None, sort: str = "base_value"):
+
+    filters = {
+        "rarity": rarity,
+        "location": location,
+        "sub_location": sub_location,
+        "time": time,
+        "weather": weather,
+        "season": season,
+        "bait": bait,
+    }
+    table = fish_table(store["bestiary"])
+    key = ("bestiary", "fishsearch", sort) + tuple(normalize(v or "") for v in filters.values())
+    rows = await lookups.get(key, lambda: table.search(sort, **filters))
+    if not rows:
+        await respond(interaction, "❌ No fish match those filters.", ephemeral=True)
+        return
 
-    entry = match_entry(name, rods_data)
-    if not entry:
-        await interaction.response.send_message(
-            f"❌ Could not find a rod named **{name}**.",
-            ephemeral=True
-        )
+    used = [f"**{FILTERS[col]}:** {value}" for col, value in filters.items() if value]
+    summary = " · ".join(used) if used else "All fish"
+    summary += f"\nSorted by **{SORTS[sort]}**"
+    view = FishSearchView(interaction.user.id, table, rows, sort, summary)
+    await respond(interaction, embed=view.embed(), view=view)
+
+
+def fishsearch_autocomplete(column):
+    @guarded("autocomplete")
+    @metrics.timed("autocomplete", f"fishsearch_{column}")
+    async def complete(interaction, current):
+        return fish_table(store["bestiary"]).complete(column, current)
+    return complete
+
+
+for _column in FILTERS:
+    fishsearch.autocomplete(_column)(fishsearch_autocomplete(_column))
+
+
+# ---------------------------------------------------------
+# CATCH SIMULATION
+# ---------------------------------------------------------
+SIMULATE_FILTERS = ("location", "sub_location", "time", "weather", "season")
+
+
+def catch_sim(bestiary_ds):
+    """Per-fish catch parameters for one bestiary Dataset (built with it)."""
+    return bestiary_ds.derive("catch_sim", lambda ds: CatchSimulator(ds.records))
+
+
+def build_simulate_embed(records, result, summary, seed):
+    """`records` are the bestiary records the simulation's rows index."""
+    embed = discord.Embed(
+        title="Catch simulation",
+        description=summary,
+        color=discord.Color.gold()
+    )
+    mean, p10, p90 = result.per_hour
+    embed.add_field(
+        name=f"C$ per hour ({result.catches_per_hour} catches)",
+        value=f"**{fmt_number(round(mean))}** on average\np10–p90: {fmt_number(round(p10))} – {fmt_number(round(p90))}",
+        inline=True
+    )
+    mean, p10, p90 = result.per_catch
+    embed.add_field(
+        name="C$ per catch",
+        value=f"**{fmt_number(round(mean, 1))}** on average\np10–p90: {fmt_number(round(p10, 1))} – {fmt_number(round(p90, 1))}",
+        inline=True
+    )
+    top = [
+        f"**{records[row].name}** ({records[row].rarity}) — {share:.0%} of C$, "
+        f"{f'{rate:.1%}' if rate >= 0.001 else '<0.1%'} of catches"
+        for row, share, rate in result.top
+    ]
+    embed.add_field(name="Top earners", value=bullet_list(top), inline=False)
+    embed.set_footer(text=f"{result.catches:,} simulated catches · seed {seed} · rarity odds are approximate")
+    return embed
+
+
+@bot.tree.command(name="simulate", description="Estimate C$ per hour for a spot and conditions.")
+@app_commands.describe(
+    location="Location, e.g. Moosewood",
+    sub_location="Sub-location, e.g. Waveborne",
+    time="Day or Night",
+    weather="Weather, e.g. Rain",
+    season="Season, e.g. Winter",
+    seconds_per_catch="How long one catch takes you, cast to reeled in (default 30)",
+    seed="Random seed, to repeat a simulation exactly"
+)
+@guarded("command")
+@metrics.timed("command")
+async def simulate(interaction, location: str = None, sub_location: str = None, time: str = None,
+                   weather: str = None, season: str = None,
+                   seconds_per_catch: app_commands.Range[float, 3, 3600] = 30.0, seed: int = None):
+
+    filters = {
+        "location": location,
+        "sub_location": sub_location,
+        "time": time,
+        "weather": weather,
+        "season": season,
+    }
+    ds = store["bestiary"]
+    sim = catch_sim(ds)
+    mask = fish_table(ds).mask(**filters)
+    rows = [row for row in range(len(ds.records)) if mask >> row & 1]
+    if seed is None:
+        seed = random.randrange(1_000_000)
+    # a million draws take a few hundred ms: keep them off the event loop
+    result = await asyncio.to_thread(sim.run, rows, seconds_per_catch, seed=seed)
+    if result is None:
+        await respond(interaction, "❌ No catchable fish match those conditions.", ephemeral=True)
         return
 
-    title = entry.get("name", name.title())
+    used = [f"**{FILTERS[col]}:** {value}" for col, value in filters.items() if value]
+    summary = " · ".join(used) if used else "Anywhere, any conditions"
+    summary += f"\n{len(sim.pool(rows))} catchable fish · {fmt_number(seconds_per_catch)} s per catch"
+    await respond(interaction, embed=build_simulate_embed(ds.records, result, summary, seed))
+
+
+for _column in SIMULATE_FILTERS:
+    simulate.autocomplete(_column)(fishsearch_autocomplete(_column))
+
+
+# ---------------------------------------------------------
+# ROD — FULL DYNAMIC DISPLAY
+# ---------------------------------------------------------
+def build_rod_embed(entry_key, entry):
     embed = discord.Embed(
-        title=title,
+        title=entry.get("name", entry_key),
         url=entry.get("url"),  # keep clickable title
         color=discord.Color.green()
     )
@@ -207,41 +647,204 @@ async def rod(interaction, name: str):
         else:
             embed.add_field(name=label, value=str(value), inline=False)
 
-    await interaction.response.send_message(embed=embed)
+    return embed
+
+
+@bot.tree.command(name="rod", description="Get info about a Fisch fishing rod.")
+@app_commands.describe(name="Name of the rod")
+@guarded("command")
+@metrics.timed("command")
+async def rod(interaction, name: str):
+
+    ds = store["rods"]
+    idx, suggestions = await resolve(ds, name)
+    if idx is None:
+        await respond(
+            interaction,
+            not_found(f"❌ Could not find a rod named **{name}**.", suggestions),
+            ephemeral=True
+        )
+        return
+
+    embed = cached_embed(ds, idx, build_rod_embed)
+    await respond(interaction, embed=embed)
 
 
 @rod.autocomplete("name")
+@guarded("autocomplete")
+@metrics.timed("autocomplete")
 async def rod_autocomplete(interaction, current):
-    target = normalize(current)
-    results = []
-    for key, data in rods_data.items():
-        disp = data.get("name", key)
-        if target in normalize(key) or target in normalize(disp):
-            results.append(app_commands.Choice(name=disp, value=key))
-    return results[:25]
+    return store["rods"].complete.complete(current)
 
 
 # ---------------------------------------------------------
-# ENCHANT
+# ROD COMPARE / RANK
 # ---------------------------------------------------------
-@bot.tree.command(name="enchant", description="Get info about a Fisch enchantment.")
-@app_commands.describe(name="Name of the enchantment")
-async def enchant(interaction, name: str):
+def rod_table(rods_ds):
+    """Parsed rod stat columns for one rods Dataset (built with it)."""
+    return rods_ds.derive("rod_table", lambda ds: RodTable(ds.index))
 
-    entry = match_entry(name, enchants_data)
-    if not entry:
-        await interaction.response.send_message(
-            f"❌ Could not find an enchant named **{name}**.",
-            ephemeral=True
-        )
+
+def build_rodcompare_embed(table, rows):
+    embed = discord.Embed(
+        title=" vs ".join(table.names[row] for row in rows),
+        color=discord.Color.green()
+    )
+    compared = table.compare(rows)
+    for i, row in enumerate(rows):
+        lines = []
+        for stat, (values, deltas, best) in compared.items():
+            line = f"{STATS[stat][1]}: {fmt_stat(stat, values[i])}"
+            if i:
+                line += f" ({fmt_delta(stat, deltas[i])})"
+            # bold the best value, unless every rod ties
+            if row in best and len(best) < len(set(rows)):
+                line = f"**{line}**"
+            lines.append(line)
+        embed.add_field(name=table.names[row], value="\n".join(lines), inline=True)
+    embed.set_footer(text=f"Differences are against {table.names[rows[0]]} · bold = best of these rods")
+    return embed
+
+
+@bot.tree.command(name="rodcompare", description="Compare 2–4 fishing rods side by side.")
+@app_commands.describe(
+    rod1="First rod; the others are compared against it",
+    rod2="Second rod",
+    rod3="Third rod (optional)",
+    rod4="Fourth rod (optional)"
+)
+@guarded("command")
+@metrics.timed("command")
+async def rodcompare(interaction, rod1: str, rod2: str, rod3: str = None, rod4: str = None):
+
+    ds = store["rods"]
+    rows = []
+    for name in (rod1, rod2, rod3, rod4):
+        if name is None:
+            continue
+        idx, suggestions = await resolve(ds, name)
+        if idx is None:
+            await respond(
+                interaction,
+                not_found(f"❌ Could not find a rod named **{name}**.", suggestions),
+                ephemeral=True
+            )
+            return
+        rows.append(idx)
+
+    embed = build_rodcompare_embed(rod_table(ds), rows)
+    await respond(interaction, embed=embed)
+
+
+@guarded("autocomplete")
+@metrics.timed("autocomplete", "rodcompare")
+async def rodcompare_autocomplete(interaction, current):
+    return store["rods"].complete.complete(current)
+
+
+for _param in ("rod1", "rod2", "rod3", "rod4"):
+    rodcompare.autocomplete(_param)(rodcompare_autocomplete)
+
+
+# /rodrank "by" choices; the weight options are named after the stats
+RANK_BY = {"score": "Weighted score", **{stat: label for stat, (_, label, _) in STATS.items()}}
+Weight = app_commands.Range[float, 0, 100]
+
+
+class RodRankView(PagedView):
+    """Pages of one /rodrank ranking."""
+
+    title = "Rod ranking"
+    noun = "rods"
+    color = discord.Color.green()
+
+    def __init__(self, user_id, table, rows, by, scores, summary):
+        self.table = table
+        self.by = by
+        self.scores = scores
+        super().__init__(user_id, rows, summary)
+
+    def line(self, pos, row) -> str:
+        name = self.table.names[row]
+        if self.by == "score":
+            return f"**{pos}. {name}** — score {self.scores[row] * 100:.0f}/100"
+        return f"**{pos}. {name}** — {fmt_stat(self.by, self.table.columns[self.by][row])}"
+
+
+@bot.tree.command(name="rodrank", description="Rank every rod by one stat or by a weighted score.")
+@app_commands.describe(
+    by="Stat to rank by, or a weighted score of all stats (default)",
+    **{stat: f"Weight of {label} in the score (default 1, 0 to ignore it)"
+       for stat, (_, label, _) in STATS.items()}
+)
+@app_commands.choices(by=[app_commands.Choice(name=label, value=value) for value, label in RANK_BY.items()])
+@guarded("command")
+@metrics.timed("command")
+async def rodrank(interaction, by: str = "score", lure_speed: Weight = None, luck: Weight = None,
+                  control: Weight = None, resilience: Weight = None, max_kg: Weight = None,
+                  line_distance: Weight = None):
+
+    table = rod_table(store["rods"])
+    if by != "score":
+        rows = table.rank(by)
+        view = RodRankView(interaction.user.id, table, rows, by, None, f"Ranked by **{RANK_BY[by]}**")
+        await respond(interaction, embed=view.embed(), view=view)
+        return
+
+    given = {
+        "lure_speed": lure_speed,
+        "luck": luck,
+        "control": control,
+        "resilience": resilience,
+        "max_kg": max_kg,
+        "line_distance": line_distance,
+    }
+    weights = {stat: 1.0 if w is None else w for stat, w in given.items()}
+    if not any(weights.values()):
+        await respond(interaction, "❌ Give at least one stat a weight above 0.", ephemeral=True)
         return
 
+    rows, scores = table.rank_by_score(weights)
+    used = " · ".join(f"{STATS[stat][1]} ×{fmt_number(w)}" for stat, w in weights.items() if w)
+    summary = f"Ranked by weighted score: {used}\nScore = weighted average of each stat's percentile among all rods"
+    view = RodRankView(interaction.user.id, table, rows, by, scores, summary)
+    await respond(interaction, embed=view.embed(), view=view)
+
+
+# ---------------------------------------------------------
+# ENCHANT
+# ---------------------------------------------------------
+# 2: a reload builds the next set's links in its thread while the current
+# set's are still being used
+@functools.lru_cache(maxsize=2)
+def enchant_links(enchants_ds, categories_ds, rods_ds):
+    """Enchant <-> rod / category links for one set of Datasets (rebuilt on reload)."""
+    return EnchantLinks(enchants_ds.index, categories_ds.index, rods_ds.index)
+
+
+def links():
+    return enchant_links(store["enchants"], store["categories"], store["rods"])
+
+
+def build_enchant_embed(entry_key, entry):
     embed = discord.Embed(
-        title=entry.get("name", name.title()),
+        title=entry.get("name", entry_key),
         color=discord.Color.blue()
     )
 
-    if entry.get("category"):
+    xref = links()
+    ench_id = store["enchants"].index.by_key.get(normalize(entry_key))
+    in_categories = []
+    rods = []
+    if ench_id is not None:
+        categories = store["categories"].index
+        in_categories = [categories.display_name(i) for i in xref.categories_for[ench_id]]
+        names = rod_table(store["rods"]).names
+        rods = [names[i] for i in xref.rods_for[ench_id]]
+
+    if in_categories:
+        embed.add_field(name="Category", value=", ".join(in_categories), inline=False)
+    elif entry.get("category"):
         embed.add_field(name="Category", value=entry["category"].title(), inline=False)
 
     if entry.get("effect"):
@@ -252,77 +855,789 @@ async def enchant(interaction, name: str):
         tips = "\n".join(f"• {line}" for line in entry["tips"])
         embed.add_field(name="Tips", value=tips, inline=False)
 
-    await interaction.response.send_message(embed=embed)
+    if rods:
+        embed.add_field(name=f"Recommended for ({len(rods)} rods)", value=bullet_list(rods), inline=False)
+
+    return embed
+
+
+@bot.tree.command(name="enchant", description="Get info about a Fisch enchantment.")
+@app_commands.describe(name="Name of the enchantment")
+@guarded("command")
+@metrics.timed("command")
+async def enchant(interaction, name: str):
+
+    ds = store["enchants"]
+    idx, suggestions = await resolve(ds, name)
+    if idx is None:
+        await respond(
+            interaction,
+            not_found(f"❌ Could not find an enchant named **{name}**.", suggestions),
+            ephemeral=True
+        )
+        return
+
+    embed = cached_embed(ds, idx, build_enchant_embed)
+    await respond(interaction, embed=embed)
 
 
 @enchant.autocomplete("name")
+@guarded("autocomplete")
+@metrics.timed("autocomplete")
 async def enchant_autocomplete(interaction, current):
-    target = normalize(current)
-    res = []
-    for key, data in enchants_data.items():
-        disp = data.get("name", key)
-        if target in normalize(key) or target in normalize(disp):
-            res.append(app_commands.Choice(name=disp, value=key))
-    return res[:25]
+    return store["enchants"].complete.complete(current)
 
 
 # ---------------------------------------------------------
 # ENCHANT CATEGORY
 # ---------------------------------------------------------
+def build_category_embed(entry_key, entry):
+    embed = discord.Embed(
+        title=entry.get("name", entry_key),
+        color=discord.Color.orange()
+    )
+
+    if entry.get("relic"):
+        embed.add_field(name="Relic Type", value=entry["relic"], inline=False)
+
+    cat_id = store["categories"].index.by_key.get(normalize(entry_key))
+    if cat_id is not None:
+        xref = links()
+        enchants = store["enchants"].index
+        lines = []
+        for name, ench_id in xref.members[cat_id]:
+            if ench_id is None:
+                lines.append(f"• {name}")
+                continue
+            line = f"• **{enchants.display_name(ench_id)}**"
+            effect = enchants.entries[ench_id].get("effect")
+            if effect:
+                line += f" — {shorten(effect[0])}"
+            if xref.rods_for[ench_id]:
+                count = len(xref.rods_for[ench_id])
+                line += f" · {count} rod{'s' if count != 1 else ''}"
+            lines.append(line)
+        for i, value in enumerate(field_chunks(lines)):
+            embed.add_field(name="Enchantments" if i == 0 else "Enchantments (cont.)", value=value, inline=False)
+    elif entry.get("enchants"):
+        ench_list = "\n".join(f"• {e}" for e in entry["enchants"])
+        embed.add_field(name="Enchantments", value=ench_list, inline=False)
+
+    return embed
+
+
 @bot.tree.command(name="enchantcategory", description="Look up an enchantment category.")
 @app_commands.describe(category="The category name")
+@guarded("command")
+@metrics.timed("command")
 async def enchantcategory(interaction, category: str):
 
-    entry = match_entry(category, categories_data)
-    if not entry:
-        await interaction.response.send_message(
-            f"❌ No category found named **{category}**.",
+    ds = store["categories"]
+    idx, suggestions = await resolve(ds, category)
+    if idx is None:
+        await respond(
+            interaction,
+            not_found(f"❌ No category found named **{category}**.", suggestions),
+            ephemeral=True
+        )
+        return
+
+    embed = cached_embed(ds, idx, build_category_embed)
+    await respond(interaction, embed=embed)
+
+
+@enchantcategory.autocomplete("category")
+@guarded("autocomplete")
+@metrics.timed("autocomplete")
+async def enchantcategory_autocomplete(interaction, current):
+    return store["categories"].complete.complete(current)
+
+
+# ---------------------------------------------------------
+# LOCATIONS / EVENTS
+# ---------------------------------------------------------
+def places_index(bestiary_ds):
+    """Fish per location/event for one bestiary Dataset (built with it)."""
+    return bestiary_ds.derive("places_index", lambda ds: fish_by_place(ds.records))
+
+
+def fish_at(name: str):
+    return places_index(store["bestiary"]).get(normalize(name), [])
+
+
+def build_location_embed(entry_key, entry):
+    name = entry.get("name", entry_key)
+    embed = discord.Embed(
+        title=name,
+        url=entry.get("url"),
+        color=discord.Color.dark_teal()
+    )
+
+    if entry.get("sea"):
+        embed.add_field(name="Sea", value=entry["sea"], inline=False)
+
+    if entry.get("gps"):
+        embed.add_field(name="GPS", value=entry["gps"], inline=False)
+
+    fish = fish_at(name)
+    if fish:
+        embed.add_field(name=f"Fish ({len(fish)})", value=bullet_list(sorted(fish)), inline=False)
+
+    return embed
+
+
+@bot.tree.command(name="location", description="Get info about a Fisch location.")
+@app_commands.describe(name="Name of the location")
+@guarded("command")
+@metrics.timed("command")
+async def location(interaction, name: str):
+
+    ds = store["locations"]
+    idx, suggestions = await resolve(ds, name)
+    if idx is None:
+        await respond(
+            interaction,
+            not_found(f"❌ Could not find a location named **{name}**.", suggestions),
             ephemeral=True
         )
         return
 
+    embed = cached_embed(ds, idx, build_location_embed)
+    await respond(interaction, embed=embed)
+
+
+@location.autocomplete("name")
+@guarded("autocomplete")
+@metrics.timed("autocomplete")
+async def location_autocomplete(interaction, current):
+    return store["locations"].complete.complete(current)
+
+
+def build_event_embed(entry_key, entry):
+    name = entry.get("name", entry_key)
     embed = discord.Embed(
-        title=entry.get("name", category.title()),
-        color=discord.Color.orange()
+        title=name,
+        url=entry.get("url"),
+        color=discord.Color.purple()
     )
 
-    if entry.get("relic"):
-        embed.add_field(name="Relic Type", value=entry["relic"], inline=False)
+    if entry.get("type"):
+        embed.add_field(name="Type", value=entry["type"], inline=False)
 
-    if entry.get("enchants"):
-        ench_list = "\n".join(f"• {e}" for e in entry["enchants"])
-        embed.add_field(name="Enchantments", value=ench_list, inline=False)
+    fish = fish_at(name)
+    if fish:
+        embed.add_field(name=f"Fish ({len(fish)})", value=bullet_list(sorted(fish)), inline=False)
 
-    await interaction.response.send_message(embed=embed)
+    return embed
 
 
-@enchantcategory.autocomplete("category")
-async def enchantcategory_autocomplete(interaction, current):
-    target = normalize(current)
-    res = []
-    for key, data in categories_data.items():
-        disp = data.get("name", key)
-        if target in normalize(key) or target in normalize(disp):
-            res.append(app_commands.Choice(name=disp, value=key))
-    return res[:25]
+@bot.tree.command(name="event", description="Get info about a Fisch event.")
+@app_commands.describe(name="Name of the event")
+@guarded("command")
+@metrics.timed("command")
+async def event(interaction, name: str):
+
+    ds = store["events"]
+    idx, suggestions = await resolve(ds, name)
+    if idx is None:
+        await respond(
+            interaction,
+            not_found(f"❌ Could not find an event named **{name}**.", suggestions),
+            ephemeral=True
+        )
+        return
+
+    embed = cached_embed(ds, idx, build_event_embed)
+    await respond(interaction, embed=embed)
+
+
+@event.autocomplete("name")
+@guarded("autocomplete")
+@metrics.timed("autocomplete")
+async def event_autocomplete(interaction, current):
+    return store["events"].complete.complete(current)
+
+
+# ---------------------------------------------------------
+# FULL-TEXT SEARCH
+# ---------------------------------------------------------
+# dataset -> (label, [(field, weight)]). Bestiary fields are Fish
+# attributes, the rest are JSON keys; names weigh most.
+SEARCH_FIELDS = {
+    "enchants": ("Enchant", [("name", 3), ("category", 1), ("effect", 2), ("tips", 1)]),
+    "rods": ("Rod", [("name", 3), ("recommended_enchants", 1)]),
+    "categories": ("Enchant category", [("name", 3), ("relic", 1), ("enchants", 1)]),
+    "bestiary": ("Fish", [("name", 3), ("rarity", 1), ("location", 1), ("sub_location", 1),
+                          ("event", 1), ("sources", 1), ("bait", 1), ("time", 1), ("weather", 1),
+                          ("season", 1)]),
+    "locations": ("Location", [("name", 3), ("sea", 1)]),
+    "events": ("Event", [("name", 3), ("type", 1)]),
+}
+# one-line description shown under each result
+SEARCH_SUMMARY = {
+    "enchants": lambda e: (e.get("effect") or [""])[0],
+    "rods": lambda e: (e.get("recommended_enchants") or [""])[0],
+    "categories": lambda e: e.get("relic") or "",
+    "bestiary": lambda f: " · ".join(v for v in (f.rarity, f.location) if v),
+    "locations": lambda e: e.get("sea") or "",
+    "events": lambda e: e.get("type") or "",
+}
+SEARCH_RESULTS = 10
+
+search_index = SearchIndex()
+
+
+def search_text(value) -> str:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (list, tuple)):
+        return "\n".join(v for v in value if isinstance(v, str))
+    return ""
+
+
+def search_docs(ds, rows=None):
+    """(id, title, weighted fields, summary) for every entry of `ds`, or
+    for the entry ids in `rows`."""
+    _, fields = SEARCH_FIELDS[ds.name]
+    for idx in range(len(ds.index)) if rows is None else rows:
+        if ds.records is not None:
+            item = ds.records[idx]
+            values = [(search_text(getattr(item, f)), w) for f, w in fields]
+        else:
+            item = ds.index.entries[idx]
+            values = [(search_text(item.get(f)), w) for f, w in fields]
+        title = urllib.parse.unquote(ds.index.display_name(idx))
+        yield idx, title, values, SEARCH_SUMMARY[ds.name](item)
+
+
+def search_segment(ds):
+    """`ds`'s search segment (built with it): the installed segment
+    patched with just the changed rows if that is the segment of the
+    Dataset `ds` was patched from, otherwise built from scratch."""
+    def build(ds):
+        current = search_index.segments.get(ds.name)
+        patch = ds.patch
+        if patch is not None and current is not None and current.version == patch.base:
+            docs = zip(patch.fresh, search_docs(ds, patch.fresh))
+            return current.patched(patch.stale, docs, len(ds.index), ds.signature)
+        return Segment(search_docs(ds), ds.signature)
+    return ds.derive("search", build)
+
+
+@bot.tree.command(name="search", description="Search enchant effects, rod recommendations, fish and more.")
+@app_commands.describe(query="Words to look for, e.g. lure speed", only="Only search one kind of entry")
+@app_commands.choices(only=[
+    app_commands.Choice(name=label, value=name) for name, (label, _) in SEARCH_FIELDS.items()
+])
+@guarded("command")
+@metrics.timed("command")
+async def search(interaction, query: str, only: str = None):
+
+    key = ("search", only or "", " ".join(tokenize(query)))
+    total, hits = await lookups.get(key, lambda: search_index.search(query, SEARCH_RESULTS, only))
+    if not hits:
+        await respond(interaction, f"❌ Nothing matches **{query}**.", ephemeral=True)
+        return
+
+    lines = []
+    for pos, (_, name, row) in enumerate(hits, 1):
+        line = f"**{pos}. {search_index.title(name, row)}** · {SEARCH_FIELDS[name][0]}"
+        summary = search_index.summary(name, row)
+        if summary:
+            line += f"\n{shorten(summary, 90)}"
+        lines.append(line)
+    embed = discord.Embed(
+        title=shorten(f"Search: {query}", 256),
+        description="\n".join(lines),
+        color=discord.Color.dark_blue()
+    )
+    embed.set_footer(text=f"Top {len(hits)} of {total} matches")
+    await respond(interaction, embed=embed)
+
+
+# ---------------------------------------------------------
+# CACHE WARMING / RELOAD
+# ---------------------------------------------------------
+EMBED_BUILDERS = {
+    "bestiary": build_bestiary_embed,
+    "rods": build_rod_embed,
+    "enchants": build_enchant_embed,
+    "categories": build_category_embed,
+    "locations": build_location_embed,
+    "events": build_event_embed,
+}
+# small enough to keep fully rendered; bestiary fills in on demand
+WARM_DATASETS = ("rods", "enchants", "categories", "locations", "events")
+# embeds that also show data from another dataset
+EMBED_DEPENDS = {
+    "bestiary": ("locations", "events"),
+    "rods": ("enchants", "categories"),
+    "enchants": ("categories",),
+    "categories": ("enchants",),
+}
+# search tables built with their Dataset instead of on first use
+TABLES = {"bestiary": (fish_table, catch_sim, places_index), "rods": (rod_table,)}
+# datasets the enchant cross-reference is built from, in enchant_links' order
+LINKED_DATASETS = ("enchants", "categories", "rods")
+
+
+def warm_embed_cache(ds):
+    if ds.name not in WARM_DATASETS:
+        return
+    for idx in range(len(ds.index)):
+        render_embed(ds, idx, EMBED_BUILDERS[ds.name])
+
+
+@store.on_prepare
+def prepare_tables(ds):
+    """Build everything derived from `ds`. On reload this runs in the
+    loading thread, before `ds` is swapped in, so the event loop only
+    has to install the results (refresh_tables).
+
+    Only the search segment is patched when `ds` was; the fish and rod
+    tables, the catch simulator and the enchant links are rebuilt in
+    full for every reload (tens of ms for the bestiary)."""
+    for build in TABLES.get(ds.name, ()):
+        build(ds)
+    if ds.name in LINKED_DATASETS:
+        enchant_links(*(ds if name == ds.name else store[name] for name in LINKED_DATASETS))
+    if ds.name in SEARCH_FIELDS:
+        search_segment(ds)
+
+
+def install_tables(ds):
+    # the tables live on `ds`; only the search index is shared
+    if ds.name in SEARCH_FIELDS:
+        search_index.install(ds.name, search_segment(ds))
+
+
+def build_tables(ds):
+    prepare_tables(ds)
+    install_tables(ds)
+
+
+@store.on_reload
+def refresh_tables(ds):
+    lookups.clear(ds.name)
+    lookups.clear("search")
+    install_tables(ds)
+
+
+def render_embeds(jobs):
+    """[(cache key, embed)] for each (Dataset, entry ids) in `jobs`,
+    without touching the cache, so it can run in a worker thread."""
+    rendered = []
+    for ds, rows in jobs:
+        builder = EMBED_BUILDERS[ds.name]
+        for idx in rows:
+            key = ds.index.keys[idx]
+            rendered.append(((ds.name, key), builder(key, embed_item(ds, idx))))
+    return rendered
+
+
+async def rewarm_embeds(ds):
+    """Re-render in a worker thread the warm embeds a reload of `ds`
+    dropped, then cache them unless another reload happened meanwhile."""
+    jobs = []
+    if ds.name in WARM_DATASETS:
+        jobs.append((ds, range(len(ds.index)) if ds.patch is None else ds.patch.fresh))
+    for name in EMBED_DEPENDS.get(ds.name, ()):
+        if name in WARM_DATASETS:
+            jobs.append((store[name], range(len(store[name].index))))
+    if not jobs:
+        return
+    current = [store[name] for name in DATA_FILES]
+    with metrics.timer("embed_rewarm_seconds", dataset=ds.name):
+        rendered = await asyncio.to_thread(render_embeds, jobs)
+    if current != [store[name] for name in DATA_FILES]:
+        return
+    for key, embed in rendered:
+        if key not in embed_cache:
+            embed_cache.put(key, embed)
+
+
+# keep references so the warming tasks aren't garbage collected
+warming_tasks = set()
+
+
+def start_warming(coro):
+    task = asyncio.get_running_loop().create_task(coro)
+    warming_tasks.add(task)
+    task.add_done_callback(warming_tasks.discard)
+
+
+@store.on_reload
+def refresh_embed_cache(ds):
+    # only drops what changed here; rewarm_embeds renders the rest off the loop
+    if ds.patch is None:
+        embed_cache.clear(ds.name)
+    else:
+        # embeds are keyed by entry key, so only the diff's entries change
+        for key in ds.patch.keys:
+            embed_cache.discard((ds.name, key))
+    for name in EMBED_DEPENDS.get(ds.name, ()):
+        embed_cache.clear(name)
+    start_warming(rewarm_embeds(ds))
+
+
+async def warm_popular(names):
+    """Pre-build lookups and embeds for the datasets' most frequent queries.
+
+    Primed lookups only last LOOKUP_TTL_SECONDS, which covers the burst
+    of repeat requests after a restart or reload; the embeds stay in
+    embed_cache until evicted.
+
+    A dataset reloaded while this runs is left alone: its lookups are
+    cached by name and query, not by Dataset, so row ids resolved on the
+    old one would be served for the new one (and the reload warms it
+    again anyway).
+    """
+    if not querylog.enabled:
+        return
+    for name in names:
+        try:
+            queries = await asyncio.to_thread(querylog.top_queries, name, WARM_POPULAR)
+        except Exception as e:
+            print(f"⚠️ Could not read the query log: {e!r}")
+            return
+        ds = store[name]
+        for query in queries:
+            if store[name] is not ds:
+                break
+            idx, _ = await coalesced_lookup(ds, query)
+            if idx is not None and (name, ds.index.keys[idx]) not in embed_cache:
+                render_embed(ds, idx, EMBED_BUILDERS[name])
+        await asyncio.sleep(0)
+
+
+@store.on_reload
+def refresh_popular(ds):
+    # after refresh_tables / refresh_embed_cache dropped the old results
+    start_warming(warm_popular((ds.name, *EMBED_DEPENDS.get(ds.name, ()))))
+
+
+def load_datasets():
+    """Load every dataset and warm the embed cache, blocking.
+
+    The bot does this in the background after login (see setup_hook);
+    shards.py and the benchmarks call this up front instead.
+    """
+    with metrics.phase("datasets"):
+        store.load_all()
+    with metrics.phase("tables"):
+        for name in DATA_FILES:
+            build_tables(store[name])
+    data_ready.set()
+    with metrics.phase("embeds"):
+        for name in DATA_FILES:
+            warm_embed_cache(store[name])
+
+
+async def load_datasets_in_background():
+    """load_datasets() without blocking the gateway: files are read and
+    indexed and tables built in a thread, embeds are built one dataset
+    at a time."""
+    with metrics.phase("datasets"):
+        await asyncio.to_thread(store.load_all)
+    with metrics.phase("tables"):
+        for name in DATA_FILES:
+            await asyncio.to_thread(prepare_tables, store[name])
+            install_tables(store[name])
+    data_ready.set()
+    with metrics.phase("embeds"):
+        for name in DATA_FILES:
+            warm_embed_cache(store[name])
+            await asyncio.sleep(0)
+
+
+# ---------------------------------------------------------
+# STATS (owner only)
+# ---------------------------------------------------------
+def latency_lines(name: str) -> str:
+    """One line per handler: calls, p50, p99 and worst latency."""
+    lines = []
+    for labels, hist in sorted(metrics.series(name).items()):
+        label = labels[0][1] if labels else "all"
+        lines.append(
+            f"`{label}` {hist.count}× · p50 {fmt_seconds(hist.quantile(0.5))}"
+            f" · p99 {fmt_seconds(hist.quantile(0.99))} · max {fmt_seconds(hist.max)}"
+        )
+    return bullet_list(lines) if lines else "No calls yet"
+
+
+def build_stats_embed():
+    embed = discord.Embed(title="Bot stats", color=discord.Color.dark_grey())
+    embed.add_field(name="Commands", value=latency_lines("command_seconds"), inline=False)
+    embed.add_field(name="Autocomplete", value=latency_lines("autocomplete_seconds"), inline=False)
+
+    age = metrics.histogram("interaction_age_seconds", kind="autocomplete")
+    if age:
+        near = metrics.total("interaction_deadline_near_total", kind="autocomplete")
+        embed.add_field(
+            name="Autocomplete vs 3 s deadline",
+            value=f"age p99 {fmt_seconds(age.quantile(0.99))} · max {fmt_seconds(age.max)} · {near} over 2.5 s",
+            inline=False
+        )
+
+    found = []
+    for name in DATA_FILES:
+        hits = metrics.total("lookup_total", dataset=name, result="hit")
+        misses = metrics.total("lookup_total", dataset=name, result="miss")
+        if hits or misses:
+            found.append(f"`{name}` {hits}/{hits + misses} found")
+    embed.add_field(name="Lookups", value="\n".join(found) or "None yet", inline=False)
+
+    shed = []
+    for kind in ("command", "autocomplete"):
+        served = metrics.total("admission_total", kind=kind, result="served")
+        dropped = metrics.total("admission_total", kind=kind, result="shed")
+        shed.append(f"`{kind}` {served} served · {dropped} shed")
+    reasons = {
+        reason: metrics.total("admission_total", result="shed", reason=reason)
+        for reason in ("expired", "stale", "busy", "user_rate", "guild_rate")
+    }
+    reasons = ", ".join(f"{n} {reason}" for reason, n in reasons.items() if n)
+    if reasons:
+        shed.append(f"Shed: {reasons}")
+    embed.add_field(name="Admission", value="\n".join(shed), inline=False)
+
+    lag = metrics.histogram("event_loop_lag_seconds")
+    embed.add_field(
+        name="Runtime",
+        value=(
+            f"Embed cache: {embed_cache.hit_ratio():.0%} hits, {len(embed_cache)} entries\n"
+            f"Coalesced lookups: {lookups.saved_ratio():.0%} ({lookups.cached} cached, {lookups.shared} shared,"
+            f" {fmt_seconds(lookups.saved_seconds)} saved)\n"
+            f"Event loop lag: p99 {fmt_seconds(lag.quantile(0.99) if lag else 0)}"
+            f" · max {fmt_seconds(lag.max if lag else 0)}\n"
+            f"Gateway latency: {fmt_seconds(bot.latency)}\n"
+            f"Data reloads: {store.reloads['patched']} patched · {store.reloads['rebuilt']} rebuilt"
+            f" · {store.reloads['verified']} patches verified, {store.reloads['mismatched']} mismatched\n"
+            f"Startup: {startup_summary()}"
+        ),
+        inline=False
+    )
+    return embed
+
+
+@bot.tree.command(name="stats", description="Latency and cache statistics (bot owner only).")
+@metrics.timed("command")
+async def stats(interaction):
+    if not await bot.is_owner(interaction.user):
+        await respond(interaction, "❌ Only the bot owner can use this.", ephemeral=True)
+        return
+    await respond(interaction, embed=build_stats_embed(), ephemeral=True)
+
+
+def entry_name(dataset: str, key: str) -> str:
+    ds = store[dataset]
+    idx = ds.index.by_key.get(normalize(key))
+    name = key if idx is None else ds.index.display_name(idx)
+    return urllib.parse.unquote(name)
+
+
+def ratio(part, total) -> str:
+    return f"{part / total:.0%}" if total else "–"
+
+
+async def build_popular_embed(dataset=None):
+    await querylog.flush()
+    entries, misses, sources = await asyncio.to_thread(
+        lambda: (querylog.top_entries(dataset), querylog.top_misses(dataset), querylog.source_counts())
+    )
+    scope = f" · {dataset}" if dataset else ""
+    embed = discord.Embed(title=f"Popular lookups{scope}", color=discord.Color.dark_grey())
+    embed.add_field(
+        name="Most looked up",
+        value=bullet_list([f"{entry_name(ds, key)} · `{ds}` · {n}×" for ds, key, n in entries]) or "None yet",
+        inline=False
+    )
+    # names nobody could find: usually entries the scrape is missing
+    embed.add_field(
+        name="Most common misses",
+        value=bullet_list([f"{shorten(query, 60)} · `{ds}` · {n}×" for ds, query, n in misses]) or "None yet",
+        inline=False
+    )
+
+    hits = metrics.total("lookup_total", result="hit")
+    looked_up = hits + metrics.total("lookup_total", result="miss")
+    picked = sources.get("autocomplete", 0)
+    embed.add_field(
+        name="Hit rates",
+        value=(
+            f"Lookups found: {ratio(hits, looked_up)} of {looked_up} since start\n"
+            f"Picked from autocomplete: {ratio(picked, sum(sources.values()))} of all logged\n"
+            f"Embed cache: {embed_cache.hit_ratio():.0%} hits, {len(embed_cache)} entries\n"
+            f"Coalesced lookups: {lookups.saved_ratio():.0%}\n"
+            f"Query log: {querylog.recorded} recorded · {querylog.written} rows written"
+            f" in {querylog.flushes} flushes · {querylog.dropped} dropped"
+        ),
+        inline=False
+    )
+    return embed
+
+
+@bot.tree.command(name="popular", description="Most looked-up entries, misses and cache hit rates (bot owner only).")
+@app_commands.describe(dataset="Only one kind of entry")
+@app_commands.choices(dataset=[app_commands.Choice(name=name, value=name) for name in DATA_FILES])
+@metrics.timed("command")
+async def popular(interaction, dataset: str = None):
+    if not await bot.is_owner(interaction.user):
+        await respond(interaction, "❌ Only the bot owner can use this.", ephemeral=True)
+        return
+    if not querylog.enabled:
+        await respond(interaction, "The query log is turned off (QUERY_LOG_DB).", ephemeral=True)
+        return
+    if not data_ready.is_set():
+        # entry names come from the datasets, which may not be loaded yet
+        await respond(interaction, WARMING_UP, ephemeral=True)
+        return
+    await respond(interaction, embed=await build_popular_embed(dataset), ephemeral=True)
+
+
+# ---------------------------------------------------------
+# STARTUP
+# ---------------------------------------------------------
+# Phases run in this order, but the data phases overlap "connect":
+# the gateway connection doesn't wait for the data. Time-to-ready is
+# reported once both the gateway and the data are up.
+STARTUP_PHASES = ("imports", "connect", "sync", "datasets", "tables", "embeds", "popular")
+startup_pending = {"gateway", "data"}
+ready_after = None
+
+
+def startup_summary() -> str:
+    phases = " · ".join(
+        f"{phase} {fmt_seconds(metrics.phases[phase])}"
+        for phase in STARTUP_PHASES if phase in metrics.phases
+    )
+    if ready_after is None:
+        return f"not ready yet ({phases})"
+    return f"ready in {fmt_seconds(ready_after)} ({phases})"
+
+
+def startup_done(part: str):
+    """Mark "gateway" or "data" as up; report once both are."""
+    global ready_after
+    startup_pending.discard(part)
+    if startup_pending or ready_after is not None:
+        return
+    # a forked shard worker has no imports phase of its own (shards.py)
+    ready_after = metrics.phases.get("imports", 0.0) + time.perf_counter() - STARTED
+    print(f"⏱️ Startup: {startup_summary()}")
+
+
+metrics.gauge("time_to_ready_seconds", lambda: ready_after, "Seconds from start until gateway and data were ready")
+
+
+def command_payload(command) -> dict:
+    try:
+        return command.to_dict(bot.tree)  # discord.py >= 2.4
+    except TypeError:
+        return command.to_dict()
+
+
+def command_tree_hash(guild=None) -> str:
+    """Hash of what tree.sync(guild=guild) would upload."""
+    payload = sorted(
+        (command_payload(cmd) for cmd in bot.tree.get_commands(guild=guild)),
+        key=lambda cmd: (cmd.get("type", 1), cmd["name"])
+    )
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def read_sync_state() -> dict:
+    try:
+        with open(SYNC_STATE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+async def sync_commands():
+    """tree.sync(), skipped when the tree hasn't changed since the last
+    successful sync for this application and scope."""
+    guild = discord.Object(id=GUILD_ID) if GUILD_ID else None
+    scope = f"{bot.application_id}:{GUILD_ID or 'global'}"
+    digest = command_tree_hash(guild)
+    state = read_sync_state()
+    if state.get(scope) == digest and not FORCE_SYNC:
+        print("✅ Command tree unchanged since last sync, not syncing.")
+        return
+
+    commands_synced = await bot.tree.sync(guild=guild)
+    if GUILD_ID:
+        print(f"✅ Synced {len(commands_synced)} commands to guild {GUILD_ID}.")
+    else:
+        print(f"✅ Synced {len(commands_synced)} global commands.")
+    state[scope] = digest
+    try:
+        write_json(SYNC_STATE_FILE, state)
+    except OSError as e:
+        print(f"⚠️ Could not save {SYNC_STATE_FILE}: {e!r}")
+
+
+async def start_data():
+    if not data_ready.is_set():
+        await load_datasets_in_background()
+    with metrics.phase("popular"):
+        await warm_popular(DATA_FILES)
+    # keep a reference so the task isn't garbage collected
+    bot.data_watcher = asyncio.create_task(store.watch(DATA_POLL_SECONDS))
+    startup_done("data")
 
 
 # ---------------------------------------------------------
 # READY EVENT
 # ---------------------------------------------------------
+@bot.event
+async def setup_hook():
+    bot.connect_started = time.perf_counter()
+    # keep references so the background tasks aren't garbage collected
+    bot.data_loader = asyncio.create_task(start_data())
+    bot.loop_lag_watcher = asyncio.create_task(metrics.watch_loop_lag())
+    if querylog.enabled:
+        bot.querylog_writer = asyncio.create_task(querylog.run())
+    if METRICS_PORT:
+        try:
+            bot.metrics_server = await metrics.start_http(METRICS_HOST, METRICS_PORT)
+            print(f"Metrics on http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+        except OSError as e:
+            print(f"[WARN] metrics endpoint not started: {e}")
+
+
 @bot.event
 async def on_ready():
-    print(f"Logged in as {bot.user} (ID: {bot.user.id})")
-    try:
-        if GUILD_ID:
-            guild = discord.Object(id=GUILD_ID)
-            commands_synced = await bot.tree.sync(guild=guild)
-            print(f"✅ Synced {len(commands_synced)} commands to guild {GUILD_ID}.")
-        else:
-            commands_synced = await bot.tree.sync()
-            print(f"✅ Synced {len(commands_synced)} global commands.")
-    except Exception as e:
-        print("Error syncing commands:", e)
+    print(f"Logged in as {bot.user} (ID: {bot.user.id}, shards: {shard_summary()})")
+    # on_ready fires again after reconnects; startup work only runs once
+    if "gateway" not in startup_pending:
+        return
+    metrics.phases["connect"] = time.perf_counter() - bot.connect_started
+    if SYNC_COMMANDS:
+        try:
+            with metrics.phase("sync"):
+                await sync_commands()
+        except Exception as e:
+            print("Error syncing commands:", e)
+    startup_done("gateway")
+
+
+def shard_summary() -> str:
+    if bot.shard_count is None:
+        return "unsharded"
+    ids = getattr(bot, "shard_ids", None) or range(bot.shard_count)
+    return f"{','.join(map(str, ids))} of {bot.shard_count}"
+
+
+metrics.phases["imports"] = IMPORT_SECONDS
+
+
+def main():
+    if TOKEN is None:
+        raise ValueError("DISCORD_TOKEN environment variable not found.")
+    bot.run(TOKEN)
 
 
-bot.run(TOKEN)
+# importable without a token (benchmarks drive the handlers directly)
+if __name__ == "__main__":
+    main()
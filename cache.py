@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+import asyncio
+import inspect
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Small least-recently-used cache with a hard size cap."""
+
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def discard(self, key):
+        self._data.pop(key, None)
+
+    def clear(self, prefix=None):
+        """Drop everything, or only tuple keys starting with `prefix`."""
+        if prefix is None:
+            self._data.clear()
+            return
+        for key in [k for k in self._data if k[0] == prefix]:
+            del self._data[key]
+
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class Coalescer:
+    """Share one computation between identical requests.
+
+    get(key, compute) returns a result computed less than `ttl` seconds
+    ago if there is one ("cached"), waits for a computation of the same
+    key that is already running ("shared"), or calls compute() itself
+    ("computed"). Whatever compute() returns is cached, including "not
+    found" results. compute() may be a plain function or return an
+    awaitable; if it raises, the error goes to its caller only and
+    waiting requests compute for themselves.
+    """
+
+    def __init__(self, ttl=30.0, maxsize=2048, clock=time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self._results = LRUCache(maxsize)  # key -> (expires, value, cost)
+        self._inflight = {}                # key -> Future of (value, cost)
+        self.computed = 0
+        self.cached = 0
+        self.shared = 0
+        self.saved_seconds = 0.0
+
+    def __len__(self):
+        return len(self._results)
+
+    async def get(self, key, compute):
+        hit = self._results.get(key)
+        if hit is not None and hit[0] > self.clock():
+            self.cached += 1
+            self.saved_seconds += hit[2]
+            return hit[1]
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            await asyncio.wait({pending})
+            if not pending.cancelled():
+                value, cost = pending.result()
+                self.shared += 1
+                self.saved_seconds += cost
+                return value
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        start = time.perf_counter()
+        try:
+            value = compute()
+            if inspect.isawaitable(value):
+                value = await value
+        except BaseException:
+            future.cancel()
+            raise
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+        cost = time.perf_counter() - start
+        self._results.put(key, (self.clock() + self.ttl, value, cost))
+        self.computed += 1
+        future.set_result((value, cost))
+        return value
+
+    def clear(self, prefix=None):
+        """Forget cached results: all, or only tuple keys starting with `prefix`."""
+        self._results.clear(prefix)
+
+    def saved_ratio(self) -> float:
+        """Share of requests answered without computing."""
+        total = self.computed + self.cached + self.shared
+        return (self.cached + self.shared) / total if total else 0.0
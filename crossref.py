@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+import urllib.parse
+from collections import deque
+
+
+# ---------------------------------------------------------
+# MULTI-PATTERN MATCHING
+# ---------------------------------------------------------
+class AhoCorasick:
+    """Find every occurrence of a fixed set of phrases in one pass over a text.
+
+    Matches are whole words only and case-sensitive, so "Long" matches
+    "Long to extend..." but not "long" or "Longer". Where matches
+    overlap, the leftmost and then longest one wins ("Sea Overlord",
+    not "Sea").
+    """
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]  # pattern ids ending at each state, longest first
+
+        for pid, pattern in enumerate(self.patterns):
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(pid)
+
+        # breadth-first, so a state's fail target is finished before it
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find(self, text):
+        """[(start, end, pattern id)] of whole-word matches, non-overlapping."""
+        found = []
+        state = 0
+        for end, ch in enumerate(text, 1):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            for pid in self._out[state]:
+                start = end - len(self.patterns[pid])
+                if _is_boundary(text, start - 1) and _is_boundary(text, end):
+                    found.append((start, end, pid))
+
+        found.sort(key=lambda m: (m[0], m[0] - m[1]))
+        picked = []
+        last_end = 0
+        for start, end, pid in found:
+            if start >= last_end:
+                picked.append((start, end, pid))
+                last_end = end
+        return picked
+
+
+def _is_boundary(text, i):
+    return i < 0 or i >= len(text) or not (text[i].isalnum() or text[i] in "'_")
+
+
+def _clean(text):
+    return text.replace("’", "'").replace("`", "'")
+
+
+# ---------------------------------------------------------
+# ENCHANT CROSS-REFERENCE
+# ---------------------------------------------------------
+class EnchantLinks:
+    """Which rods recommend which enchant, and which categories hold it.
+
+    Built once from the enchants, categories and rods datasets' indexes;
+    every list holds index ids of the other datasets, so embeds read
+    them directly instead of scanning text per request.
+
+    * rods_for[enchant id]: rod ids whose recommended_enchants mention it
+    * enchants_for[rod id]: enchant ids its recommended_enchants mention
+    * categories_for[enchant id]: category ids listing it
+    * members[category id]: (display name, enchant id or None) in file order
+    """
+
+    def __init__(self, enchants, categories, rods):
+        names = [_clean(enchants.display_name(i)) for i in range(len(enchants))]
+        matcher = AhoCorasick(names)
+
+        self.rods_for = [[] for _ in range(len(enchants))]
+        self.enchants_for = []
+        for rod_id, rod in enumerate(rods.entries):
+            text = "\n".join(_clean(line) for line in rod.get("recommended_enchants") or ())
+            mentioned = list(dict.fromkeys(pid for _, _, pid in matcher.find(text)))
+            self.enchants_for.append(mentioned)
+            for ench_id in mentioned:
+                self.rods_for[ench_id].append(rod_id)
+        rod_names = [urllib.parse.unquote(rods.display_name(i)).lower() for i in range(len(rods))]
+        for rod_ids in self.rods_for:
+            rod_ids.sort(key=rod_names.__getitem__)
+
+        self.categories_for = [[] for _ in range(len(enchants))]
+        self.members = []
+        for cat_id, category in enumerate(categories.entries):
+            members = []
+            for name in category.get("enchants") or ():
+                ench_id = enchants.match_id(name)
+                members.append((name, ench_id))
+                if ench_id is not None and cat_id not in self.categories_for[ench_id]:
+                    self.categories_for[ench_id].append(cat_id)
+            self.members.append(members)
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+import asyncio
+import json
+import os
+
+from journal import diff_path
+from lookup import LookupIndex, Autocomplete
+from snapshot import compact, read_snapshot, write_snapshot
+
+# a diff touching more than this share of a dataset's entries is
+# rebuilt instead: patching costs more per entry than a full build
+PATCH_MAX_SHARE = 0.25
+
+
+# ---------------------------------------------------------
+# DATASETS
+# ---------------------------------------------------------
+class Dataset:
+    """One loaded data file plus everything derived from it.
+
+    Never modified after construction: a reload builds a whole new Dataset
+    and swaps it in, so a command that grabbed a Dataset keeps a
+    consistent view of entries and indexes until it finishes.
+
+    A Dataset made by patched() has `patch` set to the DatasetPatch it
+    applied, so anything derived from the previous Dataset can be patched
+    the same way; a full build has None.
+
+    Tables built from a Dataset by its users are memoised on it with
+    derive(), so they live and are swapped exactly as long as it is.
+    """
+
+    __slots__ = ("name", "path", "signature", "data", "index", "complete", "records",
+                 "ingest", "patch", "derived")
+
+    def __init__(self, name, path, signature, data, make_choice, ingest=None):
+        self.name = name
+        self.path = path
+        self.signature = signature
+        self.data = data
+        self.index = LookupIndex(data)
+        self.complete = Autocomplete(self.index, make_choice)
+        # typed records aligned with index ids, for datasets that have them
+        self.ingest = ingest
+        self.records = ingest(self.index.keys, self.index.entries) if ingest else None
+        self.patch = None
+        self.derived = {}
+
+    def derive(self, name, build):
+        """build(self), computed on first use and kept with this Dataset.
+
+        DataStore.on_prepare callbacks use this to build a reloaded
+        Dataset's tables in the worker thread, before it is swapped in.
+        """
+        value = self.derived.get(name)
+        if value is None:
+            value = self.derived[name] = build(self)
+        return value
+
+    def patched(self, signature, added, changed, removed):
+        """A new Dataset with a scrape diff applied.
+
+        Changed entries keep their id, added ones get new ids at the end
+        and a removed entry's id is taken over by the current last entry,
+        so no other id moves. Raises ValueError if the diff doesn't fit
+        this Dataset.
+
+        Only the diff's entries are parsed, ingested and indexed again:
+        that per-entry Python work is O(changed). Nothing is shared with
+        this Dataset, though, so its flat lists and dicts (keys, entries,
+        the sorted lookup arrays, by_key / by_name, the fuzzy deletes)
+        are still copied, which is O(n) but done in C. What a patch saves
+        over a rebuild is parsing the file and indexing every entry
+        (benchmarks/bench_patch.py), not the O(n) work.
+
+        Tables derived with derive() start empty and are built again in
+        full from the result, in the reload thread (DataStore.on_prepare);
+        of the bot's, only the search segment is patched from `patch`.
+        """
+        keys = list(self.index.keys)
+        entries = list(self.index.entries)
+        position = dict(zip(keys, range(len(keys))))
+        if any(key in position for key in added):
+            raise ValueError(f"{self.name}: diff adds entries that already exist")
+        if any(key not in position for key in (*changed, *removed)):
+            raise ValueError(f"{self.name}: diff changes or removes unknown entries")
+        if set(changed) & set(removed):
+            raise ValueError(f"{self.name}: diff both changes and removes an entry")
+        new_entries = compact({**added, **changed})
+
+        stale, fresh = set(), set()
+        for key in changed:
+            idx = position[key]
+            entries[idx] = new_entries[key]
+            stale.add(idx)
+            fresh.add(idx)
+        for idx in sorted((position[key] for key in removed), reverse=True):
+            last = len(keys) - 1
+            stale.update((idx, last))
+            fresh.discard(last)
+            if idx != last:
+                keys[idx] = keys[last]
+                entries[idx] = entries[last]
+                fresh.add(idx)
+            keys.pop()
+            entries.pop()
+        for key in added:
+            fresh.add(len(keys))
+            keys.append(key)
+            entries.append(new_entries[key])
+        stale, fresh = sorted(stale), sorted(fresh)
+
+        new = object.__new__(Dataset)
+        new.name = self.name
+        new.path = self.path
+        new.signature = signature
+        new.index = self.index.patched(keys, entries, stale, fresh)
+        new.data = new.index.dataset
+        new.complete = self.complete.patched(new.index, fresh)
+        new.ingest = self.ingest
+        new.records = None
+        if self.ingest:
+            records = self.records[:len(keys)]
+            records += [None] * (len(keys) - len(records))
+            for idx, record in zip(fresh, self.ingest([keys[i] for i in fresh], [entries[i] for i in fresh])):
+                records[idx] = record
+            new.records = records
+        new.patch = DatasetPatch(self.signature, stale, fresh, {*added, *changed, *removed})
+        new.derived = {}
+        return new
+
+    def canonical(self):
+        """Entries, indexes, choices and records keyed by entry key; see
+        LookupIndex.canonical()."""
+        keys = self.index.keys
+        out = self.index.canonical()
+        out["choices"] = {choice.value: choice.name for choice in self.complete.choices}
+        if self.records is not None:
+            out["records"] = {
+                key: tuple(getattr(record, slot, None) for slot in record.__slots__)
+                for key, record in zip(keys, self.records)
+            }
+        return out
+
+
+class DatasetPatch:
+    """How a patched Dataset differs from the one it was made from.
+
+    * base: signature of that Dataset
+    * stale: ids (numbered as in that Dataset) whose entries were
+      removed, changed or moved away
+    * fresh: ids (numbered as in the new one) whose entries were added,
+      changed or moved there
+    * keys: every added, changed or removed entry key
+    """
+
+    __slots__ = ("base", "stale", "fresh", "keys")
+
+    def __init__(self, base, stale, fresh, keys):
+        self.base = base
+        self.stale = stale
+        self.fresh = fresh
+        self.keys = keys
+
+
+def compare_datasets(a, b, limit=5):
+    """What differs between two Datasets' canonical() views: [] if
+    nothing, else up to `limit` descriptions."""
+    left, right = a.canonical(), b.canonical()
+    problems = []
+    for part in left.keys() | right.keys():
+        x, y = left.get(part), right.get(part)
+        if x == y:
+            continue
+        if isinstance(x, dict) and isinstance(y, dict):
+            keys = sorted((k for k in x.keys() | y.keys() if x.get(k) != y.get(k)), key=repr)
+            problems.append(f"{part}: {len(keys)} differ, e.g. {keys[:3]!r}")
+        else:
+            problems.append(f"{part} differs")
+    return sorted(problems)[:limit]
+
+
+def file_signature(path):
+    """(mtime, size) of `path`, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def read_json(path):
+    """Parse a data file, raising on anything but a JSON object."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: expected a JSON object, got {type(data).__name__}")
+    return data
+
+
+def load_data(path, signature=None, use_snapshot=True):
+    """Entries for `path` as compact Records, from its snapshot if fresh.
+
+    When the snapshot is missing or stale (or `use_snapshot` is False) the
+    JSON is parsed instead and a new snapshot is written for next time,
+    stamped with `signature`: the file's signature taken before reading
+    it (now, if not given). This is the only place the bot writes
+    snapshots, so a snapshot with a matching stamp always came from the
+    file.
+    """
+    data = read_snapshot(path) if use_snapshot else None
+    if data is not None:
+        return data
+    if signature is None:
+        signature = file_signature(path)
+    raw = read_json(path)
+    try:
+        write_snapshot(path, raw, signature)
+    except OSError as e:
+        print(f"⚠️ Could not write snapshot for {path}: {e!r}")
+    return compact(raw)
+
+
+def build_dataset(name, path, make_choice, ingest=None, use_snapshot=True):
+    signature = file_signature(path)
+    return Dataset(name, path, signature, load_data(path, signature, use_snapshot), make_choice, ingest)
+
+
+def read_diff(ds):
+    """The scrape diff taking `ds` to its file's current contents, or
+    None if there isn't one that applies or it is too big to be worth
+    patching (see journal.write_json_stream)."""
+    try:
+        diff = read_json(diff_path(ds.path))
+    except (OSError, ValueError):
+        return None
+    if (tuple(diff.get("base") or ()) != ds.signature
+            or tuple(diff.get("target") or ()) != file_signature(ds.path)):
+        return None
+    size = sum(len(diff.get(part) or ()) for part in ("added", "changed", "removed"))
+    if size > PATCH_MAX_SHARE * max(len(ds.index), 1):
+        return None
+    return diff
+
+
+def patch_dataset(ds, diff):
+    """ds.patched() with `diff`.
+
+    No snapshot is written from the result: a snapshot stamped with the
+    file's signature is trusted as that file's contents, and a patch is
+    only known to be that once it has been checked against the file
+    (DataStore._verified, which writes one from the JSON it reads).
+    Until then the file's snapshot is stale and the next start parses
+    the JSON.
+    """
+    return ds.patched(
+        tuple(diff["target"]), diff.get("added") or {}, diff.get("changed") or {},
+        diff.get("removed") or []
+    )
+
+
+# ---------------------------------------------------------
+# STORE + HOT RELOAD
+# ---------------------------------------------------------
+class DataStore:
+    """Holds the current Dataset for each data file and reloads on change.
+
+    `sources` maps dataset name -> JSON path, and `ingest` optionally maps
+    a dataset name to a function building its typed records. Callbacks
+    registered with on_prepare(fn) are called as fn(new_dataset) in the
+    worker thread that loaded it, before the swap, to build whatever is
+    derived from it; ones registered with on_reload(fn) are called the
+    same way on the event loop right after the swap, and should only
+    install what was prepared.
+
+    When the scraper left a diff from the loaded file to the new one, the
+    new Dataset is patched from the current one instead of rebuilt, which
+    skips parsing and re-indexing the unchanged entries (see
+    Dataset.patched for what it still costs).
+    Every `verify_every`-th patch of a dataset (the first one included)
+    is also checked against a full rebuild from the JSON, which replaces
+    it if they differ; 0 never checks. `reloads` counts "patched", "rebuilt",
+    "verified" and "mismatched" reloads.
+    """
+
+    def __init__(self, sources: dict, make_choice, ingest=None, verify_every=10):
+        self.sources = dict(sources)
+        self.make_choice = make_choice
+        self.ingest = dict(ingest or {})
+        self.verify_every = verify_every
+        self._datasets = {}
+        self._pending = {}
+        self._failed = {}
+        self._callbacks = []
+        self._preparers = []
+        self._patches = {}
+        self.reloads = dict.fromkeys(("patched", "rebuilt", "verified", "mismatched"), 0)
+        # False until load_all() has finished; nothing can be read before
+        self.loaded = False
+
+    def __getitem__(self, name) -> Dataset:
+        return self._datasets[name]
+
+    def get(self, name) -> Dataset:
+        return self._datasets[name]
+
+    def on_prepare(self, fn):
+        self._preparers.append(fn)
+        return fn
+
+    def on_reload(self, fn):
+        self._callbacks.append(fn)
+        return fn
+
+    def load_all(self):
+        """Initial synchronous load. A bad file gives an empty dataset.
+
+        Safe to run in a worker thread: readers should wait for `loaded`.
+        """
+        for name, path in self.sources.items():
+            try:
+                ds = build_dataset(name, path, self.make_choice, self.ingest.get(name))
+            except Exception as e:
+                print(f"⚠️ Could not load {path}: {e!r} — starting with no {name} data.")
+                ds = Dataset(name, path, file_signature(path), {}, self.make_choice,
+                             self.ingest.get(name))
+            self._datasets[name] = ds
+        self.loaded = True
+
+    async def reload(self, name):
+        """Patch or rebuild one dataset off the event loop and swap it in.
+
+        On failure the current dataset stays in place and False is returned.
+        """
+        path = self.sources[name]
+        try:
+            ds = await asyncio.to_thread(self._prepared, name)
+        except Exception as e:
+            print(f"⚠️ Reload of {path} failed, keeping previous {name} data: {e!r}")
+            # don't retry the same broken file on every poll
+            self._failed[name] = file_signature(path)
+            return False
+
+        self._datasets[name] = ds
+        self._failed.pop(name, None)
+        how = "patched" if ds.patch is not None else "rebuilt"
+        self.reloads[how] += 1
+        print(f"🔄 Reloaded {name} ({how}): {len(ds.data)} entries from {path}.")
+        for fn in self._callbacks:
+            try:
+                fn(ds)
+            except Exception as e:
+                print(f"⚠️ Reload callback {fn.__name__} failed: {e!r}")
+        return True
+
+    def _prepared(self, name):
+        """_load_next(name) with the on_prepare callbacks run on it."""
+        ds = self._load_next(name)
+        for fn in self._preparers:
+            try:
+                fn(ds)
+            except Exception as e:
+                print(f"⚠️ Reload preparation {fn.__name__} failed: {e!r}")
+        return ds
+
+    def _load_next(self, name):
+        """The next Dataset for `name`: patched from the current one if
+        there is a diff for it, otherwise (or if patching fails) rebuilt."""
+        path = self.sources[name]
+        current = self._datasets.get(name)
+        diff = read_diff(current) if current is not None else None
+        if diff is not None:
+            try:
+                ds = patch_dataset(current, diff)
+            except Exception as e:
+                print(f"⚠️ Could not apply {diff_path(path)}, rebuilding {name}: {e!r}")
+            else:
+                return self._verified(ds)
+        return build_dataset(name, path, self.make_choice, self.ingest.get(name))
+
+    def _verified(self, ds):
+        """`ds`, or a full rebuild if this patch is due a check and fails it.
+
+        The rebuild parses the JSON itself, never the snapshot, which may
+        be older than the file or (if anything ever wrote one from a
+        patch) hold the very data being checked.
+        """
+        count = self._patches[ds.name] = self._patches.get(ds.name, 0) + 1
+        if not self.verify_every or (count - 1) % self.verify_every:
+            return ds
+        rebuilt = build_dataset(ds.name, ds.path, self.make_choice, self.ingest.get(ds.name),
+                                use_snapshot=False)
+        if rebuilt.signature != ds.signature:
+            return rebuilt  # the file changed again meanwhile
+        problems = compare_datasets(ds, rebuilt)
+        self.reloads["verified"] += 1
+        if not problems:
+            return ds
+        self.reloads["mismatched"] += 1
+        print(f"⚠️ Patched {ds.name} differs from a full rebuild, using the rebuild: {'; '.join(problems)}")
+        return rebuilt
+
+    async def check(self):
+        """Reload every dataset whose file changed and has settled.
+
+        A file counts as settled once its signature is the same on two
+        consecutive checks, so a scraper mid-write is not picked up.
+        """
+        for name, path in self.sources.items():
+            sig = file_signature(path)
+            if sig is None or sig in (self._datasets[name].signature, self._failed.get(name)):
+                self._pending.pop(name, None)
+                continue
+            if self._pending.get(name) != sig:
+                self._pending[name] = sig
+                continue
+            del self._pending[name]
+            await self.reload(name)
+
+    async def watch(self, interval=5.0):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.check()
+            except Exception as e:
+                print(f"⚠️ Data watcher error: {e!r}")
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""Shared HTTP layer for the scrapers.
+
+    async with Fetcher(headers=HEADERS) as fetcher:
+        page = await fetcher.get(url)
+        if page.status == 200:
+            ...
+    print(fetcher.summary())
+
+One pooled aiohttp session per run, a token bucket capping requests per
+second, and an adaptive concurrency limit (AIMD: +1 after a window of
+clean responses, halved on 429/5xx). Throttled, failed and timed-out
+requests are retried with jittered exponential backoff, honouring
+Retry-After. Every request's latency, size and status is recorded in
+`fetcher.stats`.
+"""
+import asyncio
+import random
+import time
+from collections import Counter
+
+import aiohttp
+
+RATE = 20.0             # requests per second, sustained
+BURST = 20              # requests allowed back to back
+CONCURRENCY = 8         # starting number of requests in flight
+MAX_CONCURRENCY = 32
+RETRIES = 4
+BACKOFF = 0.5           # seconds; doubled per attempt, then jittered
+MAX_BACKOFF = 30.0
+TIMEOUT = 20.0
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class FetchError(Exception):
+    """A request still failed (network error / timeout) after every retry."""
+
+
+class Page:
+    __slots__ = ("url", "status", "text", "headers", "seconds")
+
+    def __init__(self, url, status, text, headers, seconds):
+        self.url = url
+        self.status = status
+        self.text = text          # None for 304 / HEAD-like responses
+        self.headers = headers
+        self.seconds = seconds
+
+    def __repr__(self):
+        return f"Page({self.url!r}, {self.status})"
+
+
+# ---------------------------------------------------------
+# RATE AND CONCURRENCY CONTROL
+# ---------------------------------------------------------
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, `burst` at once."""
+
+    def __init__(self, rate=RATE, burst=BURST):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.rate:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def drain(self):
+        """Throw away saved-up tokens, e.g. after the server asked us to slow down."""
+        self.tokens = 0.0
+        self.updated = time.monotonic()
+
+
+class AdaptiveLimit:
+    """Concurrency limit that grows while the server copes and halves when it doesn't.
+
+    One throttled burst only halves the limit once: a cut only counts
+    requests that were started after the previous cut.
+    """
+
+    def __init__(self, initial=CONCURRENCY, minimum=1, maximum=MAX_CONCURRENCY):
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self.peak = initial
+        self._clean = 0
+        self._last_cut = 0.0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self) -> float:
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+        return time.monotonic()
+
+    async def release(self, started, throttled):
+        async with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self._clean = 0
+                if started >= self._last_cut:
+                    self.limit = max(self.minimum, self.limit // 2)
+                    self._last_cut = time.monotonic()
+            else:
+                self._clean += 1
+                if self._clean >= self.limit and self.limit < self.maximum:
+                    self.limit += 1
+                    self.peak = max(self.peak, self.limit)
+                    self._clean = 0
+            self._cond.notify_all()
+
+
+# ---------------------------------------------------------
+# METRICS
+# ---------------------------------------------------------
+class FetchStats:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.latencies = []
+        self.statuses = Counter()
+        self.bytes = 0
+        self.retries = 0
+        self.errors = 0
+
+    def record(self, status, seconds, size):
+        self.latencies.append(seconds)
+        self.statuses[status] += 1
+        self.bytes += size
+
+    def percentile(self, p):
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    def summary(self, limit=None) -> str:
+        elapsed = time.monotonic() - self.started
+        n = len(self.latencies)
+        statuses = ", ".join(f"{s}×{c}" for s, c in sorted(self.statuses.items()))
+        text = (f"{n} requests in {elapsed:.1f}s ({n / elapsed if elapsed else 0:.1f}/s, "
+                f"{self.bytes / 2**20:.1f} MiB), latency p50 {self.percentile(50) * 1000:.0f} ms "
+                f"p95 {self.percentile(95) * 1000:.0f} ms, {self.retries} retries, "
+                f"{self.errors} failed [{statuses}]")
+        if limit is not None:
+            text += f", concurrency {limit.limit} (peak {limit.peak})"
+        return text
+
+
+# ---------------------------------------------------------
+# FETCHER
+# ---------------------------------------------------------
+def _retry_after(headers):
+    try:
+        return min(MAX_BACKOFF, float(headers.get("Retry-After", "")))
+    except ValueError:
+        return None
+
+
+class Fetcher:
+    def __init__(self, headers=None, rate=RATE, burst=BURST, concurrency=CONCURRENCY,
+                 max_concurrency=MAX_CONCURRENCY, retries=RETRIES, timeout=TIMEOUT):
+        self.headers = headers or {}
+        self.bucket = TokenBucket(rate, burst)
+        self.limit = AdaptiveLimit(concurrency, 1, max_concurrency)
+        self.retries = retries
+        self.timeout = timeout
+        self.stats = FetchStats()
+        self.session = None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.limit.maximum,
+            limit_per_host=self.limit.maximum,
+            ttl_dns_cache=300,
+            keepalive_timeout=30,
+            enable_cleanup_closed=True,
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            headers=self.headers,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    async def _once(self, url, headers, params):
+        await self.bucket.acquire()
+        started = await self.limit.acquire()
+        throttled = True
+        try:
+            async with self.session.get(url, headers=headers, params=params) as resp:
+                text = None if resp.status == 304 else await resp.text()
+                throttled = resp.status in RETRY_STATUSES
+                elapsed = time.monotonic() - started
+                self.stats.record(resp.status, elapsed, len(text or ""))
+                return Page(url, resp.status, text, resp.headers, elapsed)
+        finally:
+            await self.limit.release(started, throttled)
+
+    async def get(self, url, headers=None, params=None) -> Page:
+        """GET `url`, retrying throttling, 5xx and network errors.
+
+        Returns the last response (check `.status`); raises FetchError if
+        no response was received at all.
+        """
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            try:
+                page = await self._once(url, headers, params)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if last:
+                    self.stats.errors += 1
+                    raise FetchError(f"{url}: {e!r}") from e
+                wait = None
+            else:
+                if page.status not in RETRY_STATUSES or last:
+                    return page
+                wait = _retry_after(page.headers)
+                if page.status == 429:
+                    self.bucket.drain()
+            backoff = random.uniform(0, min(MAX_BACKOFF, BACKOFF * 2 ** attempt))
+            self.stats.retries += 1
+            await asyncio.sleep(max(wait or 0, backoff))
+
+    def summary(self) -> str:
+        return self.stats.summary(self.limit)
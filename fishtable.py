@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+import math
+import re
+from array import array
+
+from lookup import normalize
+
+# column -> label, for the filters /fishsearch offers
+FILTERS = {
+    "rarity": "Rarity",
+    "location": "Location",
+    "sub_location": "Sub-location",
+    "time": "Time",
+    "weather": "Weather",
+    "season": "Season",
+    "bait": "Bait",
+}
+# "None" in these columns means the fish doesn't care, so it matches any value
+WILDCARD_FILTERS = ("time", "weather", "season")
+WILDCARD_VALUES = ("", "none", "none!", "any")
+
+# sortable numeric column -> label
+SORTS = {
+    "base_value": "Base C$",
+    "value_per_kg": "C$/kg",
+    "max_kg": "Max kg",
+    "xp": "XP",
+}
+
+_SPLIT = re.compile(r"\s*,\s*")
+
+
+def _tokens(column, value):
+    if not value:
+        return []
+    if column in WILDCARD_FILTERS or column == "bait":
+        return [t for t in _SPLIT.split(value) if t]
+    return [value]
+
+
+class FishTable:
+    """Column-oriented view of the bestiary for filtering and sorting.
+
+    * each numeric sort column is an array('d'), NaN where unknown
+    * each filter column is an inverted index: normalized value -> bitset
+      of row ids (a Python int), so combining filters is a few `&`s
+    * each sort column has a precomputed descending row order (and each
+      row's rank in it), so results never need their values compared
+
+    Rows are aligned with the bestiary Dataset's records.
+    """
+
+    def __init__(self, records, make_choice=None, choice_limit=25):
+        self.records = records
+        self.all_rows = (1 << len(records)) - 1
+        self.choice_limit = choice_limit
+
+        self.columns = {}
+        self.order = {}
+        self.rank = {}
+        for col in SORTS:
+            values = array("d", (self._number(fish, col) for fish in records))
+            self.columns[col] = values
+            known = [i for i, v in enumerate(values) if not math.isnan(v)]
+            known.sort(key=values.__getitem__, reverse=True)
+            unknown = [i for i, v in enumerate(values) if math.isnan(v)]
+            typecode = "H" if len(records) < 2**16 else "L"
+            self.order[col] = array(typecode, known + unknown)
+            rank = array(typecode, bytes(len(records) * array(typecode).itemsize))
+            for pos, row in enumerate(self.order[col]):
+                rank[row] = pos
+            self.rank[col] = rank
+
+        self.index = {col: {} for col in FILTERS}
+        self.wild = {col: 0 for col in WILDCARD_FILTERS}
+        labels = {col: {} for col in FILTERS}
+        for row, fish in enumerate(records):
+            bit = 1 << row
+            for col in FILTERS:
+                raw = getattr(fish, col)
+                if col in WILDCARD_FILTERS and normalize(raw or "") in WILDCARD_VALUES:
+                    self.wild[col] |= bit
+                    continue
+                for token in _tokens(col, raw):
+                    key = normalize(token)
+                    self.index[col][key] = self.index[col].get(key, 0) | bit
+                    labels[col].setdefault(key, token)
+
+        # display values per filter column, for autocomplete
+        self.values = {col: sorted(labels[col].values(), key=str.lower) for col in FILTERS}
+        self._normalized = {col: [normalize(v) for v in vals] for col, vals in self.values.items()}
+        self.choices = None
+        if make_choice is not None:
+            self.choices = {
+                col: [make_choice(name=v, value=v) for v in vals]
+                for col, vals in self.values.items()
+            }
+
+    @staticmethod
+    def _number(fish, col):
+        value = getattr(fish, col)
+        if col == "max_kg" and value is None:
+            value = fish.true_max_kg
+        return math.nan if value is None else float(value)
+
+    def __len__(self):
+        return len(self.records)
+
+    def mask(self, **filters) -> int:
+        """Bitset of rows matching every given filter (None = no filter)."""
+        mask = self.all_rows
+        for col, value in filters.items():
+            if not value:
+                continue
+            bits = self.index[col].get(normalize(value), 0) | self.wild.get(col, 0)
+            mask &= bits
+            if not mask:
+                break
+        return mask
+
+    def search(self, sort="base_value", **filters):
+        """Row ids matching `filters`, best first by `sort`."""
+        mask = self.mask(**filters)
+        if not mask:
+            return []
+        if mask == self.all_rows:
+            return list(self.order[sort])
+        if mask.bit_count() * 8 > len(self.records):
+            # big result: walk the precomputed order
+            return [row for row in self.order[sort] if mask >> row & 1]
+        # small result: pull the set bits out and order them by rank
+        rows = []
+        while mask:
+            low = mask & -mask
+            rows.append(low.bit_length() - 1)
+            mask ^= low
+        rows.sort(key=self.rank[sort].__getitem__)
+        return rows
+
+    def complete(self, column, current):
+        """Autocomplete for a filter column: prefix matches, then the rest."""
+        target = normalize(current)
+        normalized = self._normalized[column]
+        hits = [i for i, v in enumerate(normalized) if v.startswith(target)]
+        if len(hits) < self.choice_limit:
+            hits += [i for i, v in enumerate(normalized)
+                     if target in v and not v.startswith(target)]
+        hits = hits[:self.choice_limit]
+        if self.choices is None:
+            return [self.values[column][i] for i in hits]
+        return [self.choices[column][i] for i in hits]
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""Append-only scrape journal and atomic JSON output.
+
+A scrape appends one JSON line per finished page to its journal, so a
+crash loses at most the page in flight and the next run can pick up
+where it stopped (--resume). Output files are compacted from the
+journal at the end, streamed to a temp file and renamed over the old
+file, so the bot never sees a half-written dataset and the scraper
+never holds the whole dataset in memory.
+
+Outputs written with diff=True also get a data/<name>.diff listing the
+added, changed and removed entries, which the bot applies instead of
+reloading the whole file (see datastore.py), and a data/<name>.digests
+with a digest per entry, which the next diff is made against instead of
+parsing the old file.
+"""
+import hashlib
+import json
+import os
+
+SYNC_EVERY = 50  # fsync the journal every N records
+DIFF_SUFFIX = ".diff"
+DIGESTS_SUFFIX = ".digests"
+
+
+def diff_path(json_path: str) -> str:
+    return os.path.splitext(json_path)[0] + DIFF_SUFFIX
+
+
+def digests_path(json_path: str) -> str:
+    return os.path.splitext(json_path)[0] + DIGESTS_SUFFIX
+
+
+def _signature(path):
+    """[mtime_ns, size], as the bot's file_signature() reports it."""
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _entry_text(value) -> str:
+    return json.dumps(value, indent=2, ensure_ascii=False)
+
+
+def _digest(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _stored_digests(path):
+    """{key: digest} from digests_path(path), or None if it is missing
+    or was not written for the file now at `path`."""
+    try:
+        with open(digests_path(path), "r", encoding="utf-8") as f:
+            stored = json.load(f)
+        signature = _signature(path)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(stored, dict) or stored.get("source") != signature:
+        return None
+    return stored.get("digests")
+
+
+def _parsed_digests(path):
+    """{key: digest} of the entries in an existing output, or None.
+
+    The fallback when there are no stored digests (the file was written
+    without diff=True, or by hand): the old file is parsed in full, but
+    only the digests are kept.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            old = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(old, dict):
+        return None
+    return {key: _digest(_entry_text(value)) for key, value in old.items()}
+
+
+def _write_digests(path, digests):
+    try:
+        write_json(digests_path(path), {"source": _signature(path), "digests": digests})
+    except OSError as e:
+        # only costs the next diff a parse of the old file
+        print(f"⚠️ Could not write {digests_path(path)}: {e!r}")
+
+
+def write_json_stream(path, items, diff=False):
+    """Write (key, value) pairs as a JSON object, formatted like
+    json.dump(indent=2, ensure_ascii=False), then atomically replace
+    `path`. An identical existing file is left untouched.
+
+    With `diff`, a changed file first gets a diff against the file it
+    replaces written to diff_path(path): {"base": signature of the old
+    file, "target": signature of the new one, "added": {key: entry},
+    "changed": {key: entry}, "removed": [key]}. The old entries are
+    compared by digest: the digests the last diff=True write of `path`
+    stored in digests_path(path), which this one replaces with the new
+    file's, so the old file is not read. Only digests per key and the
+    changed entries are held in memory. There is no diff when there was
+    no old file.
+
+    Returns (count, changed).
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    old = stored = None
+    if diff:
+        old = stored = _stored_digests(path)
+        if old is None:
+            old = _parsed_digests(path)
+    digests = {} if diff else None
+    added, changed = {}, {}
+    count = 0
+    with open(tmp, "w", encoding="utf-8") as f:
+        for key, value in items:
+            text = _entry_text(value)
+            if diff:
+                digest = digests[key] = _digest(text)
+                if old is not None:
+                    before = old.get(key)
+                    if before is None:
+                        added[key] = value
+                    elif before != digest:
+                        changed[key] = value
+            f.write("{\n  " if count == 0 else ",\n  ")
+            f.write(json.dumps(key, ensure_ascii=False))
+            f.write(": ")
+            f.write(text.replace("\n", "\n  "))
+            count += 1
+        f.write("\n}" if count else "{}")
+        f.flush()
+        os.fsync(f.fileno())
+    if _same_contents(tmp, path):
+        os.remove(tmp)
+        if diff and stored is None:
+            _write_digests(path, digests)
+        return count, False
+    if old is not None:
+        # written before the rename (which keeps the mtime), so the bot
+        # never sees the new file without its diff
+        write_json(diff_path(path), {
+            "base": _signature(path),
+            "target": _signature(tmp),
+            "added": added,
+            "changed": changed,
+            "removed": [key for key in old if key not in digests],
+        })
+    os.replace(tmp, path)
+    if diff:
+        _write_digests(path, digests)
+    return count, True
+
+
+def write_json(path, data, diff=False):
+    """Atomic json.dump(data, indent=2) of a dict."""
+    return write_json_stream(path, data.items(), diff)
+
+
+def _same_contents(a, b, chunk=1 << 16):
+    try:
+        if os.path.getsize(a) != os.path.getsize(b):
+            return False
+        with open(a, "rb") as fa, open(b, "rb") as fb:
+            while True:
+                x, y = fa.read(chunk), fb.read(chunk)
+                if x != y:
+                    return False
+                if not x:
+                    return True
+    except OSError:
+        return False
+
+
+class Journal:
+    """JSONL file of scrape results, one record per page.
+
+    Records are dicts with at least "title" and "key"; successful ones
+    carry "kind" and "page", failed ones "failed". Later records for the
+    same key win.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.pending = 0
+
+    def open(self, resume=False) -> set:
+        """Open for appending; returns titles already done when resuming."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        done = set()
+        if resume and os.path.exists(self.path):
+            self._drop_partial_line()
+            for _, record in self._records():
+                if "failed" in record:
+                    done.discard(record["title"])
+                else:
+                    done.add(record["title"])
+            self.file = open(self.path, "a", encoding="utf-8")
+        else:
+            self.file = open(self.path, "w", encoding="utf-8")
+        return done
+
+    def _drop_partial_line(self):
+        # a crash mid-write leaves a line without its newline; cut it off
+        with open(self.path, "rb+") as f:
+            data_end = f.seek(0, os.SEEK_END)
+            pos = data_end
+            while pos > 0:
+                step = min(4096, pos)
+                f.seek(pos - step)
+                block = f.read(step)
+                nl = block.rfind(b"\n")
+                if nl != -1:
+                    pos = pos - step + nl + 1
+                    break
+                pos -= step
+            if pos != data_end:
+                f.truncate(pos)
+
+    def append(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+        self.pending += 1
+        if self.pending >= SYNC_EVERY:
+            os.fsync(self.file.fileno())
+            self.pending = 0
+
+    def close(self):
+        if self.file:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.file.close()
+            self.file = None
+
+    def remove(self):
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _records(self):
+        """(offset, record) for every complete line."""
+        with open(self.path, "rb") as f:
+            offset = 0
+            for line in f:
+                try:
+                    yield offset, json.loads(line)
+                except ValueError:
+                    pass
+                offset += len(line)
+
+    def _read_at(self, f, offset):
+        f.seek(offset)
+        return json.loads(f.readline())
+
+    def compact(self, outputs, extra=None, diff=False):
+        """Write every kind's latest pages to outputs[kind].
+
+        Only byte offsets are kept in memory; pages are read back from the
+        journal one at a time while the output is written. `extra` maps
+        key -> (kind, page) for pages to include that are not in the
+        journal; `diff` is passed on to write_json_stream. Returns {kind:
+        (count, changed)}.
+        """
+        self.close()
+        latest = {}
+        for offset, record in self._records():
+            if "failed" not in record:
+                latest[record["key"]] = (record.get("kind"), offset)
+
+        by_kind = {kind: [] for kind in outputs}
+        for key, (kind, offset) in latest.items():
+            if kind in by_kind:
+                by_kind[kind].append((key, offset))
+
+        written = {}
+        with open(self.path, "rb") as f:
+            for kind, path in outputs.items():
+                def items():
+                    for key, offset in by_kind[kind]:
+                        yield key, self._read_at(f, offset)["page"]
+                    for key, (extra_kind, page) in (extra or {}).items():
+                        if extra_kind == kind and key not in latest:
+                            yield key, page
+                written[kind] = write_json_stream(path, items(), diff)
+        return written
+
+    def failed_keys(self) -> set:
+        """Keys whose pages only ever failed."""
+        ok, failed = set(), set()
+        for _, record in self._records():
+            (failed if "failed" in record else ok).add(record["key"])
+        return failed - ok
@@ -0,0 +1,529 @@
+#!/usr/bin/env python3
+import re
+import urllib.parse
+from bisect import bisect_left, bisect_right
+from collections import Counter
+
+_WORD_SPLIT = re.compile(r"[^0-9a-z']+")
+
+# Sorts after every character we will ever see in a normalized name, so
+# `prefix + _HIGH` is an upper bound for all strings starting with `prefix`.
+_HIGH = "\U0010ffff"
+
+
+# ---------------------------------------------------------
+# NORMALIZATION UTILITIES
+# ---------------------------------------------------------
+def normalize(s: str) -> str:
+    """Normalize for fuzzy matching."""
+    if not isinstance(s, str):
+        return ""
+    s = urllib.parse.unquote(s)
+    s = s.replace("’", "'")
+    s = s.replace("`", "'")
+    return s.lower().strip()
+
+
+# ---------------------------------------------------------
+# LOOKUP INDEX
+# ---------------------------------------------------------
+class LookupIndex:
+    """Precomputed lookup structures for one dataset.
+
+    Built once when the dataset is loaded so a lookup never has to
+    re-normalize every key and name:
+
+    * ``by_key`` / ``by_name`` — exact normalized key / name -> entry
+    * a suffix array over every normalized key and name, so "which entries
+      contain this substring" is a binary search instead of a full scan.
+    * a sorted prefix array, used to rank prefix matches first
+    * a FuzzyIndex for typo-tolerant suggestions
+
+    patched() derives the index for a slightly different dataset without
+    rebuilding it.
+    """
+
+    def __init__(self, dataset: dict, name_field="name"):
+        self.dataset = dataset
+        self.name_field = name_field
+        self.keys = list(dataset.keys())
+        self.entries = [dataset[k] for k in self.keys]
+
+        self.by_key = {}
+        self.by_name = {}
+        # normalized (key, name) per entry id, reused by the other indexes
+        self.norm_keys = []
+        self.norm_names = []
+
+        suffixes = []
+        prefixes = []
+        for idx, (key, data) in enumerate(zip(self.keys, self.entries)):
+            nkey = normalize(key)
+            nname = normalize(data.get(name_field, ""))
+            self.norm_keys.append(nkey)
+            self.norm_names.append(nname)
+
+            # first entry wins, same as the old in-order scans
+            self.by_key.setdefault(nkey, idx)
+            self.by_name.setdefault(nname, idx)
+
+            prefixes.extend((text, idx) for text in _entry_prefixes(nkey, nname))
+            suffixes.extend((text, idx) for text in _entry_suffixes(nkey, nname))
+
+        suffixes.sort()
+        self._suffixes = [s for s, _ in suffixes]
+        self._suffix_ids = [i for _, i in suffixes]
+
+        prefixes.sort()
+        self._prefixes = [s for s, _ in prefixes]
+        self._prefix_ids = [i for _, i in prefixes]
+
+        self.fuzzy = FuzzyIndex(self)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def patched(self, keys, entries, stale, fresh):
+        """A new index over `keys` / `entries`, derived from this one.
+
+        `stale` are ids (numbered as in this index) whose entries were
+        removed, changed or moved; `fresh` are ids (numbered as in `keys`)
+        whose entries were added, changed or moved there. Every other id
+        must hold the same entry in both. Only stale and fresh entries are
+        normalized again and the sorted arrays are spliced, not re-sorted;
+        the arrays, norms and exact-match dicts are still copied whole
+        (see _patch_sorted). This index is left untouched.
+        """
+        new = object.__new__(LookupIndex)
+        new.name_field = self.name_field
+        new.keys = keys
+        new.entries = entries
+        new.dataset = dict(zip(keys, entries))
+
+        size = len(keys)
+        norm_keys = self.norm_keys[:size]
+        norm_names = self.norm_names[:size]
+        norm_keys += [""] * (size - len(norm_keys))
+        norm_names += [""] * (size - len(norm_names))
+        touched = set()
+        old_prefixes, old_suffixes = [], []
+        for idx in stale:
+            nkey, nname = self.norm_keys[idx], self.norm_names[idx]
+            touched.update((nkey, nname))
+            old_prefixes.extend((text, idx) for text in _entry_prefixes(nkey, nname))
+            old_suffixes.extend((text, idx) for text in _entry_suffixes(nkey, nname))
+        new_prefixes, new_suffixes = [], []
+        for idx in fresh:
+            nkey = normalize(keys[idx])
+            nname = normalize(entries[idx].get(self.name_field, ""))
+            norm_keys[idx], norm_names[idx] = nkey, nname
+            touched.update((nkey, nname))
+            new_prefixes.extend((text, idx) for text in _entry_prefixes(nkey, nname))
+            new_suffixes.extend((text, idx) for text in _entry_suffixes(nkey, nname))
+        new.norm_keys = norm_keys
+        new.norm_names = norm_names
+
+        new._prefixes, new._prefix_ids = _patch_sorted(
+            self._prefixes, self._prefix_ids, old_prefixes, new_prefixes)
+        new._suffixes, new._suffix_ids = _patch_sorted(
+            self._suffixes, self._suffix_ids, old_suffixes, new_suffixes)
+
+        # re-pick the first entry for every key / name that may have moved
+        new.by_key = dict(self.by_key)
+        new.by_name = dict(self.by_name)
+        for text in touched:
+            lo = bisect_left(new._prefixes, text)
+            hi = bisect_right(new._prefixes, text, lo)
+            for exact, norms in ((new.by_key, norm_keys), (new.by_name, norm_names)):
+                idx = min((i for i in new._prefix_ids[lo:hi] if norms[i] == text), default=None)
+                if idx is None:
+                    exact.pop(text, None)
+                else:
+                    exact[text] = idx
+
+        new.fuzzy = self.fuzzy.patched(new, stale, fresh)
+        return new
+
+    def canonical(self):
+        """Everything this index knows, keyed by entry key instead of id,
+        so indexes over the same entries compare equal in any order."""
+        keys = self.keys
+        return {
+            "entries": {key: dict(entry) for key, entry in zip(keys, self.entries)},
+            "norms": {key: (k, n) for key, k, n in zip(keys, self.norm_keys, self.norm_names)},
+            # which of several entries sharing a text wins depends on order
+            "by_key": {text: self.norm_keys[idx] for text, idx in self.by_key.items()},
+            "by_name": {text: self.norm_names[idx] for text, idx in self.by_name.items()},
+            "prefixes": sorted((text, keys[idx]) for text, idx in zip(self._prefixes, self._prefix_ids)),
+            "suffixes": sorted((text, keys[idx]) for text, idx in zip(self._suffixes, self._suffix_ids)),
+            "prefixes_sorted": _is_sorted(self._prefixes, self._prefix_ids),
+            "suffixes_sorted": _is_sorted(self._suffixes, self._suffix_ids),
+            "fuzzy": self.fuzzy.canonical(),
+        }
+
+    def _suffix_range(self, target: str):
+        lo = bisect_left(self._suffixes, target)
+        hi = bisect_left(self._suffixes, target + _HIGH, lo)
+        return lo, hi
+
+    def containing(self, target: str, limit=None):
+        """Entry ids whose normalized key or name contains `target`.
+
+        Ids come back in dataset order. With `limit`, stops after that
+        many distinct ids (in suffix order, so which ones is unspecified).
+        """
+        lo, hi = self._suffix_range(target)
+        found = set()
+        for i in range(lo, hi):
+            found.add(self._suffix_ids[i])
+            if limit is not None and len(found) >= limit:
+                break
+        return sorted(found)
+
+    def ranked(self, target: str, limit: int):
+        """Up to `limit` entry ids containing normalized `target`.
+
+        Prefix matches (alphabetical) come first, then infix matches.
+        """
+        seen = set()
+        out = []
+
+        lo = bisect_left(self._prefixes, target)
+        hi = bisect_left(self._prefixes, target + _HIGH, lo)
+        for i in range(lo, hi):
+            idx = self._prefix_ids[i]
+            if idx not in seen:
+                seen.add(idx)
+                out.append(idx)
+                if len(out) >= limit:
+                    return out
+
+        lo, hi = self._suffix_range(target)
+        for i in range(lo, hi):
+            idx = self._suffix_ids[i]
+            if idx not in seen:
+                seen.add(idx)
+                out.append(idx)
+                if len(out) >= limit:
+                    break
+        return out
+
+    def display_name(self, idx: int) -> str:
+        return self.entries[idx].get(self.name_field, self.keys[idx])
+
+    def match_id(self, name: str):
+        target = normalize(name)
+
+        idx = self.by_key.get(target)
+        if idx is not None:
+            return idx
+
+        idx = self.by_name.get(target)
+        if idx is not None:
+            return idx
+
+        # single partial match fallback; two hits are already ambiguous
+        candidates = self.containing(target, limit=2)
+        if len(candidates) == 1:
+            return candidates[0]
+        return None
+
+    def match(self, name: str):
+        """Fuzzy match against both JSON keys and their 'name' field."""
+        idx = self.match_id(name)
+        return None if idx is None else self.entries[idx]
+
+    def resolve(self, name: str, suggestions=5):
+        """Like match(), but typo-tolerant and with "did you mean" hints.
+
+        Returns ``(entry, [])`` on a hit, otherwise ``(None, names)`` where
+        `names` are display names worth suggesting to the user. A typo only
+        resolves on its own when a single entry is clearly the closest.
+        """
+        idx, names = self.resolve_id(name, suggestions)
+        return (None if idx is None else self.entries[idx]), names
+
+    def resolve_id(self, name: str, suggestions=5):
+        """resolve(), returning the entry id instead of the entry."""
+        idx = self.match_id(name)
+        if idx is not None:
+            return idx, []
+
+        target = normalize(name)
+        partial = self.ranked(target, suggestions)
+        if partial:
+            # several substring hits: the user was vague, not wrong
+            return None, [self.display_name(i) for i in partial]
+
+        ranked = self.fuzzy.lookup(target)
+        if not ranked:
+            return None, []
+        if len(ranked) == 1 or ranked[0][0] < ranked[1][0]:
+            return ranked[0][1], []
+        return None, [self.display_name(i) for _, i in ranked[:suggestions]]
+
+
+def _entry_prefixes(nkey, nname):
+    return {nkey, nname}
+
+
+def _entry_suffixes(nkey, nname):
+    """Every suffix of an entry's key and name, plus "" (which empty
+    strings still contain, keeping every entry reachable)."""
+    out = [""]
+    for text in {nkey, nname}:
+        out.extend(text[i:] for i in range(len(text)))
+    return out
+
+
+def _patch_sorted(texts, ids, remove, add):
+    """Copies of the parallel (text, id)-sorted lists `texts` / `ids` with
+    the (text, id) pairs `remove` taken out and `add` put in.
+
+    Every removal and insertion is located by bisecting the original
+    lists, then the copies are assembled from slices in one pass, so
+    the cost is O(len(remove) + len(add)) bisects plus one C-level copy
+    of the lists, not a list.insert / del per pair.
+    """
+    cuts = []  # (position in the originals, 0 = insert before / 1 = drop, pair)
+    for (text, idx), count in Counter(remove).items():
+        lo = bisect_left(texts, text)
+        hi = bisect_right(texts, text, lo)
+        pos = bisect_left(ids, idx, lo, hi)
+        if ids[pos:pos + count] != [idx] * count:
+            raise ValueError(f"({text!r}, {idx}) is not in the index")
+        cuts.extend((p, 1, None) for p in range(pos, pos + count))
+    for text, idx in add:
+        lo = bisect_left(texts, text)
+        hi = bisect_right(texts, text, lo)
+        cuts.append((bisect_right(ids, idx, lo, hi), 0, (text, idx)))
+    cuts.sort()
+    new_texts, new_ids = [], []
+    start = 0
+    for pos, drop, pair in cuts:
+        new_texts += texts[start:pos]
+        new_ids += ids[start:pos]
+        if drop:
+            start = pos + 1
+        else:
+            new_texts.append(pair[0])
+            new_ids.append(pair[1])
+            start = pos
+    new_texts += texts[start:]
+    new_ids += ids[start:]
+    return new_texts, new_ids
+
+
+def _is_sorted(texts, ids):
+    return all(a <= b for a, b in zip(zip(texts, ids), zip(texts[1:], ids[1:])))
+
+
+# ---------------------------------------------------------
+# FUZZY (TYPO-TOLERANT) SEARCH
+# ---------------------------------------------------------
+def _deletes(s: str, distance: int) -> set:
+    """Every string reachable from `s` by deleting up to `distance` chars."""
+    out = {s}
+    frontier = {s}
+    for _ in range(distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        out |= frontier
+    return out
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance, giving up past `limit`.
+
+    Returns ``limit + 1`` as soon as the distance is known to exceed it.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2 = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        best = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            d = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if (prev2 is not None and j > 1 and a[i - 1] == b[j - 2]
+                    and a[i - 2] == b[j - 1]):
+                d = min(d, prev2[j - 2] + 1)
+            cur[j] = d
+            if d < best:
+                best = d
+        if best > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1] if prev[-1] <= limit else limit + 1
+
+
+class FuzzyIndex:
+    """SymSpell-style deletion dictionary over a LookupIndex.
+
+    Every full normalized key/name, and every word of at least
+    `min_word` letters in a name, is indexed by the strings you get from
+    deleting up to `max_distance` characters of its first `prefix_length`
+    characters. A lookup generates the same deletes for the query, so
+    only a handful of terms ever reach the real edit-distance check.
+    """
+
+    FULL, WORD = 0, 1
+
+    def __init__(self, index: LookupIndex, max_distance=2, prefix_length=7,
+                 min_word=4):
+        self.index = index
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.min_word = min_word
+
+        # term -> {entry id: FULL/WORD}
+        terms = {}
+        for idx, (nkey, nname) in enumerate(zip(index.norm_keys, index.norm_names)):
+            for term, kind in self.entry_terms(nkey, nname).items():
+                terms.setdefault(term, {})[idx] = kind
+
+        self.terms = list(terms)
+        self.term_ids = {term: tid for tid, term in enumerate(self.terms)}
+        self.term_entries = [terms[t] for t in self.terms]
+        self.deletes = {}
+        for tid, term in enumerate(self.terms):
+            for d in _deletes(term[:prefix_length], max_distance):
+                self.deletes.setdefault(d, []).append(tid)
+
+    def entry_terms(self, nkey, nname):
+        """{term: FULL/WORD} for one entry, keeping the better kind."""
+        terms = {}
+        for text in {nkey, nname}:
+            if text:
+                terms[text] = self.FULL
+        for word in _WORD_SPLIT.split(nname):
+            if len(word) >= self.min_word:
+                terms.setdefault(word, self.WORD)
+        return terms
+
+    def patched(self, index, stale, fresh):
+        """The FuzzyIndex for `index`, a LookupIndex.patched() from this
+        one's index with the same `stale` and `fresh` ids.
+
+        Terms no entry uses any more keep their (now empty) slot, so
+        existing term ids and delete lists stay valid. Only the terms of
+        stale and fresh entries are touched, but the term lists and the
+        delete map are copied (shallowly) first, so the new index costs
+        a copy of their size.
+        """
+        new = object.__new__(FuzzyIndex)
+        new.index = index
+        new.max_distance = self.max_distance
+        new.prefix_length = self.prefix_length
+        new.min_word = self.min_word
+        new.terms = list(self.terms)
+        new.term_ids = dict(self.term_ids)
+        new.term_entries = list(self.term_entries)
+        new.deletes = dict(self.deletes)
+        copied = set()
+
+        def entries_of(tid):
+            if tid not in copied:
+                new.term_entries[tid] = dict(new.term_entries[tid])
+                copied.add(tid)
+            return new.term_entries[tid]
+
+        old = self.index
+        for idx in stale:
+            for term in self.entry_terms(old.norm_keys[idx], old.norm_names[idx]):
+                entries_of(self.term_ids[term]).pop(idx, None)
+        for idx in fresh:
+            for term, kind in self.entry_terms(index.norm_keys[idx], index.norm_names[idx]).items():
+                tid = new.term_ids.get(term)
+                if tid is None:
+                    tid = len(new.terms)
+                    new.terms.append(term)
+                    new.term_ids[term] = tid
+                    new.term_entries.append({})
+                    copied.add(tid)
+                    for d in _deletes(term[:self.prefix_length], self.max_distance):
+                        new.deletes[d] = new.deletes.get(d, []) + [tid]
+                entries_of(tid)[idx] = kind
+        return new
+
+    def canonical(self):
+        """{term: {entry key: kind}} plus which live terms each delete
+        reaches, independent of entry and term ids."""
+        keys = self.index.keys
+        terms = {
+            term: {keys[idx]: kind for idx, kind in entries.items()}
+            for term, entries in zip(self.terms, self.term_entries) if entries
+        }
+        deletes = {}
+        for d, tids in self.deletes.items():
+            live = sorted(self.terms[tid] for tid in tids if self.term_entries[tid])
+            if live:
+                deletes[d] = live
+        return {"terms": terms, "deletes": deletes}
+
+    def lookup(self, target: str):
+        """``[((distance, kind), entry id), ...]`` best first, one per entry."""
+        if len(target) < 3:
+            return []
+        limit = 1 if len(target) <= 4 else self.max_distance
+
+        checked = set()
+        best = {}
+        for d in _deletes(target[:self.prefix_length], limit):
+            for tid in self.deletes.get(d, ()):
+                if tid in checked:
+                    continue
+                checked.add(tid)
+                dist = edit_distance(target, self.terms[tid], limit)
+                if dist > limit:
+                    continue
+                for idx, kind in self.term_entries[tid].items():
+                    rank = (dist, kind)
+                    if idx not in best or rank < best[idx]:
+                        best[idx] = rank
+        return sorted((rank, idx) for idx, rank in best.items())
+
+
+# ---------------------------------------------------------
+# AUTOCOMPLETE
+# ---------------------------------------------------------
+class Autocomplete:
+    """Ranked autocomplete over a LookupIndex.
+
+    Prefix matches (sorted alphabetically) come before infix matches, and
+    the walk stops as soon as `limit` distinct entries are found. Choice
+    objects are built once here via `make_choice(name=..., value=...)` and
+    handed out as-is on every keystroke.
+    """
+
+    def __init__(self, index: LookupIndex, make_choice, limit=25):
+        self.index = index
+        self.make_choice = make_choice
+        self.limit = limit
+        self.choices = [
+            make_choice(name=index.display_name(idx), value=key)
+            for idx, key in enumerate(index.keys)
+        ]
+
+    def patched(self, index, fresh):
+        """The Autocomplete for `index`, a LookupIndex.patched() from this
+        one's index; only the `fresh` ids get new choices."""
+        new = object.__new__(Autocomplete)
+        new.index = index
+        new.make_choice = self.make_choice
+        new.limit = self.limit
+        size = len(index)
+        choices = self.choices[:size]
+        choices += [None] * (size - len(choices))
+        for idx in fresh:
+            choices[idx] = self.make_choice(name=index.display_name(idx), value=index.keys[idx])
+        new.choices = choices
+        return new
+
+    def complete_ids(self, current: str):
+        return self.index.ranked(normalize(current), self.limit)
+
+    def complete(self, current: str):
+        choices = self.choices
+        return [choices[i] for i in self.complete_ids(current)]
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""lxml-based versions of the scrapers' page parsers.
+
+Same inputs and same output as scrape_bestiary_api.parse_infobox and
+scrape_rods.parse_rod_html, several times faster. lxml is optional: check
+HAVE_LXML before using anything here.
+"""
+import re
+
+try:
+    from lxml import html as lxml_html
+    HAVE_LXML = True
+except ImportError:
+    lxml_html = None
+    HAVE_LXML = False
+
+
+def _cls(name):
+    """XPath predicate for "has CSS class `name`"."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# BeautifulSoup's get_text() skips comments and <script>/<style>/<template>
+# contents; xpath text() already skips comments.
+_TEXT = "descendant::text()[not(parent::script or parent::style or parent::template)]"
+
+_INFOBOX = f"(descendant::div[{_cls('infobox')}])[1]"
+_DATAROWS = f"descendant::div[{_cls('infobox-datarow')}]"
+_HEADING = f"(descendant::p[{_cls('data-heading')}])[1]"
+_CONTENT_P = f"(descendant::p[{_cls('data-content')}])[1]"
+_CONTENT_UL = f"(descendant::ul[{_cls('data-content')}])[1]"
+_HEADINGS = f"descendant::p[{_cls('data-heading')}]"
+_NEXT_CONTENT = f"(descendant::p[{_cls('data-content')}] | following::p[{_cls('data-content')}])[1]"
+_TABBER = f"(descendant::div[{_cls('tabber')}])[1]"
+_PANELS = f"descendant::article[{_cls('tabber__panel')}]"
+
+
+def get_text(el, sep=""):
+    """Equivalent of BeautifulSoup's el.get_text(sep, strip=True)."""
+    return sep.join(s.strip() for s in el.xpath(_TEXT) if s.strip())
+
+
+def _first(el, path):
+    found = el.xpath(path)
+    return found[0] if found else None
+
+
+def _bs_string(el):
+    """Equivalent of BeautifulSoup's tag.string (one child, recursively)."""
+    children = len(el)
+    if el.text and not children:
+        return el.text
+    if not el.text and children == 1 and not el[0].tail and isinstance(el[0].tag, str):
+        return _bs_string(el[0])
+    return None
+
+
+def _clean_paren_spaces(s: str) -> str:
+    return s.replace("( ", "(").replace(" )", ")")
+
+
+def parse_infobox(html, title, url):
+    doc = lxml_html.fromstring(html)
+    fish = {"name": title, "url": url}
+    missing = []
+
+    inf = _first(doc, _INFOBOX)
+    if inf is None:
+        return fish, ["infobox_missing"]
+
+    for row in inf.xpath(_DATAROWS):
+        heading = _first(row, _HEADING)
+        content = _first(row, _CONTENT_P)
+        if content is None:
+            content = _first(row, _CONTENT_UL)
+        if heading is None or content is None:
+            continue
+        key = get_text(heading).lower()
+        fish[key] = _clean_paren_spaces(get_text(content, " "))
+
+    for heading in inf.xpath(_HEADINGS):
+        s = _bs_string(heading)
+        if s and "C$/kg" in s:
+            node = _first(heading, _NEXT_CONTENT)
+            if node is not None:
+                fish["value_per_kg_base"] = _clean_paren_spaces(get_text(node))
+            break
+
+    tabber = _first(inf, _TABBER)
+    if tabber is not None:
+        for panel in tabber.xpath(_PANELS):
+            for r in panel.xpath(_DATAROWS):
+                heading = _first(r, _HEADING)
+                content = _first(r, _CONTENT_P)
+                if heading is None or content is None:
+                    continue
+                h = get_text(heading).lower()
+                v = _clean_paren_spaces(get_text(content)).replace("kg", "").replace("C$", "").strip()
+                fish[h] = v
+
+    return fish, missing
+
+
+def _clean(text: str) -> str:
+    return re.sub(r"\s+", " ", text.strip())
+
+
+def parse_rod_html(html, name, base_url):
+    doc = lxml_html.fromstring(html)
+    rod = {"name": name, "url": f"{base_url}/wiki/{name.replace(' ','_')}"}
+
+    inf = _first(doc, _INFOBOX)
+    if inf is not None:
+        for row in inf.xpath(_DATAROWS):
+            heading = _first(row, _HEADING)
+            content = _first(row, _CONTENT_P)
+            if heading is None or content is None:
+                continue
+            rod[_clean(get_text(heading, " ")).lower()] = _clean(get_text(content, " "))
+
+    enchants = []
+    for div in doc.iter("div"):
+        if "enchanting" in (div.get("class") or "").lower():
+            for ul in div.iter("ul"):
+                for li in ul.iterdescendants("li"):
+                    text = _clean(get_text(li, " "))
+                    if text:
+                        enchants.append(text)
+            break
+    if enchants:
+        rod["recommended_enchants"] = enchants
+
+    return rod
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""In-process metrics for the bot: counters, gauges and latency histograms.
+
+Handlers are wrapped with Metrics.timed(); everything is exposed in the
+Prometheus text format by a small aiohttp server (start_http) and
+summarised for humans by the /stats command.
+"""
+import asyncio
+import functools
+import math
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from aiohttp import web
+
+# seconds; 3.0 is Discord's deadline for answering an interaction
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 2.5, 3.0, 5.0, 10.0)
+INTERACTION_DEADLINE = 3.0
+DEADLINE_WARN = 2.5
+
+# how far the host clock may be ahead of Discord's, when an interaction's
+# age has to come from its snowflake timestamp
+CLOCK_SKEW = 1.0
+
+
+def stamp_received(interaction):
+    """Note when `interaction` reached the bot, before it waits for the loop."""
+    extras = getattr(interaction, "extras", None)
+    if extras is not None:
+        extras["received"] = time.monotonic()
+
+
+def interaction_age(interaction) -> float:
+    """Seconds since the bot received the interaction.
+
+    Interactions that weren't stamped fall back to their snowflake
+    timestamp, less CLOCK_SKEW; 0 if neither is known.
+    """
+    received = (getattr(interaction, "extras", None) or {}).get("received")
+    if received is not None:
+        return max(0.0, time.monotonic() - received)
+    created = getattr(interaction, "created_at", None)
+    if created is None:
+        return 0.0
+    return max(0.0, (datetime.now(timezone.utc) - created).total_seconds() - CLOCK_SKEW)
+
+
+class Histogram:
+    """Fixed-bucket histogram with the running sum, count and max."""
+
+    __slots__ = ("buckets", "counts", "sum", "count", "max")
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        lo, hi = 0, len(self.buckets)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if value <= self.buckets[mid]:
+                hi = mid
+            else:
+                lo = mid + 1
+        self.counts[lo] += 1
+        self.sum += value
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q) -> float:
+        """Estimate of the q-quantile, interpolated within its bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(self.max, lower + (upper - lower) * (rank - seen) / n)
+            seen += n
+        return self.max
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+class Metrics:
+    def __init__(self, prefix="fischbot"):
+        self.prefix = prefix
+        self.started = time.monotonic()
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}
+        self.help = {}
+        self.phases = {}
+        self.last_loop_lag = 0.0
+
+    # ----- recording -----
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        hist = self.histograms.get(key)
+        if hist is None:
+            hist = self.histograms[key] = Histogram()
+        hist.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    @contextmanager
+    def phase(self, name):
+        """Time one startup phase into self.phases (seconds, by name)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - start
+
+    def gauge(self, name, fn, help=None):
+        """Register a gauge whose value is read from fn() at scrape time."""
+        self.gauges[name] = fn
+        if help:
+            self.help[name] = help
+
+    def total(self, name, **labels):
+        """Sum of counter `name` over every series carrying these labels."""
+        wanted = set(labels.items())
+        return sum(v for (n, series), v in self.counters.items() if n == name and wanted <= set(series))
+
+    def histogram(self, name, **labels):
+        return self.histograms.get((name, tuple(sorted(labels.items()))))
+
+    def series(self, name):
+        """{labels: Histogram} for every series of `name` (labels as sorted pairs)."""
+        return {labels: h for (n, labels), h in self.histograms.items() if n == name}
+
+    # ----- handler instrumentation -----
+    def timed(self, kind, name=None):
+        """Decorator for slash command / autocomplete callbacks.
+
+        Records handler latency and outcome, plus how old the interaction
+        is when the handler returns (interaction_age, as admission control
+        measures it), which is what counts against Discord's 3 s deadline.
+        """
+        def decorator(fn):
+            label = name or fn.__name__
+
+            @functools.wraps(fn)
+            async def wrapper(interaction, *args, **kwargs):
+                start = time.perf_counter()
+                outcome = "ok"
+                try:
+                    return await fn(interaction, *args, **kwargs)
+                except Exception:
+                    outcome = "error"
+                    raise
+                finally:
+                    self.observe(f"{kind}_seconds", time.perf_counter() - start, **{kind: label})
+                    self.inc(f"{kind}_total", **{kind: label, "outcome": outcome})
+                    age = interaction_age(interaction)
+                    self.observe("interaction_age_seconds", age, kind=kind)
+                    if age > DEADLINE_WARN:
+                        self.inc("interaction_deadline_near_total", kind=kind, handler=label)
+            return wrapper
+        return decorator
+
+    async def watch_loop_lag(self, interval=0.5):
+        """Sample how late the event loop wakes a sleeping task."""
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            lag = max(0.0, time.perf_counter() - start - interval)
+            self.observe("event_loop_lag_seconds", lag)
+            self.last_loop_lag = lag
+
+    # ----- exposition -----
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        out = []
+        typed = set()
+
+        def head(name, kind):
+            full = f"{self.prefix}_{name}"
+            if full not in typed:
+                typed.add(full)
+                if name in self.help:
+                    out.append(f"# HELP {full} {self.help[name]}")
+                out.append(f"# TYPE {full} {kind}")
+            return full
+
+        out.append(f"# TYPE {self.prefix}_uptime_seconds gauge")
+        out.append(f"{self.prefix}_uptime_seconds {time.monotonic() - self.started:.3f}")
+        for name, fn in sorted(self.gauges.items()):
+            try:
+                value = float(fn())
+            except Exception:
+                continue
+            out.append(f"{head(name, 'gauge')} {value:g}")
+        for phase, seconds in self.phases.items():
+            out.append(f"{head('startup_phase_seconds', 'gauge')}{_labels((('phase', phase),))} {seconds:.6f}")
+        for (name, labels), value in sorted(self.counters.items()):
+            out.append(f"{head(name, 'counter')}{_labels(labels)} {value}")
+        for (name, labels), hist in sorted(self.histograms.items()):
+            full = head(name, "histogram")
+            cumulative = 0
+            for bound, n in zip(hist.buckets, hist.counts):
+                cumulative += n
+                out.append(f"{full}_bucket{_labels(labels + (('le', f'{bound:g}'),))} {cumulative}")
+            out.append(f"{full}_bucket{_labels(labels + (('le', '+Inf'),))} {hist.count}")
+            out.append(f"{full}_sum{_labels(labels)} {hist.sum:.6f}")
+            out.append(f"{full}_count{_labels(labels)} {hist.count}")
+        return "\n".join(out) + "\n"
+
+    async def start_http(self, host="127.0.0.1", port=9108):
+        """Serve /metrics; returns the AppRunner (call .cleanup() to stop)."""
+        async def handle(request):
+            return web.Response(body=self.render().encode("utf-8"),
+                                headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+        app = web.Application()
+        app.router.add_get("/metrics", handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
+
+
+def fmt_seconds(value) -> str:
+    if value is None or math.isnan(value):
+        return "–"
+    if value < 1:
+        return f"{value * 1000:.1f} ms"
+    return f"{value:.2f} s"
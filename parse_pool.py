@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+import asyncio
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+
+class ParsePool:
+    """Runs a CPU-bound page parser in worker processes.
+
+    `func` must be a module-level function (or a functools.partial of one)
+    so it can be sent to the workers. The event loop only ships raw HTML
+    out and parsed results back, so fetches keep flowing while pages are
+    being parsed.
+    """
+
+    def __init__(self, func, workers=None):
+        self.func = func
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+
+    async def run(self, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.func, *args)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def save_page(save_dir, title, html):
+    """Keep a raw copy of a fetched page (e.g. as a parser benchmark corpus)."""
+    os.makedirs(save_dir, exist_ok=True)
+    fn = re.sub(r"[^\w.-]+", "_", title) + ".html"
+    with open(os.path.join(save_dir, fn), "w", encoding="utf-8") as f:
+        f.write(html)
+
+
+def cli_option(argv, name, default=None):
+    """Value following `name` in argv, e.g. cli_option(argv, "--workers")."""
+    if name in argv:
+        i = argv.index(name)
+        if i + 1 < len(argv):
+            return argv[i + 1]
+    return default
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""Which entries people look up, kept in a local SQLite file.
+
+record() only bumps a counter in memory, so it costs the event loop
+next to nothing. run() flushes those counts every few seconds (or as
+soon as `max_batch` distinct queries are waiting) in one transaction on
+a worker thread. The table holds one row per (dataset, query, entry,
+source) with a running count, so it grows with the number of distinct
+queries, not with traffic. A crash loses at most one flush interval; a
+failed write (locked or full disk) keeps its counts for the next flush.
+
+Reads (top_entries, top_misses, ...) block: call them in a thread too.
+"""
+import asyncio
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS queries (
+    dataset   TEXT NOT NULL,
+    query     TEXT NOT NULL,
+    entry     TEXT NOT NULL,  -- entry key, '' if nothing matched
+    source    TEXT NOT NULL,  -- 'autocomplete' (a picked choice) or 'typed'
+    count     INTEGER NOT NULL,
+    last_seen REAL NOT NULL,
+    PRIMARY KEY (dataset, query, entry, source)
+);
+"""
+
+UPSERT = """
+INSERT INTO queries (dataset, query, entry, source, count, last_seen)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (dataset, query, entry, source)
+DO UPDATE SET count = count + excluded.count, last_seen = excluded.last_seen
+"""
+
+
+class QueryLog:
+    """Batched, append-only query counts. A `path` of None records nothing."""
+
+    def __init__(self, path, flush_seconds=5.0, max_batch=1000, max_pending=20_000):
+        self.path = path
+        self.flush_seconds = flush_seconds
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self._pending = {}  # (dataset, query, entry, source) -> [count, last seen]
+        self._full = asyncio.Event()
+        self._db = None
+        self._lock = threading.Lock()  # one thread on the connection at a time
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+
+    def __len__(self):
+        return len(self._pending)
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def record(self, dataset, query, entry, source):
+        """Count one lookup of `query` that resolved to `entry` (None on a miss)."""
+        if self.path is None:
+            return
+        key = (dataset, query, entry or "", source)
+        row = self._pending.get(key)
+        if row is None:
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return
+            self._pending[key] = [1, time.time()]
+            if len(self._pending) >= self.max_batch:
+                self._full.set()
+        else:
+            row[0] += 1
+            row[1] = time.time()
+        self.recorded += 1
+
+    async def run(self):
+        """Flush forever; run as a background task."""
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"⚠️ Query log flush failed: {e!r}")
+
+    async def flush(self):
+        """Write everything recorded so far in one transaction, off the loop."""
+        self._full.clear()
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        rows = [(*key, count, seen) for key, (count, seen) in batch.items()]
+        try:
+            await asyncio.to_thread(self._write, rows)
+        except Exception:
+            # the transaction rolled back: keep the counts for the next flush
+            # (not on cancellation, when the thread may still commit them)
+            self._restore(batch)
+            raise
+        self.written += len(rows)
+        self.flushes += 1
+
+    def _restore(self, batch):
+        """Merge a batch that could not be written back into _pending,
+        with whatever was recorded while it was being written."""
+        for key, (count, seen) in batch.items():
+            row = self._pending.get(key)
+            if row is None:
+                self._pending[key] = [count, seen]
+            else:
+                row[0] += count
+                row[1] = max(row[1], seen)
+
+    def _connect(self):
+        if self._db is None:
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript(SCHEMA)
+            self._db = db
+        return self._db
+
+    def _write(self, rows):
+        with self._lock:
+            db = self._connect()
+            with db:
+                db.executemany(UPSERT, rows)
+
+    def _query(self, sql, args):
+        if self.path is None:
+            return []
+        with self._lock:
+            return self._connect().execute(sql, args).fetchall()
+
+    def top_entries(self, dataset=None, limit=10):
+        """[(dataset, entry key, count)] of the most looked-up entries."""
+        return self._query(
+            "SELECT dataset, entry, SUM(count) AS n FROM queries"
+            " WHERE entry != '' AND (?1 IS NULL OR dataset = ?1)"
+            " GROUP BY dataset, entry ORDER BY n DESC LIMIT ?2",
+            (dataset, limit)
+        )
+
+    def top_misses(self, dataset=None, limit=10):
+        """[(dataset, query, count)] of the most common lookups that found nothing."""
+        return self._query(
+            "SELECT dataset, query, SUM(count) AS n FROM queries"
+            " WHERE entry = '' AND (?1 IS NULL OR dataset = ?1)"
+            " GROUP BY dataset, query ORDER BY n DESC LIMIT ?2",
+            (dataset, limit)
+        )
+
+    def top_queries(self, dataset, limit=50):
+        """`dataset`'s most frequent query texts, hits and misses alike."""
+        return [query for query, in self._query(
+            "SELECT query FROM queries WHERE dataset = ?1"
+            " GROUP BY query ORDER BY SUM(count) DESC LIMIT ?2",
+            (dataset, limit)
+        )]
+
+    def source_counts(self):
+        """{source: count} over everything written so far."""
+        return dict(self._query("SELECT source, SUM(count) FROM queries GROUP BY source", ()))
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
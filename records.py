@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+import re
+
+from lookup import normalize
+
+_NUMBER = re.compile(r"[-+]?\d[\d,]*(?:\.\d+)?")
+_LABEL = re.compile(r"\(([^)]*)\)")
+
+
+# ---------------------------------------------------------
+# VALUE PARSING
+# ---------------------------------------------------------
+def parse_number(text):
+    """First number in a wiki display string, e.g. "1,341.9 kg" -> 1341.9.
+
+    Integral values come back as int. Returns None when there is no
+    number ("N/A", "None", "") and inf for "inf" / "infkg".
+    """
+    if isinstance(text, (int, float)):
+        return text
+    if not isinstance(text, str):
+        return None
+    if text.strip().lower().startswith("inf"):
+        return float("inf")
+    m = _NUMBER.search(text)
+    if not m:
+        return None
+    num = float(m.group(0).replace(",", ""))
+    return int(num) if num.is_integer() else num
+
+
+def parse_label(text):
+    """Text inside the first pair of parentheses: "30 (Moderate)" -> "Moderate"."""
+    if not isinstance(text, str):
+        return None
+    m = _LABEL.search(text)
+    return m.group(1).strip() if m else None
+
+
+def fmt_number(num) -> str:
+    """Format a parsed number the way the wiki writes it (1,341.9 / 10,575)."""
+    if num == float("inf"):
+        return "inf"
+    if isinstance(num, float) and num.is_integer():
+        num = int(num)
+    return f"{num:,}"
+
+
+# ---------------------------------------------------------
+# BESTIARY RECORDS
+# ---------------------------------------------------------
+# canonical attribute -> keys it has been scraped under, in priority order
+TEXT_FIELDS = {
+    "name": ("name",),
+    "url": ("url",),
+    "rarity_text": ("rarity",),
+    "location": ("location",),
+    "sub_location": ("sub-location", "sub_location"),
+    "event": ("event",),
+    "sources": ("sources",),
+    "resilience_text": ("resilience",),
+    "progress_speed_text": ("progress speed", "progress_speed"),
+    "bait": ("bait",),
+    "time": ("time",),
+    "weather": ("weather",),
+    "season": ("season",),
+}
+NUMBER_FIELDS = {
+    "resilience": ("resilience",),
+    "progress_speed": ("progress speed", "progress_speed"),
+    "xp": ("xp",),
+    "value_per_kg": ("value_per_kg_base", "c$/kg"),
+    "base_kg": ("base kg",),
+    "min_kg": ("min. kg", "min_weight"),
+    "avg_kg": ("avg. kg", "avg_weight"),
+    "max_kg": ("max. kg", "max_weight"),
+    "true_min_kg": ("true min. kg",),
+    "true_max_kg": ("true max. kg",),
+    "base_value": ("base c$",),
+    "min_value": ("min. c$",),
+    "avg_value": ("avg. c$",),
+    "max_value": ("max. c$",),
+    "true_min_value": ("true min. c$",),
+    "true_max_value": ("true max. c$",),
+}
+
+
+def _first(entry, keys):
+    for k in keys:
+        v = entry.get(k)
+        if v not in (None, ""):
+            return v
+    return None
+
+
+class Fish:
+    """One bestiary entry with canonical field names and parsed numbers.
+
+    Text attributes hold the wiki's display strings (or None); numeric
+    attributes are int/float (or None). `rarity` is the bare tier
+    ("Legendary") and `rarity_text` the full display string.
+    """
+
+    __slots__ = (
+        ("key", "rarity", "resilience_label", "passive_block")
+        + tuple(TEXT_FIELDS) + tuple(NUMBER_FIELDS)
+    )
+
+    def __init__(self, key, entry):
+        self.key = key
+        for attr, keys in TEXT_FIELDS.items():
+            setattr(self, attr, _first(entry, keys))
+        for attr, keys in NUMBER_FIELDS.items():
+            setattr(self, attr, parse_number(_first(entry, keys)))
+
+        if self.name is None:
+            self.name = key
+        self.rarity = self.rarity_text.split(" (")[0] if self.rarity_text else None
+        self.resilience_label = parse_label(self.resilience_text)
+        block = entry.get("passive block")
+        self.passive_block = None if block is None else block == "True"
+
+    def __repr__(self):
+        return f"Fish({self.key!r}, {self.name!r})"
+
+
+def ingest_bestiary(keys, entries):
+    """Fish records for a dataset, aligned with its LookupIndex ids."""
+    return [Fish(key, entry) for key, entry in zip(keys, entries)]
+
+
+def fish_by_place(records):
+    """normalized location / sub-location / event name -> fish names."""
+    places = {}
+    for fish in records:
+        for place in {fish.location, fish.sub_location, fish.event}:
+            if place:
+                places.setdefault(normalize(place), []).append(fish.name)
+    return places
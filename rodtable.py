@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+import math
+import urllib.parse
+from array import array
+
+from records import parse_number, fmt_number
+
+try:
+    import numpy as np
+    HAVE_NUMPY = True
+except ImportError:
+    np = None
+    HAVE_NUMPY = False
+
+# stat column -> (key in rods.json, label, unit)
+STATS = {
+    "lure_speed": ("lure speed", "Lure Speed", "%"),
+    "luck": ("luck", "Luck", "%"),
+    "control": ("control", "Control", ""),
+    "resilience": ("resilience", "Resilience", "%"),
+    "max_kg": ("max kg", "Max kg", " kg"),
+    "line_distance": ("line distance", "Line Distance", " m"),
+}
+
+# digits weighted scores are compared at when ranking
+SCORE_DIGITS = 9
+
+
+def fmt_stat(stat, value) -> str:
+    """A parsed stat the way the wiki shows it: 60%, 0.3, inf kg, 80 m."""
+    if math.isnan(value):
+        return "?"
+    return f"{fmt_number(round(value, 4))}{STATS[stat][2]}"
+
+
+def fmt_delta(stat, delta) -> str:
+    """Signed difference between two stats, "±0" when equal."""
+    if math.isnan(delta):
+        return "?"
+    if delta == 0:
+        return "±0"
+    sign = "+" if delta > 0 else "-"
+    return f"{sign}{fmt_stat(stat, abs(delta))}"
+
+
+class RodTable:
+    """Rod stats parsed once into columns, for comparing and ranking.
+
+    * each stat is an array('d') aligned with the rods Dataset's index
+      ids, NaN where the wiki has no value and inf for "infkg"
+    * each stat has a precomputed descending row order
+    * each stat also has a percentile column (0 = worst rod, 1 = best,
+      unknown = 0), which weighted scores are built from so one
+      outlier (a 100,000,000,000 kg rod) can't swamp the other stats
+    * with numpy, the percentile columns are also kept as one
+      rows x stats matrix, so a weighted score is a single
+      matrix-vector product
+    """
+
+    def __init__(self, index):
+        self.names = [urllib.parse.unquote(index.display_name(i)) for i in range(len(index))]
+        self.columns = {}
+        self.order = {}
+        self.percentile = {}
+        for stat, (key, _, _) in STATS.items():
+            values = array("d", (self._number(entry.get(key)) for entry in index.entries))
+            self.columns[stat] = values
+            known = [i for i, v in enumerate(values) if not math.isnan(v)]
+            known.sort(key=values.__getitem__, reverse=True)
+            unknown = [i for i, v in enumerate(values) if math.isnan(v)]
+            self.order[stat] = array("H" if len(values) < 2**16 else "L", known + unknown)
+            self.percentile[stat] = self._percentiles(values, known)
+        self.matrix = None
+        if HAVE_NUMPY:
+            self.matrix = np.column_stack([
+                np.frombuffer(self.percentile[stat], dtype=np.float64) for stat in STATS
+            ]) if len(self) else np.zeros((0, len(STATS)))
+
+    @staticmethod
+    def _number(text):
+        value = parse_number(text)
+        return math.nan if value is None else float(value)
+
+    @staticmethod
+    def _percentiles(values, known):
+        """Share of known rods each rod beats or ties, ties sharing one value."""
+        pct = array("d", bytes(len(values) * 8))
+        if len(known) < 2:
+            for row in known:
+                pct[row] = 1.0
+            return pct
+        # known is best-first; equal values get the best position of their run
+        top = len(known) - 1
+        pos = 0
+        for i, row in enumerate(known):
+            if values[row] != values[known[pos]]:
+                pos = i
+            pct[row] = (top - pos) / top
+        return pct
+
+    def __len__(self):
+        return len(self.names)
+
+    def rank(self, stat):
+        """Every row, best first by `stat` (unknown values last)."""
+        return list(self.order[stat])
+
+    def scores(self, weights: dict):
+        """Weighted mean percentile per row over the stats in `weights`
+        (a numpy array when HAVE_NUMPY, else a list)."""
+        total = sum(weights.values())
+        if self.matrix is not None:
+            if total <= 0:
+                return np.zeros(len(self))
+            vector = np.array([weights.get(stat, 0.0) / total for stat in STATS])
+            return self.matrix @ vector
+        scores = [0.0] * len(self)
+        if total <= 0:
+            return scores
+        for stat, weight in weights.items():
+            if weight:
+                share = weight / total
+                scores = [s + share * p for s, p in zip(scores, self.percentile[stat])]
+        return scores
+
+    def rank_by_score(self, weights: dict):
+        """(rows best first, scores) for a weighted score."""
+        scores = self.scores(weights)
+        # ties are decided on rounded scores, so that summing the stats in a
+        # different order can't reorder rods that score the same
+        if self.matrix is not None:
+            rows = np.argsort(-np.round(scores, SCORE_DIGITS), kind="stable")
+            return rows.tolist(), scores.tolist()
+        rows = sorted(range(len(self)), key=lambda row: round(scores[row], SCORE_DIGITS), reverse=True)
+        return rows, scores
+
+    def compare(self, rows):
+        """{stat: (values, deltas vs rows[0], best rows)} for a few rows."""
+        out = {}
+        for stat, values in self.columns.items():
+            picked = [values[row] for row in rows]
+            base = picked[0]
+            deltas = [self._delta(v, base) for v in picked]
+            known = [v for v in picked if not math.isnan(v)]
+            best = max(known) if known else None
+            out[stat] = (picked, deltas, {row for row, v in zip(rows, picked) if v == best})
+        return out
+
+    @staticmethod
+    def _delta(value, base):
+        if value == base:
+            return 0.0  # also inf vs inf, which would be NaN
+        return value - base
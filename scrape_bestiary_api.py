@@ -1,11 +1,18 @@
 #!/usr/bin/env python3
 import asyncio
-import aiohttp
 from bs4 import BeautifulSoup
 import json
 import os
+import sys
 import time
 from datetime import datetime
+from functools import partial
+
+import lxml_parse
+from fetcher import Fetcher, FetchError
+from journal import Journal, write_json
+from parse_pool import ParsePool, save_page, cli_option
+from scrape_cache import CACHE_DIR, PageCache, body_hash, fetch_revisions
 
 HEADERS = {
     "User-Agent": (
@@ -14,11 +21,27 @@ HEADERS = {
         "Chrome/120.0.0.0 Safari/537.36"
     )
 }
-BASE_URL = "https://fischipedia.org"
+# overridable so a run can be pointed at a local stand-in server
+BASE_URL = os.getenv("FISCH_WIKI_URL", "https://fischipedia.org")
+API_URL = os.getenv("FISCH_WIKI_API", BASE_URL + "/api.php")
 FISH_LIST_URL = BASE_URL + "/wiki/Fish"
 OUTPUT_FILE = "data/bestiary.json"
+LOCATIONS_FILE = "data/locations.json"
+EVENTS_FILE = "data/events.json"
 LOG_FILE = "fischipedia_scrape_log.txt"
-CONCURRENCY = 50
+JOURNAL_FILE = os.path.join(CACHE_DIR, "bestiary.journal.jsonl")
+# bump when parse_infobox output changes so cached results are thrown away
+PARSER_VERSION = 1
+
+# The fish list links to every kind of wiki page. Each scraped page is sorted
+# by the shape of its infobox and only these kinds are kept.
+OUTPUT_FILES = {
+    "fish": OUTPUT_FILE,
+    "location": LOCATIONS_FILE,
+    "event": EVENTS_FILE,
+}
+FISH_FIELDS = ("xp", "base kg", "c$/kg", "base c$")
+EVENT_TYPES = ("In-Game", "Seasonal", "Localized Events")
 
 def now_str():
     return datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
@@ -26,6 +49,32 @@ def now_str():
 def clean_paren_spaces(s: str) -> str:
     return s.replace("( ", "(").replace(" )", ")")
 
+def classify_page(page):
+    """Sort a scraped page into "fish", "location", "event" or None (list pages, items, rods, ...)."""
+    if page.get("rarity") and any(page.get(k) for k in FISH_FIELDS):
+        return "fish"
+    if page.get("gps") or page.get("sea"):
+        return "location"
+    if page.get("type") in EVENT_TYPES:
+        return "event"
+    return None
+
+def page_key(title):
+    return title.lower().replace(" ", "_").replace("'", "")
+
+def load_existing(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_outputs(grouped):
+    for kind, path in OUTPUT_FILES.items():
+        # unchanged files are left alone so the bot doesn't reload for nothing
+        count, changed = write_json(path, grouped.get(kind, {}), diff=True)
+        print(f"[{now_str()}] {'Saved' if changed else 'Unchanged'} {count} {kind} → {path}")
+
 def parse_infobox(html, title, url):
     soup = BeautifulSoup(html, "html.parser")
     fish = {"name": title, "url": url}
@@ -72,69 +121,185 @@ def parse_infobox(html, title, url):
 
     return fish, missing
 
-async def fetch_fish(session, title):
+def parse_page(html, title, url, backend="bs4"):
+    """parse_infobox with the chosen backend ("bs4" or "lxml")."""
+    if backend == "lxml":
+        return lxml_parse.parse_infobox(html, title, url)
+    return parse_infobox(html, title, url)
+
+def page_url(title):
     url_title = title.replace(" ", "_")
-    url = f"{BASE_URL}/wiki/{url_title}"
+    return f"{BASE_URL}/wiki/{url_title}"
+
+async def fetch_fish(fetcher, title, cache=None, revid=None, pool=None, save_dir=None):
+    """(title, page, missing) for one wiki page; page is None if it could not be fetched."""
+    url = page_url(title)
     try:
-        async with session.get(url, headers=HEADERS, timeout=20) as resp:
-            html = await resp.text()
-    except Exception:
-        return title, {"name": title, "url": url}, ["http_error"]
+        resp = await fetcher.get(url, headers=cache.conditional_headers(url) if cache else None)
+    except FetchError as e:
+        print(f"[{now_str()}] [ERROR] {e}")
+        return title, None, ["http_error"]
+    if resp.status == 304 and cache:
+        cache.stats["not_modified"] += 1
+        cache.set_revision(url, revid)
+        fish, missing = cache.result(url)
+        return title, fish, missing
     if resp.status != 200:
-        return title, {"name": title, "url": url}, [f"http_{resp.status}"]
-    fish, missing = parse_infobox(html, title, url)
+        return title, None, [f"http_{resp.status}"]
+    html = resp.text
+    if save_dir:
+        save_page(save_dir, title, html)
+
+    digest = body_hash(html)
+    if cache and cache.same_body(url, digest):
+        cache.stats["same_body"] += 1
+        fish, missing = cache.result(url)
+    else:
+        if pool:
+            fish, missing = await pool.run(html, title, url)
+        else:
+            fish, missing = parse_infobox(html, title, url)
+        if cache:
+            cache.stats["parsed"] += 1
+    if cache:
+        cache.store(url, resp.headers, digest, [fish, missing], revid)
     return title, fish, missing
 
-async def get_all_titles(session):
-    async with session.get(FISH_LIST_URL, headers=HEADERS) as resp:
-        text = await resp.text()
-    soup = BeautifulSoup(text, "html.parser")
+async def get_all_titles(fetcher):
+    resp = await fetcher.get(FISH_LIST_URL)
+    if resp.status != 200:
+        raise SystemExit(f"{FISH_LIST_URL}: HTTP {resp.status}")
+    soup = BeautifulSoup(resp.text, "html.parser")
     titles = []
     for link in soup.select("a[href^='/wiki/']"):
         href = link.get("href", "")
         if not href.startswith("/wiki/"):
             continue
-        raw = href.replace("/wiki/", "")
-        if ":" in raw or raw.lower() in ("main_page", "fish"):
+        raw = href.replace("/wiki/", "").split("#")[0].split("?")[0]
+        if not raw or ":" in raw or raw.lower() in ("main_page", "fish"):
             continue
         if "%" in raw:
             continue
         titles.append(raw.replace("_", " "))
     return sorted(set(titles))
 
-async def scrape_all(limit=None):
-    async with aiohttp.ClientSession() as session:
-        titles = await get_all_titles(session)
+async def scrape_all(limit=None, incremental=False, backend="bs4", workers=None, save_dir=None, resume=False):
+    """Scrape every page linked from the fish list.
+
+    Every run records per-page validators and results in a PageCache. With
+    `incremental`, pages whose wiki revision is unchanged are not fetched
+    at all and the rest are fetched with conditional requests, so only
+    pages that really changed get downloaded and parsed.
+
+    Parsing runs in a pool of `workers` processes using `backend`.
+    `save_dir` keeps a copy of every fetched page. A page that can't be
+    fetched keeps its entry from the previous scrape.
+
+    Each finished page is appended to JOURNAL_FILE right away and the
+    output files are compacted from it at the end. After a crash,
+    `resume` skips the pages the journal already has.
+    """
+    if backend == "lxml" and not lxml_parse.HAVE_LXML:
+        raise SystemExit("--parser lxml needs lxml installed (pip install lxml)")
+    cache = PageCache("bestiary", PARSER_VERSION)
+    if not incremental:
+        cache.clear()
+    journal = Journal(JOURNAL_FILE)
+    already = journal.open(resume)
+    pool = ParsePool(partial(parse_page, backend=backend), workers)
+    counts = {kind: 0 for kind in OUTPUT_FILES}
+    counts.update(skipped=0, failed=0)
+    async with Fetcher(headers=HEADERS) as fetcher:
+        titles = await get_all_titles(fetcher)
         if limit:
             titles = titles[:limit]
-        total = len(titles)
-        results = {}
-        log_lines = []
-        sem = asyncio.Semaphore(CONCURRENCY)
+        todo = [t for t in titles if t not in already]
+        if already:
+            print(f"[{now_str()}] Resuming: {len(titles) - len(todo)} pages already in {JOURNAL_FILE}")
+        total = len(todo)
+        revids = await fetch_revisions(fetcher, API_URL, todo)
         start = time.time()
+        log = open(LOG_FILE, "a" if already else "w", encoding="utf-8")
 
         async def sem_task(idx, t):
-            async with sem:
-                title, fish, missing = await fetch_fish(session, t)
-                elapsed = time.time() - start
-                done = idx
-                remain = total - done
-                rate = done / elapsed if elapsed > 0 else 0
-                eta = remain / rate if rate > 0 else float('inf')
-                print(f"[{now_str()}] [{done}/{total}] {title} — missing: {missing} | {rate:.1f} items/s | ETA: {eta/60:.1f} min")
-                key = title.lower().replace(" ", "_").replace("'", "")
-                results[key] = fish
-                log_lines.append(f"[{done}/{total}] {title} — missing: {missing}")
-
-        tasks = [asyncio.create_task(sem_task(i+1, t)) for i, t in enumerate(titles)]
-        await asyncio.gather(*tasks)
-
-    os.makedirs(os.path.dirname(OUTPUT_FILE) or ".", exist_ok=True)
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(results, f, indent=2, ensure_ascii=False)
-    with open(LOG_FILE, "w", encoding="utf-8") as f:
-        f.write("\n".join(log_lines))
-    print(f"\n[{now_str()}] Saved {len(results)} → {OUTPUT_FILE}")
+            url = page_url(t)
+            revid = revids.get(t)
+            if revid is not None and cache.revision(url) == revid and cache.has_result(url):
+                cache.stats["skipped"] += 1
+                fish, missing = cache.result(url)
+                title = t
+            else:
+                title, fish, missing = await fetch_fish(fetcher, t, cache, revid, pool, save_dir)
+            elapsed = time.time() - start
+            done = idx
+            remain = total - done
+            rate = done / elapsed if elapsed > 0 else 0
+            eta = remain / rate if rate > 0 else float('inf')
+            print(f"[{now_str()}] [{done}/{total}] {title} — missing: {missing} | {rate:.1f} items/s | ETA: {eta/60:.1f} min")
+            key = page_key(title)
+            if fish is None:
+                kind = "failed"
+                journal.append({"title": title, "key": key, "failed": missing})
+            else:
+                kind = classify_page(fish) or "skipped"
+                journal.append({"title": title, "key": key, "kind": kind,
+                                "page": fish if kind in OUTPUT_FILES else None})
+            counts[kind] += 1
+            log.write(f"[{done}/{total}] {title} ({kind}) — missing: {missing}\n")
+
+        tasks = [asyncio.create_task(sem_task(i+1, t)) for i, t in enumerate(todo)]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            pool.close()
+            log.close()
+            journal.close()
+
+    cache.prune(page_url(t) for t in titles)
+    cache.save()
+    print()
+    print(f"[{now_str()}] HTTP: {fetcher.summary()}")
+    print(f"[{now_str()}] Pages: {cache.summary()}")
+
+    # pages that failed (in this run or a resumed one) keep their old entries
+    failed = journal.failed_keys()
+    extra = {}
+    if failed:
+        for kind, path in OUTPUT_FILES.items():
+            for key, page in (load_existing(path) or {}).items():
+                if key in failed:
+                    extra[key] = (kind, page)
+        print(f"[{now_str()}] [WARN] {len(failed)} pages failed, {len(extra)} kept their previous entries")
+    for kind, (count, changed) in journal.compact(OUTPUT_FILES, extra, diff=True).items():
+        print(f"[{now_str()}] {'Saved' if changed else 'Unchanged'} {count} {kind} → {OUTPUT_FILES[kind]}")
+    journal.remove()
+    print(f"[{now_str()}] Skipped {counts['skipped']} non-fish/location/event pages")
+
+def split_existing():
+    """Re-sort an already scraped OUTPUT_FILE without touching the network."""
+    with open(OUTPUT_FILE, "r", encoding="utf-8") as f:
+        pages = json.load(f)
+    grouped = {kind: {} for kind in OUTPUT_FILES}
+    for key, page in pages.items():
+        if "#" in key:
+            continue  # section links of another page, no longer scraped
+        kind = classify_page(page)
+        if kind:
+            grouped[kind][key] = page
+    write_outputs(grouped)
+    print(f"[{now_str()}] Skipped {len(pages) - sum(map(len, grouped.values()))} pages")
 
 if __name__ == "__main__":
-    asyncio.run(scrape_all(limit=None))
+    if "--split" in sys.argv:
+        split_existing()
+    else:
+        workers = cli_option(sys.argv, "--workers")
+        html_dir = cli_option(sys.argv, "--save-html")
+        asyncio.run(scrape_all(
+            limit=None,
+            incremental="--incremental" in sys.argv,
+            resume="--resume" in sys.argv,
+            backend=cli_option(sys.argv, "--parser", "bs4"),
+            workers=int(workers) if workers else None,
+            save_dir=html_dir and os.path.join(html_dir, "bestiary"),
+        ))
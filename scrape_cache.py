@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""Per-page cache that lets the scrapers skip pages that did not change.
+
+For every page URL it remembers the ETag / Last-Modified validators, a hash
+of the HTML, the wiki revision id (when known) and the parsed result. On
+the next run a page can be skipped without any request (revision id
+unchanged), answered by a 304 (conditional GET), or fetched but not
+re-parsed (same body hash).
+
+Only the validators are held in memory. Parsed results live in a JSONL
+file next to the index, one line per page, and are read back one at a
+time when a page is reused. A run appends the results it stores to a
+new results file; save() copies over the ones it reused, then switches
+the index to the new file. So memory grows with the number of pages,
+not with the size of their results, whether or not the run is
+incremental.
+"""
+import hashlib
+import json
+import os
+
+CACHE_DIR = ".scrape_cache"
+CACHE_FORMAT = 2  # results moved out of the index into a JSONL file
+REVISION_BATCH = 50  # MediaWiki's titles= limit for normal users
+
+
+def body_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class PageCache:
+    def __init__(self, name, version):
+        """`version` is bumped by the scraper when its parser changes; a
+        cache written by another parser version is ignored."""
+        self.name = name
+        self.path = os.path.join(CACHE_DIR, f"{name}.json")
+        self.version = version
+        # url -> validators, plus "at": (file, offset) of its parsed result,
+        # file being "old" (the saved results file) or "new" (this run's)
+        self.pages = {}
+        self.stats = {"skipped": 0, "not_modified": 0, "same_body": 0, "parsed": 0}
+        self.generation = 0
+        self._old = None
+        self._new = None
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            if saved.get("version") != version or saved.get("format") != CACHE_FORMAT:
+                return
+            self._old = open(self._results_path(saved["generation"]), "rb")
+        except (OSError, ValueError, KeyError):
+            return
+        self.generation = saved["generation"]
+        self.pages = saved.get("pages", {})
+        for entry in self.pages.values():
+            if entry.get("at") is not None:
+                entry["at"] = ("old", entry["at"])
+
+    def _results_path(self, generation):
+        return os.path.join(CACHE_DIR, f"{self.name}.results.{generation}.jsonl")
+
+    @staticmethod
+    def _has_result(entry) -> bool:
+        return bool(entry) and entry.get("at") is not None
+
+    def _line(self, entry) -> bytes:
+        where, offset = entry["at"]
+        f = self._old if where == "old" else self._new
+        f.seek(offset)
+        return f.readline()
+
+    def _append(self, line: bytes):
+        if self._new is None:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            self._new = open(self._results_path(self.generation + 1) + ".tmp", "w+b")
+        offset = self._new.seek(0, os.SEEK_END)
+        self._new.write(line)
+        return "new", offset
+
+    def clear(self):
+        """Forget every page, for a full scrape."""
+        self.pages = {}
+
+    def has_result(self, url) -> bool:
+        return self._has_result(self.pages.get(url))
+
+    def result(self, url):
+        entry = self.pages.get(url)
+        return json.loads(self._line(entry)) if self._has_result(entry) else None
+
+    def revision(self, url):
+        entry = self.pages.get(url)
+        return None if entry is None else entry.get("revid")
+
+    def conditional_headers(self, url) -> dict:
+        entry = self.pages.get(url)
+        if not self._has_result(entry):
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def same_body(self, url, digest) -> bool:
+        entry = self.pages.get(url)
+        return self._has_result(entry) and entry.get("sha256") == digest
+
+    def store(self, url, headers, digest, result, revid=None):
+        entry = self.pages.setdefault(url, {})
+        entry["etag"] = headers.get("ETag") if headers else entry.get("etag")
+        entry["last_modified"] = headers.get("Last-Modified") if headers else entry.get("last_modified")
+        entry["sha256"] = digest
+        entry["at"] = self._append(json.dumps(result, ensure_ascii=False).encode("utf-8") + b"\n")
+        if revid is not None:
+            entry["revid"] = revid
+
+    def set_revision(self, url, revid):
+        if url in self.pages and revid is not None:
+            self.pages[url]["revid"] = revid
+
+    def prune(self, keep_urls):
+        """Forget pages that are no longer part of the scrape."""
+        keep = set(keep_urls)
+        for url in [u for u in self.pages if u not in keep]:
+            del self.pages[url]
+
+    def save(self):
+        """Write the index and a results file holding exactly its pages.
+
+        Results this run reused are copied from the old file line by line.
+        The index is replaced last, so a crash before then leaves the
+        previous cache as it was. Call once, at the end of a run.
+        """
+        for entry in self.pages.values():
+            if self._has_result(entry) and entry["at"][0] == "old":
+                entry["at"] = self._append(self._line(entry))
+        if self._new is None:
+            self._append(b"")  # nothing stored: an empty results file
+        self._new.flush()
+        os.fsync(self._new.fileno())
+        self._new.close()
+        generation = self.generation + 1
+        os.replace(self._results_path(generation) + ".tmp", self._results_path(generation))
+
+        pages = {}
+        for url, entry in self.pages.items():
+            pages[url] = dict(entry, at=entry["at"][1] if self._has_result(entry) else None)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": self.version, "format": CACHE_FORMAT,
+                       "generation": generation, "pages": pages}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+        if self._old is not None:
+            self._old.close()
+            try:
+                os.remove(self._results_path(self.generation))
+            except OSError:
+                pass
+        self._old = self._new = None
+        self.generation = generation
+
+    def summary(self) -> str:
+        s = self.stats
+        return (f"{s['skipped']} unchanged revisions, {s['not_modified']} not modified, "
+                f"{s['same_body']} same content, {s['parsed']} parsed")
+
+
+async def fetch_revisions(fetcher, api_url, titles):
+    """{title: latest revision id} via the MediaWiki API, batched.
+
+    Titles the wiki doesn't know are left out. Returns {} if the API is
+    unreachable, so callers fall back to conditional GETs.
+    """
+    revids = {}
+    try:
+        for i in range(0, len(titles), REVISION_BATCH):
+            batch = titles[i:i + REVISION_BATCH]
+            params = {
+                "action": "query",
+                "prop": "revisions",
+                "rvprop": "ids",
+                "titles": "|".join(batch),
+                "format": "json",
+                "formatversion": "2",
+            }
+            resp = await fetcher.get(api_url, params=params)
+            if resp.status != 200:
+                return {}
+            data = json.loads(resp.text)
+            query = data.get("query", {})
+            # the API answers with canonical titles; map them back
+            renamed = {n["to"]: n["from"] for n in query.get("normalized", [])}
+            for page in query.get("pages", []):
+                revs = page.get("revisions")
+                if revs:
+                    title = renamed.get(page["title"], page["title"])
+                    revids[title] = revs[0]["revid"]
+    except Exception as e:
+        print(f"[WARN] revision lookup failed, using conditional requests: {e}")
+        return {}
+    return revids
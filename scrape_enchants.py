@@ -1,9 +1,12 @@
-import requests
+import asyncio
 from bs4 import BeautifulSoup
 import json
 import re
 import os
 
+from fetcher import Fetcher
+from journal import write_json
+
 WIKI_URL = "https://fisch.fandom.com/wiki/Enchantments"
 TARGET_PATH = os.path.join("data", "enchants.json")
 
@@ -72,9 +75,12 @@ def parse_table(table, category_key):
         }
     return result
 
-def scrape_all_enchants():
-    resp = requests.get(WIKI_URL)
-    resp.raise_for_status()
+async def scrape_all_enchants():
+    async with Fetcher() as fetcher:
+        resp = await fetcher.get(WIKI_URL)
+    print("HTTP:", fetcher.summary())
+    if resp.status != 200:
+        raise SystemExit(f"{WIKI_URL}: HTTP {resp.status}")
     soup = BeautifulSoup(resp.text, "html.parser")
     all_enchants = {}
     for header_text, cat_key in CATEGORIES.items():
@@ -95,12 +101,11 @@ def load_existing(path):
         return {}
 
 def save_json(data, path):
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    write_json(path, data)
 
 if __name__ == "__main__":
     print("Scraping wiki for enchants…")
-    scraped = scrape_all_enchants()
+    scraped = asyncio.run(scrape_all_enchants())
     print(f"Scraped {len(scraped)} enchant entries.")
 
     existing = load_existing(TARGET_PATH)
@@ -1,28 +1,37 @@
 #!/usr/bin/env python3
 import asyncio
-import aiohttp
 from bs4 import BeautifulSoup
 import json
 import os
 import re
+import sys
+from functools import partial
 
-BASE_URL = "https://fischipedia.org"
+import lxml_parse
+from fetcher import Fetcher, FetchError
+from journal import write_json
+from parse_pool import ParsePool, save_page, cli_option
+from scrape_cache import PageCache, body_hash, fetch_revisions
+
+# overridable so a run can be pointed at a local stand-in server
+BASE_URL = os.getenv("FISCH_WIKI_URL", "https://fischipedia.org")
+API_URL = os.getenv("FISCH_WIKI_API", BASE_URL + "/api.php")
 ROD_LIST_URL = BASE_URL + "/wiki/Fishing_Rods"
 OUTPUT_FILE = "data/rods.json"
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
 }
+# bump when parse_rod_page output changes so cached results are thrown away
+PARSER_VERSION = 1
 
 def clean(text: str) -> str:
     return re.sub(r"\s+", " ", text.strip())
 
-async def fetch_html(session, url):
-    async with session.get(url, headers=HEADERS, timeout=20) as resp:
-        return await resp.text()
-
-async def get_rod_names(session):
-    html = await fetch_html(session, ROD_LIST_URL)
-    soup = BeautifulSoup(html, "html.parser")
+async def get_rod_names(fetcher):
+    resp = await fetcher.get(ROD_LIST_URL)
+    if resp.status != 200:
+        raise SystemExit(f"{ROD_LIST_URL}: HTTP {resp.status}")
+    soup = BeautifulSoup(resp.text, "html.parser")
     rods = []
     for table in soup.find_all("table"):
         ths = table.find_all("th")
@@ -80,28 +89,102 @@ def parse_rod_page(soup, name):
 
     return rod
 
-async def fetch_rod(session, name):
-    url = f"{BASE_URL}/wiki/{name.replace(' ', '_')}"
+def parse_rod_html(html, name, backend="bs4"):
+    """parse_rod_page straight from HTML with the chosen backend."""
+    if backend == "lxml":
+        return lxml_parse.parse_rod_html(html, name, BASE_URL)
+    return parse_rod_page(BeautifulSoup(html, "html.parser"), name)
+
+def rod_url(name):
+    return f"{BASE_URL}/wiki/{name.replace(' ', '_')}"
+
+async def fetch_rod(fetcher, name, cache=None, revid=None, pool=None, save_dir=None):
+    """Parsed rod page, or None if it could not be fetched."""
+    url = rod_url(name)
+    if revid is not None and cache and cache.revision(url) == revid and cache.has_result(url):
+        cache.stats["skipped"] += 1
+        return cache.result(url)
+
     try:
-        html = await fetch_html(session, url)
-    except Exception as e:
-        print(f"[ERROR] fetch {name}: {e}")
+        resp = await fetcher.get(url, headers=cache.conditional_headers(url) if cache else None)
+    except FetchError as e:
+        print(f"[ERROR] {e}")
+        return None
+    if resp.status == 304 and cache:
+        cache.stats["not_modified"] += 1
+        cache.set_revision(url, revid)
+        return cache.result(url)
+    if resp.status != 200:
+        print(f"[ERROR] fetch {name}: HTTP {resp.status}")
         return None
-    soup = BeautifulSoup(html, "html.parser")
-    return parse_rod_page(soup, name)
+    html = resp.text
+    if save_dir:
+        save_page(save_dir, name, html)
 
-async def scrape_all():
-    async with aiohttp.ClientSession() as session:
-        rod_names = await get_rod_names(session)
+    digest = body_hash(html)
+    if cache and cache.same_body(url, digest):
+        cache.stats["same_body"] += 1
+        rod = cache.result(url)
+    else:
+        if pool:
+            rod = await pool.run(html, name)
+        else:
+            rod = parse_rod_html(html, name)
+        if cache:
+            cache.stats["parsed"] += 1
+    if cache:
+        cache.store(url, resp.headers, digest, rod, revid)
+    return rod
+
+def load_existing(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+async def scrape_all(incremental=False, backend="bs4", workers=None, save_dir=None):
+    """Scrape every rod. With `incremental`, unchanged pages are skipped
+    (same wiki revision) or answered by conditional requests. Pages are
+    parsed in a process pool with `backend`; `save_dir` keeps raw copies.
+    A rod whose page can't be fetched keeps its previous entry."""
+    if backend == "lxml" and not lxml_parse.HAVE_LXML:
+        raise SystemExit("--parser lxml needs lxml installed (pip install lxml)")
+    pool = ParsePool(partial(parse_rod_html, backend=backend), workers)
+    cache = PageCache("rods", PARSER_VERSION)
+    if not incremental:
+        cache.clear()
+    async with Fetcher(headers=HEADERS) as fetcher:
+        rod_names = await get_rod_names(fetcher)
         print("Found rod names:", rod_names[:10], "... total:", len(rod_names))
-        tasks = [fetch_rod(session, n) for n in rod_names]
-        results = await asyncio.gather(*tasks)
+        revids = await fetch_revisions(fetcher, API_URL, rod_names)
+        tasks = [fetch_rod(fetcher, n, cache, revids.get(n), pool, save_dir) for n in rod_names]
+        try:
+            results = await asyncio.gather(*tasks)
+        finally:
+            pool.close()
+
+    cache.prune(rod_url(n) for n in rod_names)
+    cache.save()
+    print("HTTP:", fetcher.summary())
+    print("Pages:", cache.summary())
+
+    existing = load_existing(OUTPUT_FILE) or {}
+    failed = [n for n, r in zip(rod_names, results) if r is None]
+    results = [r if r is not None else existing.get(n) for n, r in zip(rod_names, results)]
+    if failed:
+        print(f"[WARN] {len(failed)} rods failed, kept their previous entries:", ", ".join(failed[:10]))
 
     rods = {r["name"]: r for r in results if r}
-    os.makedirs(os.path.dirname(OUTPUT_FILE) or ".", exist_ok=True)
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(rods, f, indent=2, ensure_ascii=False)
-    print("Saved", len(rods), "rods →", OUTPUT_FILE)
+    count, changed = write_json(OUTPUT_FILE, rods, diff=True)
+    print("Saved" if changed else "Unchanged", count, "rods →", OUTPUT_FILE)
 
 if __name__ == "__main__":
-    asyncio.run(scrape_all())
+    workers = cli_option(sys.argv, "--workers")
+    html_dir = cli_option(sys.argv, "--save-html")
+    asyncio.run(scrape_all(
+        incremental="--incremental" in sys.argv,
+        backend=cli_option(sys.argv, "--parser", "bs4"),
+        workers=int(workers) if workers else None,
+        save_dir=html_dir and os.path.join(html_dir, "rods"),
+    ))
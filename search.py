@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""Ranked full-text search over every dataset.
+
+Documents are tokenized and stemmed once, at load time, into an inverted
+index with one segment per dataset. A query only touches the postings of
+its own terms and scores them with BM25, so no raw text is read per
+query. Reloading a dataset replaces just its segment, and a dataset
+patched from a scrape diff only re-indexes the documents that changed.
+"""
+import heapq
+import math
+import re
+from array import array
+
+_WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+# score multiplier for documents whose whole title is the query, so the
+# "Lucky" enchant beats the shorter "Lucky Event" for "lucky"
+EXACT_TITLE_BOOST = 1.5
+
+STOPWORDS = frozenset("""
+a an and any are as at be but by can for from has have if in into is it its
+of on or so than that the their then there these this to was when which while
+with none
+""".split())
+
+# longest first; a suffix is only stripped if at least 3 letters remain
+_SUFFIXES = ("ingly", "edly", "ings", "ions", "ing", "ion", "ied", "ies", "ed", "es", "ly", "s", "y")
+
+
+def stem(word: str) -> str:
+    """Light suffix stripping so word forms meet: boosts / boosted /
+    boosting -> boost, increase / increases / increased -> increas."""
+    if word.isdigit() or len(word) <= 3:
+        return word
+    word = word.removesuffix("'s")
+    for suffix in _SUFFIXES:
+        if not word.endswith(suffix) or len(word) - len(suffix) < 3:
+            continue
+        base = word[:-len(suffix)]
+        if suffix in ("ed", "edly") and base.endswith("e"):
+            continue  # speed, need
+        if suffix == "s" and base.endswith(("s", "u", "i")):
+            continue  # less, plus, this
+        if suffix == "y" and len(base) < 4:
+            continue
+        word = base + "y" if suffix in ("ied", "ies") else base
+        break
+    if len(word) > 3 and word.endswith("e"):
+        word = word[:-1]
+    return word
+
+
+def tokenize(text: str):
+    """Stemmed terms of `text`, stopwords dropped."""
+    text = text.lower().replace("’", "'")
+    return [stem(w) for w in _WORD.findall(text) if w not in STOPWORDS]
+
+
+def title_key(text: str) -> str:
+    """tokenize(), joined: equal for a title and a query naming it."""
+    return " ".join(tokenize(text))
+
+
+def _term_counts(fields):
+    """({term: weighted count}, length) of one document's fields."""
+    counts = {}
+    length = 0.0
+    for text, weight in fields:
+        for term in tokenize(text):
+            counts[term] = counts.get(term, 0.0) + weight
+            length += weight
+    return counts, length
+
+
+class Segment:
+    """Postings for one dataset: term -> (rows, weighted term counts).
+
+    `row_terms` keeps each row's terms so patched() can take a row out
+    of the postings without re-tokenizing it; `by_title` maps a title's
+    terms (space-joined) to its rows; `version` is whatever the caller
+    identifies the indexed data by.
+    """
+
+    __slots__ = ("postings", "lengths", "titles", "summaries", "doc_ids", "norms",
+                 "row_terms", "by_title", "version")
+
+    def __init__(self, docs, version=None):
+        counts = {}
+        self.lengths = array("d")
+        self.titles = []
+        self.summaries = []
+        self.doc_ids = []
+        self.row_terms = []
+        self.by_title = {}
+        self.version = version
+        for row, (doc_id, title, fields, summary) in enumerate(docs):
+            self.by_title.setdefault(title_key(title), []).append(row)
+            doc_counts, length = _term_counts(fields)
+            for term, tf in doc_counts.items():
+                counts.setdefault(term, {})[row] = tf
+            self.lengths.append(length)
+            self.titles.append(title)
+            self.summaries.append(summary)
+            self.doc_ids.append(doc_id)
+            self.row_terms.append(tuple(doc_counts))
+        self.postings = {
+            term: (array("I", per_doc.keys()), array("d", per_doc.values()))
+            for term, per_doc in counts.items()
+        }
+        self.norms = array("d")
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def patched(self, stale, docs, size, version=None):
+        """A copy with rows `stale` taken out and `docs`, given as (row,
+        doc) pairs, indexed in their place; `size` rows in all.
+
+        Rows that are neither stale nor in `docs` must be the same
+        documents as before. Only the postings of the affected terms are
+        copied; the term dict and the per-row lists are copied shallowly
+        (O(rows + terms), in C). This segment is left untouched.
+        """
+        seg = object.__new__(Segment)
+        seg.version = version
+        seg.norms = array("d")
+        postings = seg.postings = dict(self.postings)
+        copied = set()
+        by_title = seg.by_title = dict(self.by_title)
+
+        def retitle(row, old, new):
+            if old is not None:
+                rows = [r for r in by_title[title_key(old)] if r != row]
+                if rows:
+                    by_title[title_key(old)] = rows
+                else:
+                    del by_title[title_key(old)]
+            if new is not None:
+                by_title[title_key(new)] = by_title.get(title_key(new), []) + [row]
+
+        def posting(term):
+            if term not in copied:
+                rows, tfs = postings.get(term, ((), ()))
+                postings[term] = (array("I", rows), array("d", tfs))
+                copied.add(term)
+            return postings[term]
+
+        for row in stale:
+            retitle(row, self.titles[row], None)
+            for term in self.row_terms[row]:
+                rows, tfs = posting(term)
+                pos = rows.index(row)
+                del rows[pos]
+                del tfs[pos]
+                if not rows:
+                    del postings[term]
+                    copied.discard(term)
+
+        def resized(values, fill):
+            values = values[:size]
+            values.extend([fill] * (size - len(values)))
+            return values
+
+        seg.lengths = resized(self.lengths, 0.0)
+        seg.titles = resized(self.titles, None)
+        seg.summaries = resized(self.summaries, None)
+        seg.doc_ids = resized(self.doc_ids, None)
+        seg.row_terms = resized(self.row_terms, ())
+        for row, (doc_id, title, fields, summary) in docs:
+            doc_counts, length = _term_counts(fields)
+            for term, tf in doc_counts.items():
+                rows, tfs = posting(term)
+                rows.append(row)
+                tfs.append(tf)
+            retitle(row, None, title)
+            seg.lengths[row] = length
+            seg.titles[row] = title
+            seg.summaries[row] = summary
+            seg.doc_ids[row] = doc_id
+            seg.row_terms[row] = tuple(doc_counts)
+        return seg
+
+    def canonical(self):
+        """{doc id: (title, summary, length, {term: count})}, independent
+        of row order."""
+        docs = {
+            doc_id: (title, summary, length, {})
+            for doc_id, title, summary, length
+            in zip(self.doc_ids, self.titles, self.summaries, self.lengths)
+        }
+        for term, (rows, tfs) in self.postings.items():
+            for row, tf in zip(rows, tfs):
+                docs[self.doc_ids[row]][3][term] = tf
+        return docs
+
+
+class SearchIndex:
+    """BM25 over segments that can be replaced independently.
+
+    update(name, docs) (re)builds one segment from docs given as
+    (doc id, title, [(text, weight), ...], summary) and patch() changes
+    just some of its rows; collection-wide statistics are refreshed from
+    the segments' lengths without touching their postings.
+    """
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.segments = {}
+        self.doc_count = 0
+
+    def update(self, name, docs, version=None):
+        self.install(name, Segment(docs, version))
+
+    def install(self, name, segment):
+        """Swap in a segment built elsewhere, e.g. in a worker thread."""
+        self.segments[name] = segment
+        self._refresh_norms()
+
+    def version(self, name):
+        """The version segment `name` was built or patched for (None if absent)."""
+        seg = self.segments.get(name)
+        return None if seg is None else seg.version
+
+    def patch(self, name, stale, docs, size, version=None):
+        """Segment.patched() for segment `name`, swapped in."""
+        self.install(name, self.segments[name].patched(stale, docs, size, version))
+
+    def remove(self, name):
+        if self.segments.pop(name, None) is not None:
+            self._refresh_norms()
+
+    def _refresh_norms(self):
+        self.doc_count = sum(len(seg) for seg in self.segments.values())
+        total = sum(sum(seg.lengths) for seg in self.segments.values())
+        avgdl = total / self.doc_count if self.doc_count else 1.0
+        k1, b = self.k1, self.b
+        for seg in self.segments.values():
+            seg.norms = array("d", (k1 * (1 - b + b * length / avgdl) for length in seg.lengths))
+
+    def search(self, query, limit=10, only=None):
+        """(total matches, [(score, segment name, row)] best first).
+
+        `only` limits the search to one segment; document frequencies
+        still come from the whole collection so scores stay comparable.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return 0, []
+        k1 = self.k1
+        scores = {}
+        for term in terms:
+            df = sum(len(seg.postings[term][0]) for seg in self.segments.values() if term in seg.postings)
+            if not df:
+                continue
+            idf = math.log(1 + (self.doc_count - df + 0.5) / (df + 0.5))
+            for name, seg in self.segments.items():
+                if only is not None and name != only:
+                    continue
+                posting = seg.postings.get(term)
+                if posting is None:
+                    continue
+                norms = seg.norms
+                for row, tf in zip(*posting):
+                    key = (name, row)
+                    scores[key] = scores.get(key, 0.0) + idf * tf * (k1 + 1) / (tf + norms[row])
+        exact = title_key(query)
+        for name, seg in self.segments.items():
+            for row in seg.by_title.get(exact, ()):
+                if (name, row) in scores:
+                    scores[name, row] *= EXACT_TITLE_BOOST
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return len(scores), [(score, name, row) for (name, row), score in best]
+
+    def title(self, name, row):
+        return self.segments[name].titles[row]
+
+    def summary(self, name, row):
+        return self.segments[name].summaries[row]
+
+    def doc_id(self, name, row):
+        return self.segments[name].doc_ids[row]
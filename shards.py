@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""Run the bot's shards in several worker processes under one supervisor.
+
+    python3 shards.py [--shards N] [--workers W]
+
+--shards defaults to Discord's recommended count (GET /gateway/bot) and
+--workers to one per CPU. Each worker runs an AutoShardedBot for its
+contiguous range of shard ids; only worker 0 syncs the command tree, and
+worker i serves metrics on METRICS_PORT + i.
+
+The supervisor imports bot.py and calls load_datasets() once, which
+unpickles every dataset from its snapshot into ordinary heap objects
+and builds the indexes and warm embeds. It then moves all of it out of
+the garbage collector's reach (gc.freeze) and forks the workers. The
+sharing comes from fork: the workers start with the supervisor's pages,
+copy-on-write, and gc.freeze keeps collections from writing to (and so
+copying) them, instead of each worker parsing and indexing its own. A
+worker only gets a private copy of a dataset once it reloads it.
+Reference counting still writes to every object a worker uses, so the
+pages holding those get copied into the worker over time.
+
+Workers report a heartbeat from their event loop. A worker that exits,
+stops heartbeating (stuck loop) or isn't ready in time is restarted
+with exponential backoff.
+"""
+import asyncio
+import gc
+import multiprocessing
+import os
+import signal
+import sys
+import time
+
+from parse_pool import cli_option
+
+HEARTBEAT_SECONDS = 2.0
+HEARTBEAT_TIMEOUT = 15.0     # no heartbeat for this long: restart
+READY_TIMEOUT = 60.0         # plus IDENTIFY_SECONDS per shard
+IDENTIFY_SECONDS = 6.0       # Discord allows one IDENTIFY per 5 s
+BACKOFF_MIN = 1.0
+BACKOFF_MAX = 60.0
+STABLE_SECONDS = 120.0       # healthy this long: backoff resets
+STATUS_SECONDS = 30.0
+STOP_GRACE = 10.0
+
+
+def log(message):
+    print(f"[{time.strftime('%H:%M:%S')}] [shards] {message}", flush=True)
+
+
+def recommended_shards(token):
+    """Discord's recommended shard count for this bot."""
+    import aiohttp
+
+    base = os.getenv("DISCORD_API_URL", "https://discord.com/api/v10")
+
+    async def get():
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f"{base}/gateway/bot", headers={"Authorization": f"Bot {token}"}) as resp:
+                resp.raise_for_status()
+                return (await resp.json(content_type=None))["shards"]
+    return asyncio.run(get())
+
+
+def shard_ranges(shard_count, workers):
+    """Split shard ids 0..shard_count-1 into `workers` contiguous ranges."""
+    size, extra = divmod(shard_count, workers)
+    ranges, start = [], 0
+    for i in range(workers):
+        end = start + size + (i < extra)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+
+def memory_mib(pid):
+    """(PSS, private) MiB of a process; private is what it doesn't share."""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+    except OSError:
+        return None, None
+    kib = lambda key: int(fields.get(key, "0 kB").split()[0])  # noqa: E731
+    return kib("Pss") / 1024, (kib("Private_Clean") + kib("Private_Dirty")) / 1024
+
+
+# ---------------------------------------------------------
+# WORKER (runs in the forked child)
+# ---------------------------------------------------------
+def run_worker(app, index, shard_ids, heartbeat, ready):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C is the supervisor's to handle
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    app.bot.shard_ids = shard_ids
+    app.STARTED = time.perf_counter()  # time-to-ready counts from the fork
+    # the supervisor's imports / datasets / tables / embeds phases came
+    # with the fork; this worker's startup is only what it does itself
+    app.metrics.phases.clear()
+    app.SYNC_COMMANDS = index == 0
+    app.METRICS_PORT = app.METRICS_PORT + index if app.METRICS_PORT else 0
+
+    import discord
+    discord.utils.setup_logging()
+
+    async def beat():
+        while True:
+            heartbeat.value = time.time()
+            ready.value = app.bot.is_ready()
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+
+    async def serve():
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGTERM, lambda: asyncio.ensure_future(app.bot.close()))
+        async with app.bot:
+            beating = asyncio.create_task(beat())
+            try:
+                await app.bot.start(app.TOKEN)
+            finally:
+                beating.cancel()
+
+    asyncio.run(serve())
+
+
+# ---------------------------------------------------------
+# SUPERVISOR
+# ---------------------------------------------------------
+class Worker:
+    def __init__(self, ctx, index, shard_ids):
+        self.ctx = ctx
+        self.index = index
+        self.shard_ids = shard_ids
+        self.heartbeat = ctx.Value("d", 0.0, lock=False)
+        self.ready = ctx.Value("b", False, lock=False)
+        self.process = None
+        self.started = 0.0
+        self.restarts = 0
+        self.backoff = BACKOFF_MIN
+        self.next_start = 0.0
+
+    @property
+    def label(self):
+        return f"worker {self.index} (shards {self.shard_ids[0]}-{self.shard_ids[-1]})"
+
+    def start(self, app):
+        self.heartbeat.value = time.time()
+        self.ready.value = False
+        self.process = self.ctx.Process(
+            target=run_worker,
+            args=(app, self.index, self.shard_ids, self.heartbeat, self.ready),
+            name=f"shard-worker-{self.index}",
+        )
+        self.process.start()
+        self.started = time.time()
+        log(f"{self.label} started, pid {self.process.pid}")
+
+    def stop(self, timeout=STOP_GRACE):
+        if self.process is None:
+            return
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.kill()
+        self.process.join()
+        self.process = None
+
+    def problem(self, now):
+        """Why this worker needs a restart, or None if it is healthy."""
+        if not self.process.is_alive():
+            return f"exited with code {self.process.exitcode}"
+        if now - self.heartbeat.value > HEARTBEAT_TIMEOUT:
+            return f"no heartbeat for {now - self.heartbeat.value:.0f}s"
+        if not self.ready.value and now - self.started > READY_TIMEOUT + IDENTIFY_SECONDS * len(self.shard_ids):
+            return "not ready in time"
+        return None
+
+    def check(self, app, now):
+        if self.process is None:
+            if now >= self.next_start:
+                self.start(app)
+            return
+        reason = self.problem(now)
+        if reason is None:
+            if now - self.started > STABLE_SECONDS:
+                self.backoff = BACKOFF_MIN
+            return
+        log(f"{self.label} {reason}; restarting in {self.backoff:.0f}s")
+        self.stop()
+        self.restarts += 1
+        self.next_start = now + self.backoff
+        self.backoff = min(BACKOFF_MAX, self.backoff * 2)
+
+    def status(self, now):
+        if self.process is None:
+            return f"{self.label}: down, restart in {max(0, self.next_start - now):.0f}s"
+        pss, private = memory_mib(self.process.pid)
+        mem = f", PSS {pss:.0f} MiB ({private:.0f} private)" if pss is not None else ""
+        return (f"{self.label}: pid {self.process.pid}, {'ready' if self.ready.value else 'starting'}, "
+                f"heartbeat {now - self.heartbeat.value:.0f}s ago, {self.restarts} restarts{mem}")
+
+
+def main(argv):
+    token = os.getenv("DISCORD_TOKEN")
+    if token is None:
+        raise ValueError("DISCORD_TOKEN environment variable not found.")
+    shards = cli_option(argv, "--shards")
+    shard_count = int(shards) if shards else recommended_shards(token)
+    workers = min(int(cli_option(argv, "--workers", os.cpu_count() or 1)), shard_count)
+
+    # bot.py builds an AutoShardedBot when SHARD_COUNT is set
+    os.environ["SHARD_COUNT"] = str(shard_count)
+    os.environ.pop("SHARD_IDS", None)
+    started = time.time()
+    import bot as app
+    # loaded here, before forking, rather than in each worker's setup_hook
+    app.load_datasets()
+    gc.collect()
+    gc.freeze()
+    pss, _ = memory_mib(os.getpid())
+    log(f"datasets loaded in {time.time() - started:.1f}s"
+        + (f", supervisor PSS {pss:.0f} MiB" if pss is not None else ""))
+
+    ctx = multiprocessing.get_context("fork")
+    pool = [Worker(ctx, i, ids) for i, ids in enumerate(shard_ranges(shard_count, workers))]
+    log(f"{shard_count} shards over {len(pool)} workers")
+
+    stopping = []
+    signal.signal(signal.SIGINT, lambda *_: stopping.append(True))
+    signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+
+    last_status = time.time()
+    while not stopping:
+        now = time.time()
+        for worker in pool:
+            worker.check(app, now)
+        if now - last_status >= STATUS_SECONDS:
+            last_status = now
+            for worker in pool:
+                log(worker.status(now))
+        time.sleep(1.0)
+
+    log("stopping workers")
+    for worker in pool:
+        if worker.process is not None and worker.process.is_alive():
+            worker.process.terminate()
+    for worker in pool:
+        worker.stop()
+    log("stopped")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""Monte Carlo estimate of C$ earned per catch and per hour.
+
+A catch picks a fish from the eligible pool with its rarity tier's odds
+(split evenly between the tier's fish), draws its weight between the
+bestiary's min and max kg and prices it at the fish's C$/kg. With numpy
+a million catches are drawn in one batch; without it the same model
+runs in pure Python on fewer catches. Check HAVE_NUMPY to tell which.
+"""
+import heapq
+import math
+import random
+from array import array
+
+try:
+    import numpy as np
+    HAVE_NUMPY = True
+except ImportError:
+    np = None
+    HAVE_NUMPY = False
+
+CATCHES = 1_000_000 if HAVE_NUMPY else 50_000
+
+# Relative odds of each rarity tier with no luck bonus. The wiki doesn't
+# publish exact odds, so these are approximate. Tiers at 0 can't be
+# fished normally: extinct fish are gone, limited ones only appear
+# during their event and special ones come from other sources.
+RARITY_ODDS = {
+    "Trash": 15.0,
+    "Common": 35.0,
+    "Uncommon": 22.0,
+    "Unusual": 12.0,
+    "Rare": 8.0,
+    "Legendary": 4.0,
+    "Mythical": 1.5,
+    "Exotic": 0.4,
+    "Secret": 0.1,
+    "Apex": 0.05,
+    "Gemstone": 0.5,
+    "Fragment": 0.5,
+    "Relic": 0.5,
+    "Limited": 0.0,
+    "Extinct": 0.0,
+    "Special": 0.0,
+}
+# weights are drawn from a Beta(ALPHA, β) stretched over [min kg, max kg],
+# with β chosen so the mean lands on the bestiary's average kg
+ALPHA = 2.0
+
+
+class SimResult:
+    """Summary of one simulation; rows are bestiary record ids."""
+
+    __slots__ = ("catches", "catches_per_hour", "per_catch", "per_hour", "top")
+
+    def __init__(self, catches, catches_per_hour, per_catch, per_hour, top):
+        self.catches = catches
+        self.catches_per_hour = catches_per_hour
+        self.per_catch = per_catch  # (mean, p10, p90)
+        self.per_hour = per_hour    # (mean, p10, p90)
+        self.top = top              # [(row, share of C$, share of catches)]
+
+
+class CatchSimulator:
+    """Per-fish catch parameters for one bestiary, computed once.
+
+    Fish without weight data are always caught at their base kg (and
+    so sell for their base C$).
+    """
+
+    def __init__(self, records):
+        self.records = records
+        self.odds = array("d")
+        self.low = array("d")
+        self.span = array("d")
+        self.beta = array("d")
+        self.per_kg = array("d")
+        for fish in records:
+            self.odds.append(RARITY_ODDS.get(fish.rarity, 0.0))
+            self.per_kg.append(float(fish.value_per_kg or 0.0))
+            lo, hi, avg = fish.min_kg, fish.max_kg, fish.avg_kg
+            if lo is None or hi is None or avg is None or not hi > lo or math.isinf(hi):
+                self.low.append(float(fish.base_kg or 0.0))
+                self.span.append(0.0)
+                self.beta.append(1.0)
+                continue
+            mean = min(0.95, max(0.05, (avg - lo) / (hi - lo)))
+            self.low.append(float(lo))
+            self.span.append(float(hi - lo))
+            self.beta.append(ALPHA * (1 - mean) / mean)
+
+    def pool(self, rows):
+        """The rows that can actually be caught."""
+        return [row for row in rows if self.odds[row] > 0]
+
+    def run(self, rows, seconds_per_catch=30.0, catches=CATCHES, seed=None, top=5):
+        """Simulate `catches` catches from `rows`; None if none are catchable."""
+        rows = self.pool(rows)
+        if not rows:
+            return None
+        per_hour = max(1, round(3600 / seconds_per_catch))
+        catches = max(catches, per_hour)
+        if HAVE_NUMPY:
+            picks, values = self._draw_numpy(rows, catches, seed)
+            contrib = np.bincount(picks, weights=values, minlength=len(rows)).tolist()
+            counts = np.bincount(picks, minlength=len(rows)).tolist()
+            hours = values[:catches // per_hour * per_hour].reshape(-1, per_hour).sum(axis=1)
+            per_catch = (float(values.mean()), *map(float, np.percentile(values, (10, 90))))
+            per_hour_stats = (float(hours.mean()), *map(float, np.percentile(hours, (10, 90))))
+        else:
+            picks, values = self._draw_python(rows, catches, seed)
+            contrib = [0.0] * len(rows)
+            counts = [0] * len(rows)
+            for pick, value in zip(picks, values):
+                contrib[pick] += value
+                counts[pick] += 1
+            hours = [sum(values[i:i + per_hour]) for i in range(0, catches - per_hour + 1, per_hour)]
+            per_catch = (sum(values) / catches, *_percentiles(values))
+            per_hour_stats = (sum(hours) / len(hours), *_percentiles(hours))
+
+        total = sum(contrib) or 1.0
+        best = heapq.nlargest(top, range(len(rows)), key=contrib.__getitem__)
+        leaders = [(rows[i], contrib[i] / total, counts[i] / catches) for i in best if contrib[i] > 0]
+        return SimResult(catches, per_hour, per_catch, per_hour_stats, leaders)
+
+    def _draw_numpy(self, rows, catches, seed):
+        rng = np.random.default_rng(seed)
+        ids = np.asarray(rows)
+        odds = np.frombuffer(self.odds, dtype=np.float64)[ids]
+        picks = rng.choice(len(rows), size=catches, p=odds / odds.sum())
+        fish = ids[picks]
+        low = np.frombuffer(self.low, dtype=np.float64)[fish]
+        span = np.frombuffer(self.span, dtype=np.float64)[fish]
+        beta = np.frombuffer(self.beta, dtype=np.float64)[fish]
+        per_kg = np.frombuffer(self.per_kg, dtype=np.float64)[fish]
+        values = (low + span * rng.beta(ALPHA, beta)) * per_kg
+        return picks, values
+
+    def _draw_python(self, rows, catches, seed):
+        rng = random.Random(seed)
+        picks = rng.choices(range(len(rows)), weights=[self.odds[r] for r in rows], k=catches)
+        values = []
+        for pick in picks:
+            row = rows[pick]
+            span = self.span[row]
+            weight = self.low[row] + (span * rng.betavariate(ALPHA, self.beta[row]) if span else 0.0)
+            values.append(weight * self.per_kg[row])
+        return picks, values
+
+
+def _percentiles(values):
+    """(p10, p90) of a list, nearest rank."""
+    ordered = sorted(values)
+    last = len(ordered) - 1
+    return ordered[round(0.1 * last)], ordered[round(0.9 * last)]
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""Compile data/*.json into compact binary snapshots the bot loads instead.
+
+    python3 snapshot.py            # rebuild every stale snapshot
+    python3 snapshot.py --force    # rebuild all of them
+
+Each data/<name>.json gets a data/<name>.snap next to it. A snapshot
+records the (mtime, size) of the JSON it was built from and is ignored
+once the JSON changes, so a stale snapshot can never shadow a new scrape.
+While the stamp matches, its contents are trusted without a look at the
+JSON, so a snapshot is only ever written from the JSON's own contents.
+"""
+import json
+import mmap
+import os
+import pickle
+import sys
+from collections.abc import Mapping
+
+# 2: snapshots are only written from parsed JSON; version 1 ones may hold
+# data patched from a scrape diff, stamped as if read from the file
+SNAPSHOT_VERSION = 2
+SNAPSHOT_SUFFIX = ".snap"
+
+
+# ---------------------------------------------------------
+# COMPACT RECORDS
+# ---------------------------------------------------------
+class Record(Mapping):
+    """Read-only dict stand-in for one entry.
+
+    Entries with the same set of keys (in the same order) share one
+    field -> position map, so each entry only costs a tuple of values
+    instead of a full dict. Iteration order matches the original JSON.
+    """
+
+    __slots__ = ("_fields", "_values")
+
+    def __init__(self, fields: dict, values: tuple):
+        self._fields = fields
+        self._values = values
+
+    def __getitem__(self, key):
+        return self._values[self._fields[key]]
+
+    def get(self, key, default=None):
+        pos = self._fields.get(key)
+        return default if pos is None else self._values[pos]
+
+    def __contains__(self, key):
+        return key in self._fields
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __repr__(self):
+        return f"Record({dict(self)!r})"
+
+    def __reduce__(self):
+        return Record, (self._fields, self._values)
+
+
+def _intern(value):
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, list):
+        return [_intern(v) for v in value]
+    return value
+
+
+def compact(data: dict) -> dict:
+    """Turn {key: {field: value}} into {key: Record} with shared schemas.
+
+    Keys and string values are interned, so repeated strings such as
+    "None" or "First Sea" exist once in memory and once in the snapshot.
+    """
+    schemas = {}
+    out = {}
+    for key, entry in data.items():
+        if isinstance(entry, Record):
+            out[sys.intern(key)] = entry
+            continue
+        names = tuple(sys.intern(k) for k in entry)
+        fields = schemas.get(names)
+        if fields is None:
+            fields = schemas[names] = {k: i for i, k in enumerate(names)}
+        out[sys.intern(key)] = Record(fields, tuple(_intern(v) for v in entry.values()))
+    return out
+
+
+# ---------------------------------------------------------
+# SNAPSHOT FILES
+# ---------------------------------------------------------
+def snapshot_path(json_path: str) -> str:
+    return os.path.splitext(json_path)[0] + SNAPSHOT_SUFFIX
+
+
+def source_signature(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def write_snapshot(json_path: str, data=None, signature=None) -> str:
+    """Compile `json_path` (or already-parsed `data` for it) to a snapshot.
+
+    `data` must be what was parsed from the file, never entries derived
+    some other way (e.g. patched from a diff): read_snapshot returns it
+    for as long as the stamp matches. Pass it together with the
+    `signature` the file had before it was read: stat-ing it now could
+    stamp the data with a newer file's signature if the file was
+    replaced in between.
+    """
+    if data is None or signature is None:
+        signature = source_signature(json_path)
+    if data is None:
+        with open(json_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    payload = {
+        "version": SNAPSHOT_VERSION,
+        "source": signature,
+        "data": compact(data),
+    }
+    path = snapshot_path(json_path)
+    # per-process temp name: several shard workers may rebuild at once
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(payload, f, protocol=5)
+    os.replace(tmp, path)
+    return path
+
+
+def read_snapshot(json_path: str):
+    """Load the snapshot for `json_path`, or None if missing or stale."""
+    path = snapshot_path(json_path)
+    try:
+        signature = source_signature(json_path)
+        # the mapping only spares reading the file into a bytes object
+        # first; what it unpickles to is ordinary heap memory, private to
+        # this process (shards.py shares it by forking after the load)
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            payload = pickle.loads(mm)
+    except Exception:
+        # missing, truncated or from an incompatible build: use the JSON
+        return None
+    if payload.get("version") != SNAPSHOT_VERSION or tuple(payload.get("source", ())) != signature:
+        return None
+    return payload["data"]
+
+
+def main(argv):
+    force = "--force" in argv
+    data_dir = "data"
+    for fn in sorted(os.listdir(data_dir)):
+        if not fn.endswith(".json"):
+            continue
+        json_path = os.path.join(data_dir, fn)
+        if not force and read_snapshot(json_path) is not None:
+            print(f"up to date: {snapshot_path(json_path)}")
+            continue
+        out = write_snapshot(json_path)
+        print(f"wrote {out} ({os.path.getsize(out):,} bytes, json {os.path.getsize(json_path):,} bytes)")
+
+
+if __name__ == "__main__":
+    # go through the importable module so pickles reference snapshot.Record,
+    # not __main__.Record
+    import snapshot
+    snapshot.main(sys.argv[1:])